@@ -1,11 +1,17 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
-import joblib
-import numpy as np
 import os
+import sys
 import logging
 from logging.handlers import RotatingFileHandler
 
+# Shared inference runtime (compiled forests) lives in ML_prediction/ml_runtime
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from ml_runtime.manifest import MANIFEST_FILENAME
+from ml_runtime.memory import MemoryWatchdog, TracemallocSession, admin_authorized, memory_report
+from ml_runtime.profiling import ProfilingWSGIMiddleware, RequestProfiler
+from ml_runtime.reload import ModelFileWatcher, ModelSlot, load_with_manifest, warm_with_canaries
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
@@ -21,26 +27,108 @@ handler.setFormatter(logging.Formatter(
 app.logger.addHandler(handler)
 app.logger.setLevel(logging.INFO)
 
-# Load the model
+# Opt-in request profiling (X-Profile header or PROFILE_SAMPLE_RATE); the
+# middleware is only installed when one of them is enabled
+profiler = RequestProfiler.from_env()
+if profiler.enabled:
+    app.wsgi_app = ProfilingWSGIMiddleware(app.wsgi_app, profiler, path_prefix='/predict')
+    app.logger.info(f'Request profiling enabled, profiles written to {profiler.profile_dir}')
+
+# Load the model with the encoder its manifest describes (input columns and
+# one-hot vocabularies recorded at training time). Hot reloads swap
+# model_slot.current; a request reads it once, so it finishes on one version
 try:
-    model = joblib.load('model.pkl')
-    app.logger.info('Diabetes prediction model loaded successfully')
+    model_slot = ModelSlot('diabetes', loader=lambda: load_with_manifest('model.pkl', name='diabetes'),
+                           warmup=warm_with_canaries, log=app.logger)
+    model_slot.load()
+    app.logger.info(f'Diabetes prediction model {model_slot.current.version} loaded successfully')
 except Exception as e:
     app.logger.error(f'Failed to load model: {str(e)}')
     raise
 
+# RSS watchdog: recycles the worker above MEMORY_RECYCLE_RSS_MB (run under
+# gunicorn so a replacement is started). It starts with the first request so
+# that it runs in the worker even when gunicorn forks after importing the app
+memory_watchdog = MemoryWatchdog.from_env(log=app.logger)
+if memory_watchdog.enabled:
+    app.before_request(memory_watchdog.ensure_started)
+tracemalloc_session = TracemallocSession()
+
+# Reloads the model when model.pkl and its manifest change (MODEL_WATCH_INTERVAL_SECONDS);
+# started per worker like the watchdog
+model_watcher = ModelFileWatcher.from_env(['model.pkl', MANIFEST_FILENAME], model_slot.reload, log=app.logger)
+if model_watcher.enabled:
+    app.before_request(model_watcher.ensure_started)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'healthy',
-        'model_loaded': model is not None
+        'model_loaded': model_slot.current is not None,
+        'model_version': model_slot.current.version
     })
 
+@app.route('/stats/memory', methods=['GET'])
+def memory_stats():
+    return jsonify(memory_report({'diabetes': model_slot.current.model[0]}, memory_watchdog))
+
+@app.route('/stats/models', methods=['GET'])
+def model_stats():
+    return jsonify({'diabetes': dict(model_slot.stats(), watcher=model_watcher.stats())})
+
+@app.route('/admin/models/<action>', methods=['POST'])
+def model_admin(action):
+    if not admin_authorized(request.headers.get('X-Admin-Token')):
+        return jsonify({'error': 'Admin endpoints need ADMIN_TOKEN set and sent as X-Admin-Token'}), 403
+    if action == 'reload':
+        force = request.args.get('force', 'false').lower() == 'true'
+        if request.args.get('wait', 'false').lower() == 'true':
+            result = model_slot.reload(force)
+            return jsonify(result), 500 if result['status'] == 'failed' else 200
+        started = model_slot.reload_in_background(force)
+        return jsonify({'model': 'diabetes', 'status': 'started' if started else 'in_progress'}), 202
+    if action == 'rollback':
+        try:
+            return jsonify(model_slot.rollback())
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 409
+    return jsonify({'error': 'Unknown action', 'action': action}), 404
+
+@app.route('/admin/tracemalloc/<action>', methods=['POST'])
+def tracemalloc_admin(action):
+    if not admin_authorized(request.headers.get('X-Admin-Token')):
+        return jsonify({'error': 'Admin endpoints need ADMIN_TOKEN set and sent as X-Admin-Token'}), 403
+    try:
+        if action == 'start':
+            return jsonify(tracemalloc_session.start(request.args.get('frames', 1, type=int)))
+        if action == 'snapshot':
+            return jsonify(tracemalloc_session.snapshot(
+                request.args.get('limit', 25, type=int), request.args.get('key_type', 'lineno')
+            ))
+        if action == 'stop':
+            return jsonify(tracemalloc_session.stop())
+    except (RuntimeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'error': 'Unknown action', 'action': action}), 404
+
+@app.route('/profiles/<name>', methods=['GET'])
+def get_profile(name):
+    if not profiler.authorized(request.headers.get('X-Profile-Token')):
+        return jsonify({'error': 'Invalid profile token'}), 403
+    path = profiler.path_for(name)
+    if path is None:
+        return jsonify({'error': 'Profile not found', 'name': name}), 404
+    mimetype = 'text/plain' if name.endswith('.collapsed') else 'application/octet-stream'
+    return send_file(os.path.abspath(path), mimetype=mimetype, as_attachment=True, download_name=name)
+
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
         # Get input data
         data = request.get_json()
+        # The version serving this request, even if a reload swaps it meanwhile
+        serving = model_slot.current
+        model, encoder = serving.model
         
         # Validate input data
         required_fields = [
@@ -56,25 +144,23 @@ def predict():
                     'field': field
                 }), 400
 
-        # Convert boolean fields to numeric
-        family_history = 1 if data['family_history'] == 1 else 0
-        smoking = 1 if data['smoking'] == 1 else 0
-
-        # Prepare features
-        features = np.array([[
-            float(data['pregnancies']),
-            float(data['glucose']),
-            float(data['blood_pressure']),
-            float(data['skin_thickness']),
-            float(data['insulin']),
-            float(data['bmi']),
-            float(data['diabetes_pedigree']),
-            float(data['age']),
-            float(family_history),
-            float(data['physical_activity']),
-            float(smoking),
-            float(data['alcohol'])
-        ]])
+        # Map request fields to the raw training features; the encoder
+        # lays them out (one-hot columns included) in the model's input order
+        raw_features = {
+            'Pregnancies': float(data['pregnancies']),
+            'Glucose': float(data['glucose']),
+            'BloodPressure': float(data['blood_pressure']),
+            'SkinThickness': float(data['skin_thickness']),
+            'Insulin': float(data['insulin']),
+            'BMI': float(data['bmi']),
+            'DiabetesPedigreeFunction': float(data['diabetes_pedigree']),
+            'Age': float(data['age']),
+            'FamilyHistory': 'Yes' if data['family_history'] == 1 else 'No',
+            'PhysicalActivity': float(data['physical_activity']),
+            'SmokingStatus': 'Smoker' if data['smoking'] == 1 else 'Non-Smoker',
+            'AlcoholConsumption': float(data['alcohol'])
+        }
+        features = encoder.frame([raw_features])
 
         # Make prediction
         prediction = model.predict_proba(features)[0]
@@ -95,7 +181,8 @@ def predict():
             'risk_score': risk_score,
             'risk_level': risk_level,
             'prediction': int(prediction[1] > 0.5),
-            'confidence': float(max(prediction))
+            'confidence': float(max(prediction)),
+            'model_version': serving.version
         })
 
     except Exception as e:
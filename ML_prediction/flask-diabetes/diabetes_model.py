@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 import logging
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
@@ -9,16 +10,22 @@ import joblib
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+# Shared runtime (dataset cache) lives in ML_prediction/ml_runtime
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from ml_runtime.dataset import load_dataset
+from ml_runtime.manifest import build_manifest, write_manifest
+
 # Set up logging (so that output is printed to the console)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# (1) Load the diabetes dataset (enhanced_diabetes_dataset.xlsx) (using pandas)
+# (1) Load the diabetes dataset (enhanced_diabetes_dataset.xlsx) (through the typed columnar cache)
 dataset_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "enhanced_diabetes_dataset.xlsx")
 if not os.path.isfile(dataset_path):
     logger.error("Dataset (enhanced_diabetes_dataset.xlsx) not found.")
     exit(1)
-df = pd.read_excel(dataset_path)
+df = load_dataset("diabetes")
+raw_df = df
 logger.info("Dataset (enhanced_diabetes_dataset.xlsx) loaded. Shape: {0}".format(df.shape))
 
 # (2) Preprocess the data (handle missing values if any) (using pandas fillna) (numeric columns filled with mean, non-numeric (categorical) columns one-hot encoded)
@@ -44,6 +51,9 @@ logger.info("Model (RandomForestClassifier) trained.")
 model_path = os.path.join(os.path.dirname(__file__), "model.pkl")
 joblib.dump(model, model_path)
 logger.info("Model saved as 'model.pkl'.")
+# The manifest records the raw features and their one-hot columns, so serving code needs no dataset
+manifest_path = write_manifest(model_path, build_manifest(model, raw_df, "Outcome", "diabetes"))
+logger.info("Model manifest written to '{0}'.".format(manifest_path))
 
 # (6) Evaluate the model (accuracy score and classification report)
 y_pred = model.predict(X_test)
@@ -3,15 +3,15 @@ import numpy as np
 import joblib
 import logging
 import os
+import sys
+
+# Shared runtime (model manifests) lives in ML_prediction/ml_runtime
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from ml_runtime.manifest import load_manifest
 
 def load_training_columns():
-    # Load the training data and get the columns after one-hot encoding
-    train_df = pd.read_excel(os.path.join(os.path.dirname(__file__), '..', 'enhanced_diabetes_dataset.xlsx'))
-    # One-hot encode categorical columns
-    categorical_cols = train_df.select_dtypes(exclude=[np.number]).columns
-    train_encoded = pd.get_dummies(train_df, columns=categorical_cols)
-    feature_cols = [col for col in train_encoded.columns if col != 'Outcome']
-    return feature_cols
+    # The columns after one-hot encoding, as recorded with the model at training time
+    return load_manifest('model.pkl')['input_columns']
 
 def preprocess_input(sample_dict, feature_cols):
     df = pd.DataFrame([sample_dict])
@@ -1,12 +1,18 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
-import joblib
 import numpy as np
-import pandas as pd
 import os
+import sys
 import logging
 from logging.handlers import RotatingFileHandler
 
+# Shared inference runtime (compiled forests) lives in ML_prediction/ml_runtime
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from ml_runtime.manifest import MANIFEST_FILENAME
+from ml_runtime.memory import MemoryWatchdog, TracemallocSession, admin_authorized, memory_report
+from ml_runtime.profiling import ProfilingWSGIMiddleware, RequestProfiler
+from ml_runtime.reload import ModelFileWatcher, ModelSlot, load_with_manifest, warm_with_canaries
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
@@ -25,34 +31,111 @@ handler.setFormatter(logging.Formatter(
 app.logger.addHandler(handler)
 app.logger.setLevel(logging.INFO)
 
-# Load the model and preprocessing pipeline
+# Opt-in request profiling (X-Profile header or PROFILE_SAMPLE_RATE); the
+# middleware is only installed when one of them is enabled
+profiler = RequestProfiler.from_env()
+if profiler.enabled:
+    app.wsgi_app = ProfilingWSGIMiddleware(app.wsgi_app, profiler, path_prefix='/predict')
+    app.logger.info(f'Request profiling enabled, profiles written to {profiler.profile_dir}')
+
+# Load the model and preprocessing pipeline with the encoder its manifest
+# describes (input columns recorded at training time). Hot reloads swap
+# model_slot.current; a request reads it once, so it finishes on one version
 try:
-    pipeline = joblib.load('model.pkl')
-    app.logger.info('Heart disease prediction pipeline loaded successfully')
+    model_slot = ModelSlot('heart', loader=lambda: load_with_manifest('model.pkl', name='heart'),
+                           warmup=warm_with_canaries, log=app.logger)
+    model_slot.load()
+    app.logger.info(f'Heart disease prediction pipeline {model_slot.current.version} loaded successfully')
 except Exception as e:
     app.logger.error(f'Failed to load pipeline: {str(e)}')
     raise
 
+# RSS watchdog: recycles the worker above MEMORY_RECYCLE_RSS_MB (run under
+# gunicorn so a replacement is started). It starts with the first request so
+# that it runs in the worker even when gunicorn forks after importing the app
+memory_watchdog = MemoryWatchdog.from_env(log=app.logger)
+if memory_watchdog.enabled:
+    app.before_request(memory_watchdog.ensure_started)
+tracemalloc_session = TracemallocSession()
+
+# Reloads the model when model.pkl and its manifest change (MODEL_WATCH_INTERVAL_SECONDS);
+# started per worker like the watchdog
+model_watcher = ModelFileWatcher.from_env(['model.pkl', MANIFEST_FILENAME], model_slot.reload, log=app.logger)
+if model_watcher.enabled:
+    app.before_request(model_watcher.ensure_started)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'healthy',
-        'model_loaded': pipeline is not None
+        'model_loaded': model_slot.current is not None,
+        'model_version': model_slot.current.version
     })
 
+@app.route('/stats/memory', methods=['GET'])
+def memory_stats():
+    return jsonify(memory_report({'heart': model_slot.current.model[0]}, memory_watchdog))
+
+@app.route('/stats/models', methods=['GET'])
+def model_stats():
+    return jsonify({'heart': dict(model_slot.stats(), watcher=model_watcher.stats())})
+
+@app.route('/admin/models/<action>', methods=['POST'])
+def model_admin(action):
+    if not admin_authorized(request.headers.get('X-Admin-Token')):
+        return jsonify({'error': 'Admin endpoints need ADMIN_TOKEN set and sent as X-Admin-Token'}), 403
+    if action == 'reload':
+        force = request.args.get('force', 'false').lower() == 'true'
+        if request.args.get('wait', 'false').lower() == 'true':
+            result = model_slot.reload(force)
+            return jsonify(result), 500 if result['status'] == 'failed' else 200
+        started = model_slot.reload_in_background(force)
+        return jsonify({'model': 'heart', 'status': 'started' if started else 'in_progress'}), 202
+    if action == 'rollback':
+        try:
+            return jsonify(model_slot.rollback())
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 409
+    return jsonify({'error': 'Unknown action', 'action': action}), 404
+
+@app.route('/admin/tracemalloc/<action>', methods=['POST'])
+def tracemalloc_admin(action):
+    if not admin_authorized(request.headers.get('X-Admin-Token')):
+        return jsonify({'error': 'Admin endpoints need ADMIN_TOKEN set and sent as X-Admin-Token'}), 403
+    try:
+        if action == 'start':
+            return jsonify(tracemalloc_session.start(request.args.get('frames', 1, type=int)))
+        if action == 'snapshot':
+            return jsonify(tracemalloc_session.snapshot(
+                request.args.get('limit', 25, type=int), request.args.get('key_type', 'lineno')
+            ))
+        if action == 'stop':
+            return jsonify(tracemalloc_session.stop())
+    except (RuntimeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'error': 'Unknown action', 'action': action}), 404
+
+@app.route('/profiles/<name>', methods=['GET'])
+def get_profile(name):
+    if not profiler.authorized(request.headers.get('X-Profile-Token')):
+        return jsonify({'error': 'Invalid profile token'}), 403
+    path = profiler.path_for(name)
+    if path is None:
+        return jsonify({'error': 'Profile not found', 'name': name}), 404
+    mimetype = 'text/plain' if name.endswith('.collapsed') else 'application/octet-stream'
+    return send_file(os.path.abspath(path), mimetype=mimetype, as_attachment=True, download_name=name)
+
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
         # Get input data
         data = request.get_json()
+        # The version serving this request, even if a reload swaps it meanwhile
+        serving = model_slot.current
+        pipeline, encoder = serving.model
         
-        # Validate input data
-        required_fields = [
-            'age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg',
-            'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal'
-        ]
-        
-        for field in required_fields:
+        # Validate input data (request fields are the training features)
+        for field in encoder.raw_features:
             if field not in data:
                 return jsonify({
                     'error': 'Missing required field',
@@ -60,21 +143,7 @@ def predict():
                 }), 400
 
         # Create DataFrame in the exact format used during training
-        features = pd.DataFrame([{
-            "age": float(data['age']),
-            "sex": float(data['sex']),
-            "cp": float(data['cp']),
-            "trestbps": float(data['trestbps']),
-            "chol": float(data['chol']),
-            "fbs": float(data['fbs']),
-            "restecg": float(data['restecg']),
-            "thalach": float(data['thalach']),
-            "exang": float(data['exang']),
-            "oldpeak": float(data['oldpeak']),
-            "slope": float(data['slope']),
-            "ca": float(data['ca']),
-            "thal": float(data['thal'])
-        }])
+        features = encoder.frame([{field: float(data[field]) for field in encoder.raw_features}])
 
         # Make prediction using the pipeline
         prediction = pipeline.predict_proba(features)[0]
@@ -95,7 +164,8 @@ def predict():
             'risk_score': risk_score,
             'risk_level': risk_level,
             'prediction': int(prediction[1] > 0.5),
-            'confidence': float(max(prediction))
+            'confidence': float(max(prediction)),
+            'model_version': serving.version
         })
 
     except Exception as e:
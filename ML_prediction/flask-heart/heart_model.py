@@ -1,11 +1,15 @@
-import pandas as pd
 import joblib
 import os
+import sys
 import logging
 from sklearn.metrics import confusion_matrix
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+# Shared runtime (dataset cache) lives in ML_prediction/ml_runtime
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from ml_runtime.dataset import load_dataset
+
 # Set up logging (so that output is printed to the console)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -18,12 +22,12 @@ if not os.path.isfile(model_path):
 pipeline = joblib.load(model_path)
 logger.info("Heart disease model (pipeline) loaded from model.pkl.")
 
-# (2) Load the dataset (heart.xlsx) (using pandas)
+# (2) Load the dataset (heart.xlsx) (through the typed columnar cache)
 dataset_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "heart.xlsx")
 if not os.path.isfile(dataset_path):
     logger.error("Dataset (heart.xlsx) not found.")
     exit(1)
-df = pd.read_excel(dataset_path)
+df = load_dataset("heart")
 logger.info("Dataset (heart.xlsx) loaded. Shape: {0}".format(df.shape))
 
 # (3) Take a random row (or sample input) (using pandas sample)
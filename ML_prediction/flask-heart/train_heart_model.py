@@ -8,8 +8,16 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import joblib
 import os
+import sys
 import logging
 
+# Shared inference runtime (model artifacts) lives in ML_prediction/ml_runtime
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from ml_runtime.artifact import export_artifact
+from ml_runtime.dataset import load_dataset
+from ml_runtime.global_explain import compute_global_explanations, write_global_explanations
+from ml_runtime.manifest import build_manifest, write_manifest
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -48,9 +56,8 @@ def load_and_preprocess_data():
     Load and preprocess the heart disease dataset.
     """
     try:
-        # Load dataset
-        file_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'heart.xlsx')
-        df = pd.read_excel(file_path)
+        # Load dataset (typed columnar cache of heart.xlsx)
+        df = load_dataset('heart')
         logger.info(f"Dataset loaded successfully. Shape: {df.shape}")
         logger.info(f"Available columns: {df.columns.tolist()}")
         
@@ -152,14 +159,28 @@ def train_and_evaluate_model(X, y):
         logger.error(f"Error in model training and evaluation: {str(e)}")
         raise
 
-def save_pipeline(pipeline):
+def save_pipeline(pipeline, X, y, X_test, y_test):
     """
-    Save the complete pipeline.
+    Save the complete pipeline, with the manifest of the features it was trained on
+    and its global explanations on the test set.
     """
     try:
         model_path = 'model.pkl'
         joblib.dump(pipeline, model_path)
         logger.info(f"Pipeline saved successfully as '{model_path}'")
+        artifact_dir = export_artifact(pipeline, model_path)
+        logger.info(f"Model artifact exported to '{artifact_dir}'")
+        manifest = build_manifest(pipeline, X.join(y), y.name, 'heart')
+        manifest_path = write_manifest(model_path, manifest)
+        logger.info(f"Model manifest written to '{manifest_path}'")
+        
+        # Permutation importance and partial dependence, across all cores
+        explanations = compute_global_explanations(pipeline, manifest, X_test, y_test, 'test split')
+        explanations_path = write_global_explanations(model_path, explanations)
+        logger.info(f"Global explanations written to '{explanations_path}'")
+        logger.info("\nPermutation Importance (ROC AUC drop):")
+        for item in explanations['permutation_importance']['features']:
+            logger.info(f"{item['feature']}: {item['mean']:.4f} ± {item['std']:.4f}")
     except Exception as e:
         logger.error(f"Error saving pipeline: {str(e)}")
         raise
@@ -229,7 +250,7 @@ def main():
         pipeline, X_test, y_test = train_and_evaluate_model(X, y)
         
         # Save pipeline
-        save_pipeline(pipeline)
+        save_pipeline(pipeline, X, y, X_test, y_test)
         
         # Test pipeline with sample cases
         test_pipeline(pipeline, X_test, y_test)
@@ -0,0 +1,360 @@
+"""
+Flat model artifacts
+
+Exports a trained model (a RandomForestClassifier, or a Pipeline ending in
+one) to a versioned directory next to its ``model.pkl``:
+
+    model_artifact/
+        manifest.json      format version, source pickle hash, feature names,
+                           encoder categories, classes and array index
+        feature.npy        split feature per node (int32)
+        threshold.npy      split threshold per node (float64)
+        left.npy           left child per node (int32, leaves point to themselves)
+        right.npy          right child per node (int32)
+        value.npy          class fractions per node (float64)
+        roots.npy          root node of every tree (int32)
+        preprocessor.pkl   sklearn preprocessing steps, only for a Pipeline whose
+                           preprocessing cannot be fused (see preprocess.py)
+
+A fused ColumnTransformer is stored in the manifest itself: its mean/scale
+vectors and category tables are small, and JSON round-trips floats exactly.
+
+Arrays are stored as separate ``.npy`` files rather than one ``.npz`` so that
+``np.load(mmap_mode='r')`` can map them: every worker on a host shares the same
+physical pages and loading takes milliseconds instead of unpickling a forest.
+
+``load_serving_model`` uses the artifact when the compiled engine is selected
+and the manifest's source hash matches the current ``model.pkl``; otherwise it
+falls back to the pickle.
+
+A fitted StandardScaler (``scaler.pkl``) is exported the same way to
+``scaler_params.json``; ``load_scaler`` returns an equivalent numpy-only
+object from it, so serving does not import sklearn just to unpickle a scaler.
+
+Export from the ML_prediction directory with (the scaler.pkl next to the
+model is exported too):
+    python -m ml_runtime.artifact flask-heart/model.pkl
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .forest import CompiledForest, CompiledPipeline, compile_model, load_inference_model, resolve_engine
+from .preprocess import FusedPreprocessor
+
+logger = logging.getLogger(__name__)
+
+# Modules the pickled models and scalers are made of. Two threads that
+# unpickle at once would both import sklearn for the first time, and a
+# concurrent first import can hand one of them a partially initialized module
+# (ImportError: cannot import name 'clone' from 'sklearn.base')
+PICKLE_MODULES = ("sklearn.ensemble", "sklearn.pipeline", "sklearn.compose", "sklearn.preprocessing")
+_import_lock = threading.Lock()
+
+ARTIFACT_FORMAT = "wellpredict-forest"
+ARTIFACT_VERSION = 2
+ARTIFACT_DIRNAME = "model_artifact"
+MANIFEST_FILENAME = "manifest.json"
+PREPROCESSOR_FILENAME = "preprocessor.pkl"
+SCALER_PARAMS_SUFFIX = "_params.json"
+FOREST_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+def import_pickle_modules() -> None:
+    """Import ``PICKLE_MODULES`` one thread at a time; call before unpickling a model"""
+    with _import_lock:
+        for module in PICKLE_MODULES:
+            importlib.import_module(module)
+
+
+class ArtifactError(Exception):
+    """Raised when an artifact is missing, malformed or of an unsupported version"""
+
+
+def artifact_dir_for(model_path: str) -> str:
+    """Artifact directory that belongs to a ``model.pkl``"""
+    return os.path.join(os.path.dirname(os.path.abspath(model_path)), ARTIFACT_DIRNAME)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _to_list(values: Any) -> list:
+    return [value.item() if hasattr(value, "item") else value for value in values]
+
+
+def _describe_model(model: Any) -> Dict[str, Any]:
+    """Feature names and encoder categories recorded in the manifest"""
+    description = {
+        "model_type": type(model).__name__,
+        "feature_names": _to_list(getattr(model, "feature_names_in_", [])),
+        "categories": {}
+    }
+
+    if hasattr(model, "steps") and len(model.steps) > 1:
+        preprocessor = model.steps[0][1]
+        if hasattr(preprocessor, "get_feature_names_out"):
+            description["encoded_feature_names"] = _to_list(preprocessor.get_feature_names_out())
+        for _, transformer, columns in getattr(preprocessor, "transformers_", []):
+            steps = getattr(transformer, "steps", [(None, transformer)])
+            for _, step in steps:
+                if hasattr(step, "categories_"):
+                    for column, categories in zip(columns, step.categories_):
+                        description["categories"][column] = _to_list(categories)
+    else:
+        description["encoded_feature_names"] = description["feature_names"]
+
+    return description
+
+
+def export_artifact(model: Any, model_path: str, artifact_dir: Optional[str] = None) -> str:
+    """
+    Write the flat-array artifact for ``model``, which must have been saved
+    to ``model_path``; the pickle's hash is recorded as the artifact source.
+    The directory is replaced atomically. Returns the artifact directory.
+    """
+    import joblib
+    import sklearn
+
+    artifact_dir = artifact_dir or artifact_dir_for(model_path)
+    compiled = compile_model(model)
+    forest = compiled.forest if isinstance(compiled, CompiledPipeline) else compiled
+
+    staging_dir = f"{artifact_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    arrays = {}
+    for name in FOREST_ARRAYS:
+        array = np.ascontiguousarray(getattr(forest, name))
+        np.save(os.path.join(staging_dir, f"{name}.npy"), array)
+        arrays[name] = {"file": f"{name}.npy", "dtype": str(array.dtype), "shape": list(array.shape)}
+
+    preprocessor = None
+    if isinstance(compiled, CompiledPipeline) and compiled.fused:
+        preprocessor = {"type": "fused", "spec": compiled.preprocessor.to_dict()}
+    elif isinstance(compiled, CompiledPipeline) and compiled.preprocessor is not None:
+        joblib.dump(compiled.preprocessor, os.path.join(staging_dir, PREPROCESSOR_FILENAME))
+        preprocessor = {"type": "sklearn", "file": PREPROCESSOR_FILENAME}
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "format_version": ARTIFACT_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "sklearn_version": sklearn.__version__,
+        "source": {
+            "path": os.path.basename(model_path),
+            "sha256": file_sha256(model_path)
+        },
+        **_describe_model(model),
+        "classes": _to_list(forest.classes_),
+        "n_features": forest.n_features_in_,
+        "n_trees": forest.n_estimators,
+        "max_depth": forest.max_depth,
+        "forest_feature_names": _to_list(getattr(forest, "feature_names_in_", [])),
+        "preprocessor": preprocessor,
+        "arrays": arrays
+    }
+    with open(os.path.join(staging_dir, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Swap the finished directory in so readers never see a partial artifact
+    previous_dir = f"{artifact_dir}.old-{os.getpid()}"
+    if os.path.exists(artifact_dir):
+        os.replace(artifact_dir, previous_dir)
+    os.replace(staging_dir, artifact_dir)
+    shutil.rmtree(previous_dir, ignore_errors=True)
+    return artifact_dir
+
+
+def read_manifest(artifact_dir: str) -> Dict[str, Any]:
+    manifest_path = os.path.join(artifact_dir, MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise ArtifactError(f"No artifact manifest at {manifest_path}")
+
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ArtifactError(f"{manifest_path} is not a {ARTIFACT_FORMAT} manifest")
+    if manifest.get("format_version") != ARTIFACT_VERSION:
+        raise ArtifactError(
+            f"Unsupported artifact version {manifest.get('format_version')} (expected {ARTIFACT_VERSION})"
+        )
+    return manifest
+
+
+def load_artifact(artifact_dir: str) -> Any:
+    """Load an artifact with memory-mapped forest arrays"""
+    manifest = read_manifest(artifact_dir)
+
+    arrays = {
+        name: np.load(os.path.join(artifact_dir, spec["file"]), mmap_mode="r")
+        for name, spec in manifest["arrays"].items()
+    }
+    forest_feature_names = manifest.get("forest_feature_names") or None
+    forest = CompiledForest(
+        **arrays,
+        max_depth=manifest["max_depth"],
+        classes=np.asarray(manifest["classes"]),
+        n_features=manifest["n_features"],
+        feature_names=np.asarray(forest_feature_names, dtype=object) if forest_feature_names else None
+    )
+
+    preprocessor = manifest.get("preprocessor")
+    if preprocessor is None:
+        return forest
+    if preprocessor["type"] == "fused":
+        return CompiledPipeline(FusedPreprocessor.from_dict(preprocessor["spec"]), forest)
+
+    import joblib
+
+    import_pickle_modules()
+    return CompiledPipeline(joblib.load(os.path.join(artifact_dir, preprocessor["file"])), forest)
+
+
+def is_current(artifact_dir: str, model_path: str) -> bool:
+    """True if the artifact was exported from the current contents of ``model_path``"""
+    try:
+        manifest = read_manifest(artifact_dir)
+    except ArtifactError:
+        return False
+    return os.path.isfile(model_path) and manifest["source"]["sha256"] == file_sha256(model_path)
+
+
+def load_serving_model(model_path: str, engine: Optional[str] = None, name: Optional[str] = None) -> Any:
+    """
+    Load a model for serving. With the compiled engine, a current artifact
+    next to ``model_path`` is memory-mapped instead of unpickling the model;
+    every other case loads the pickle through ``load_inference_model``
+    (``name`` selects per-model settings such as HEART_MAX_JOBS).
+    """
+    engine = resolve_engine(engine)
+    artifact_dir = artifact_dir_for(model_path)
+
+    if engine == "compiled":
+        if is_current(artifact_dir, model_path):
+            logger.info(f"Loading memory-mapped model artifact from {artifact_dir}")
+            return load_artifact(artifact_dir)
+        if os.path.isdir(artifact_dir):
+            logger.warning(f"Model artifact in {artifact_dir} is stale or invalid, loading {model_path}")
+
+    import joblib
+
+    import_pickle_modules()
+
+    return load_inference_model(joblib.load(model_path), engine, name)
+
+
+class StandardScalerParams:
+    """Fitted StandardScaler parameters with a bit-identical numpy ``transform``"""
+
+    def __init__(self, mean: Optional[list], scale: Optional[list], var: Optional[list],
+                 with_mean: bool, with_std: bool, n_features: int,
+                 feature_names: Optional[list] = None):
+        self.mean_ = np.asarray(mean, dtype=np.float64) if mean is not None else None
+        self.scale_ = np.asarray(scale, dtype=np.float64) if scale is not None else None
+        self.var_ = np.asarray(var, dtype=np.float64) if var is not None else None
+        self.with_mean = with_mean
+        self.with_std = with_std
+        self.n_features_in_ = n_features
+        if feature_names:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+    def transform(self, X: Any) -> np.ndarray:
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        if self.with_mean:
+            X -= self.mean_
+        if self.with_std:
+            X /= self.scale_
+        return X
+
+
+def scaler_params_path(scaler_path: str) -> str:
+    return os.path.splitext(scaler_path)[0] + SCALER_PARAMS_SUFFIX
+
+
+def export_scaler(scaler: Any, scaler_path: str) -> str:
+    """Write the parameters of a fitted StandardScaler saved at ``scaler_path``"""
+    params = {
+        "format": ARTIFACT_FORMAT,
+        "format_version": ARTIFACT_VERSION,
+        "model_type": type(scaler).__name__,
+        "source": {
+            "path": os.path.basename(scaler_path),
+            "sha256": file_sha256(scaler_path)
+        },
+        "mean": _to_list(scaler.mean_) if getattr(scaler, "mean_", None) is not None else None,
+        "scale": _to_list(scaler.scale_) if getattr(scaler, "scale_", None) is not None else None,
+        "var": _to_list(scaler.var_) if getattr(scaler, "var_", None) is not None else None,
+        "with_mean": bool(scaler.with_mean),
+        "with_std": bool(scaler.with_std),
+        "n_features": int(scaler.n_features_in_),
+        "feature_names": _to_list(getattr(scaler, "feature_names_in_", []))
+    }
+    path = scaler_params_path(scaler_path)
+    staging_path = f"{path}.tmp-{os.getpid()}"
+    with open(staging_path, "w", encoding="utf-8") as f:
+        json.dump(params, f, indent=2)
+    os.replace(staging_path, path)
+    return path
+
+
+def load_scaler(scaler_path: str) -> Any:
+    """
+    Load a fitted scaler, from its exported parameters when they match the
+    current ``scaler_path`` (anything but a StandardScaler is unpickled)
+    """
+    try:
+        with open(scaler_params_path(scaler_path), encoding="utf-8") as f:
+            params = json.load(f)
+        if (params.get("format_version") == ARTIFACT_VERSION and params.get("model_type") == "StandardScaler"
+                and params["source"]["sha256"] == file_sha256(scaler_path)):
+            return StandardScalerParams(
+                params["mean"], params["scale"], params["var"], params["with_mean"],
+                params["with_std"], params["n_features"], params.get("feature_names")
+            )
+    except (OSError, ValueError, KeyError):
+        pass
+
+    import joblib
+
+    import_pickle_modules()
+    return joblib.load(scaler_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a trained model to a flat-array artifact")
+    parser.add_argument("model_path", help="Path to the trained model.pkl")
+    parser.add_argument("--output", help="Artifact directory (default: model_artifact next to the model)")
+    args = parser.parse_args()
+
+    import joblib
+
+    artifact_dir = export_artifact(joblib.load(args.model_path), args.model_path, args.output)
+    print(f"✅ Model artifact exported to {artifact_dir}")
+
+    scaler_path = os.path.join(os.path.dirname(os.path.abspath(args.model_path)), "scaler.pkl")
+    if os.path.isfile(scaler_path):
+        scaler = joblib.load(scaler_path)
+        if type(scaler).__name__ == "StandardScaler":
+            print(f"✅ Scaler parameters exported to {export_scaler(scaler, scaler_path)}")
+
+
+if __name__ == "__main__":
+    main()
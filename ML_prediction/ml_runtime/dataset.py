@@ -0,0 +1,311 @@
+"""
+Columnar dataset cache
+
+The training, evaluation and sample scripts all read Excel sources, and
+parsing Excel is by far the slowest part of loading them. ``load_dataset``
+converts a source once into a typed columnar cache next to it and reads that
+afterwards:
+
+    .dataset_cache/
+        heart.json                     source mtime, size and SHA-256, format, dtypes
+        heart-<sha256[:16]>.parquet    with pyarrow installed
+        heart-<sha256[:16]>/           otherwise: one <index>.npy per column
+                                       (categories as integer codes)
+
+The cache is keyed by the source's mtime and content hash. An unchanged mtime
+and size reuse the cache without reading the source. A changed mtime makes
+the source get hashed: the same content only refreshes the recorded mtime,
+and new content rebuilds the cache. Cache files are written under temporary
+names and renamed, so concurrent loaders never read a partial cache.
+
+The bundled datasets get explicit dtypes (``DATASETS``). Text columns become
+categoricals with a fixed category list, and a value outside it is an error
+rather than a silent NaN. Other sources (``.xlsx``, ``.xls``, ``.csv``) get
+dtypes inferred once at conversion, with text columns as categories.
+
+Configuration (environment):
+    DATASET_CACHE_DIR       cache directory (default: .dataset_cache next to the source)
+    DATASET_CACHE_FORMAT    auto (parquet if pyarrow is installed, else npy), parquet or npy
+    DATASET_CACHE           set to "false" to always parse the source
+
+Warm the caches from the ML_prediction directory with:
+    python -m ml_runtime.dataset heart diabetes
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ML_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CACHE_DIRNAME = ".dataset_cache"
+CACHE_FORMAT_VERSION = 1
+CACHE_FORMATS = ("auto", "parquet", "npy")
+
+DATASETS: Dict[str, Dict[str, Any]] = {
+    "heart": {
+        "filename": "heart.xlsx",
+        "target": "target",
+        "dtypes": {
+            "age": "int64", "sex": "int64", "cp": "int64", "trestbps": "int64", "chol": "int64",
+            "fbs": "int64", "restecg": "int64", "thalach": "int64", "exang": "int64",
+            "oldpeak": "float64", "slope": "int64", "ca": "int64", "thal": "int64", "target": "int64",
+        },
+    },
+    "diabetes": {
+        "filename": "enhanced_diabetes_dataset.xlsx",
+        "target": "Outcome",
+        "dtypes": {
+            "Pregnancies": "int64", "Glucose": "int64", "BloodPressure": "int64", "SkinThickness": "int64",
+            "Insulin": "int64", "BMI": "float64", "DiabetesPedigreeFunction": "float64", "Age": "int64",
+            "FamilyHistory": ["No", "Yes"], "PhysicalActivity": "int64",
+            "SmokingStatus": ["Non-Smoker", "Smoker"], "AlcoholConsumption": "int64", "Outcome": "int64",
+        },
+    },
+}
+
+
+def dataset_path(name: str) -> str:
+    """Path of a bundled dataset's source file"""
+    return os.path.join(ML_DIR, DATASETS[name]["filename"])
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_source(path: str) -> pd.DataFrame:
+    """Parse a source file the slow way"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".xlsx", ".xls"):
+        return pd.read_excel(path)
+    if extension == ".csv":
+        return pd.read_csv(path)
+    raise ValueError(f"Unsupported dataset source {path} (expected .xlsx, .xls or .csv)")
+
+
+def apply_dtypes(frame: pd.DataFrame, dtypes: Dict[str, Any], source: str = "dataset") -> pd.DataFrame:
+    """Cast columns to declared dtypes; a list declares a categorical with those categories"""
+    missing = [column for column in dtypes if column not in frame.columns]
+    if missing:
+        raise ValueError(f"{source} is missing columns {missing}")
+    typed = {}
+    for column, dtype in dtypes.items():
+        if isinstance(dtype, list):
+            values = frame[column]
+            typed[column] = pd.Categorical(values, categories=dtype)
+            unknown = values.notna() & pd.isna(typed[column])
+            if unknown.any():
+                raise ValueError(f"{source} column {column} has values outside {dtype}: "
+                                 f"{sorted(values[unknown].astype(str).unique())[:5]}")
+        else:
+            typed[column] = frame[column].astype(dtype)
+    return pd.DataFrame(typed)[list(dtypes)]
+
+
+def infer_dtypes(frame: pd.DataFrame) -> Dict[str, Any]:
+    """Dtypes for a source without declared ones: text columns become categories"""
+    dtypes = {}
+    for column in frame.columns:
+        series = frame[column]
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            dtypes[str(column)] = str(series.dtype)
+        else:
+            dtypes[str(column)] = sorted(series.dropna().astype(str).unique().tolist())
+    return dtypes
+
+
+def _resolve_format(requested: str) -> str:
+    if requested == "auto":
+        try:
+            import pyarrow.parquet  # noqa: F401
+            return "parquet"
+        except ImportError:
+            return "npy"
+    if requested not in CACHE_FORMATS:
+        raise ValueError(f"DATASET_CACHE_FORMAT must be one of {CACHE_FORMATS}")
+    return requested
+
+
+class DatasetCache:
+    """Typed columnar copies of dataset sources, keyed by mtime and content hash"""
+
+    def __init__(self, cache_dir: Optional[str] = None, cache_format: str = "auto", enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.cache_format = cache_format
+        self.enabled = enabled
+
+    @classmethod
+    def from_env(cls, **overrides: Any) -> "DatasetCache":
+        settings = dict(
+            cache_dir=os.environ.get("DATASET_CACHE_DIR") or None,
+            cache_format=os.environ.get("DATASET_CACHE_FORMAT", "auto").lower(),
+            enabled=os.environ.get("DATASET_CACHE", "true").lower() != "false",
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    def _directory(self, source: str) -> str:
+        return self.cache_dir or os.path.join(os.path.dirname(os.path.abspath(source)), CACHE_DIRNAME)
+
+    def _meta_path(self, source: str) -> str:
+        stem = os.path.splitext(os.path.basename(source))[0]
+        return os.path.join(self._directory(source), f"{stem}.json")
+
+    def load(self, source: str, dtypes: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """The source as a typed DataFrame, from the cache when it is current"""
+        if not self.enabled:
+            frame = read_source(source)
+            return apply_dtypes(frame, dtypes or infer_dtypes(frame), source)
+
+        stat = os.stat(source)
+        meta_path = self._meta_path(source)
+        meta = self._read_meta(meta_path)
+        if meta is not None and (dtypes is None or meta["declared_dtypes"] == dtypes):
+            if (meta["source_mtime"], meta["source_bytes"]) != (stat.st_mtime, stat.st_size):
+                if file_sha256(source) == meta["source_sha256"]:
+                    # Touched but unchanged: keep the cache and remember the new mtime
+                    meta.update(source_mtime=stat.st_mtime, source_bytes=stat.st_size)
+                    self._write_meta(meta_path, meta)
+                else:
+                    meta = None
+            if meta is not None:
+                try:
+                    return self._read_cache(meta_path, meta)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"Dataset cache for {source} is unreadable ({e}); rebuilding it")
+        return self._build(source, dtypes, stat, meta_path)
+
+    def _build(self, source: str, dtypes: Optional[Dict[str, Any]], stat: os.stat_result,
+               meta_path: str) -> pd.DataFrame:
+        start = time.perf_counter()
+        sha256 = file_sha256(source)
+        frame = read_source(source)
+        typed = apply_dtypes(frame, dtypes or infer_dtypes(frame), source)
+        cache_format = _resolve_format(self.cache_format)
+        stem = os.path.splitext(os.path.basename(meta_path))[0]
+        data_name = f"{stem}-{sha256[:16]}" + (".parquet" if cache_format == "parquet" else "")
+        directory = os.path.dirname(meta_path)
+        os.makedirs(directory, exist_ok=True)
+
+        previous = self._read_meta(meta_path)
+        temporary = os.path.join(directory, f".{data_name}.{os.getpid()}.tmp")
+        if cache_format == "parquet":
+            typed.to_parquet(temporary, index=False)
+        else:
+            os.makedirs(temporary)
+            for i, column in enumerate(typed.columns):
+                series = typed[column]
+                values = series.cat.codes.to_numpy() if isinstance(series.dtype, pd.CategoricalDtype) else series.to_numpy()
+                np.save(os.path.join(temporary, f"{i}.npy"), values)
+        target = os.path.join(directory, data_name)
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        os.replace(temporary, target)
+
+        meta = {
+            "format_version": CACHE_FORMAT_VERSION,
+            "source": os.path.abspath(source),
+            "source_mtime": stat.st_mtime,
+            "source_bytes": stat.st_size,
+            "source_sha256": sha256,
+            "format": cache_format,
+            "data": data_name,
+            "rows": len(typed),
+            "declared_dtypes": dtypes,
+            "columns": [
+                {"name": column, "dtype": "category", "categories": list(typed[column].cat.categories)}
+                if isinstance(typed[column].dtype, pd.CategoricalDtype) else
+                {"name": column, "dtype": str(typed[column].dtype)}
+                for column in typed.columns
+            ],
+        }
+        self._write_meta(meta_path, meta)
+        # A previous cache of different content is no longer referenced
+        if previous is not None and previous.get("data") not in (None, data_name):
+            stale = os.path.join(directory, previous["data"])
+            if os.path.isdir(stale):
+                shutil.rmtree(stale, ignore_errors=True)
+            else:
+                _remove(stale)
+        logger.info(f"Cached {source} as {cache_format} ({len(typed)} rows) in {time.perf_counter() - start:.2f}s")
+        return typed
+
+    def _read_cache(self, meta_path: str, meta: Dict[str, Any]) -> pd.DataFrame:
+        data = os.path.join(os.path.dirname(meta_path), meta["data"])
+        if meta["format"] == "parquet":
+            frame = pd.read_parquet(data)
+            for column in meta["columns"]:
+                if column["dtype"] == "category":
+                    frame[column["name"]] = pd.Categorical(frame[column["name"]], categories=column["categories"])
+            return frame
+        columns = {}
+        for i, column in enumerate(meta["columns"]):
+            values = np.load(os.path.join(data, f"{i}.npy"), allow_pickle=False)
+            if column["dtype"] == "category":
+                columns[column["name"]] = pd.Categorical.from_codes(values, categories=column["categories"])
+            else:
+                columns[column["name"]] = values
+        return pd.DataFrame(columns)
+
+    @staticmethod
+    def _read_meta(meta_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("format_version") == CACHE_FORMAT_VERSION else None
+
+    @staticmethod
+    def _write_meta(meta_path: str, meta: Dict[str, Any]) -> None:
+        temporary = f"{meta_path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(temporary, meta_path)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def load_dataset(source: str, cache: Optional[DatasetCache] = None) -> pd.DataFrame:
+    """A bundled dataset by name ('heart', 'diabetes') or any source file, through the cache"""
+    cache = cache or DatasetCache.from_env()
+    if source in DATASETS:
+        return cache.load(dataset_path(source), DATASETS[source]["dtypes"])
+    return cache.load(source)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the columnar dataset caches")
+    parser.add_argument("sources", nargs="*", default=list(DATASETS),
+                        help="Bundled dataset names or source files (default: all bundled datasets)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    for source in args.sources:
+        start = time.perf_counter()
+        frame = load_dataset(source)
+        print(f"✅ {source}: {frame.shape[0]} rows x {frame.shape[1]} columns "
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
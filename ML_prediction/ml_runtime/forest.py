@@ -0,0 +1,280 @@
+"""
+Compiled RandomForest inference
+
+Flattens every fitted tree of a RandomForestClassifier into contiguous NumPy
+arrays (feature, threshold, left, right, leaf value) and evaluates all trees
+over a whole batch at once, avoiding sklearn's per-call validation and joblib
+dispatch. Each vectorized step moves every unfinished (sample, tree) pair one
+level down; leaves point to themselves and pairs that reach one are dropped.
+
+The engine targets small, latency-sensitive batches. sklearn's Cython
+traversal remains faster for large offline batches.
+
+Probabilities follow sklearn's arithmetic: inputs are compared as float32,
+per-tree leaf fractions are summed in tree order and divided by the number of
+trees. ``ValidatedModel`` runs both engines side by side and fails if they
+disagree by more than a tolerance (1e-9 by default).
+
+Models are served through ``load_inference_model`` using the FOREST_ENGINE
+environment variable: ``sklearn`` (default), ``compiled`` or ``validate``.
+"""
+
+import logging
+import os
+from typing import Any, Optional
+
+import numpy as np
+
+from .parallel import AdaptiveParallelModel, ParallelismPolicy
+from .preprocess import FusedPreprocessor, UnsupportedPreprocessor
+
+logger = logging.getLogger(__name__)
+
+# Rows traversed at once; bounds the (rows x trees) index arrays
+CHUNK_SIZE = 4096
+
+FOREST_ENGINES = ("sklearn", "compiled", "validate")
+
+
+class CompiledForestMismatch(Exception):
+    """Raised in validation mode when compiled and sklearn probabilities differ"""
+
+
+class CompiledForest:
+    """Vectorized, sklearn-free evaluation of a fitted RandomForestClassifier"""
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, value: np.ndarray, roots: np.ndarray, max_depth: int,
+                 classes: np.ndarray, n_features: int, feature_names: Optional[np.ndarray] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self._is_leaf = left == np.arange(len(left))
+        if feature_names is not None:
+            self.feature_names_in_ = feature_names
+
+    @classmethod
+    def from_estimator(cls, forest: Any) -> "CompiledForest":
+        """Flatten the trees of a fitted RandomForestClassifier"""
+        if getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(offset, offset + n_nodes)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back to themselves: feature 0 with an infinite
+            # threshold keeps the sample in place on every further step
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold).astype(np.float64))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset).astype(np.int32))
+
+            # sklearn >= 1.4 stores class fractions, older versions store counts
+            value = tree.value[:, 0, :forest.n_classes_].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            if not np.allclose(totals, 1.0):
+                totals[totals == 0] = 1.0
+                value = value / totals
+            values.append(value)
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=int(max_depth),
+            classes=np.asarray(forest.classes_),
+            n_features=int(forest.n_features_in_),
+            feature_names=getattr(forest, "feature_names_in_", None)
+        )
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    def _as_matrix(self, X: Any) -> np.ndarray:
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the forest expects {self.n_features_in_}")
+        return X
+
+    def apply(self, X: Any) -> np.ndarray:
+        """Global leaf index reached by every sample in every tree, shape (n_samples, n_trees)"""
+        X = self._as_matrix(X)
+        leaves = np.empty((X.shape[0], self.n_estimators), dtype=np.int64)
+        for start in range(0, X.shape[0], CHUNK_SIZE):
+            leaves[start:start + CHUNK_SIZE] = self._traverse(X[start:start + CHUNK_SIZE])
+        return leaves
+
+    def _traverse(self, X: np.ndarray) -> np.ndarray:
+        # One (sample, tree) pair per slot; pairs that reach a leaf are
+        # dropped from the active set so deep trees do not slow down the rest
+        n_samples, n_features = X.shape
+        n_trees = self.n_estimators
+        X_flat = np.ascontiguousarray(X, dtype=np.float64).ravel()
+
+        leaves = np.repeat(self.roots[np.newaxis, :], n_samples, axis=0).ravel()
+        active = np.arange(n_samples * n_trees)
+        nodes = leaves.copy()
+        row_offsets = np.repeat(np.arange(n_samples, dtype=np.int64) * n_features, n_trees)
+
+        while nodes.size:
+            x = X_flat.take(row_offsets + self.feature.take(nodes))
+            nodes = np.where(x <= self.threshold.take(nodes), self.left.take(nodes), self.right.take(nodes))
+            done = self._is_leaf.take(nodes)
+            if done.any():
+                leaves[active[done]] = nodes[done]
+                remaining = ~done
+                active = active[remaining]
+                nodes = nodes[remaining]
+                row_offsets = row_offsets[remaining]
+
+        return leaves.reshape(n_samples, n_trees)
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        leaves = self.apply(X)
+        proba = np.zeros((leaves.shape[0], self.value.shape[1]), dtype=np.float64)
+        # Accumulate in tree order, as RandomForestClassifier does
+        for t in range(self.n_estimators):
+            proba += self.value.take(leaves[:, t], axis=0)
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class CompiledPipeline:
+    """A fitted sklearn Pipeline whose final RandomForest step is compiled"""
+
+    def __init__(self, preprocessor: Optional[Any], forest: CompiledForest):
+        self.preprocessor = preprocessor
+        self.forest = forest
+        self.classes_ = forest.classes_
+        if hasattr(preprocessor, "feature_names_in_"):
+            self.feature_names_in_ = preprocessor.feature_names_in_
+
+    @classmethod
+    def from_pipeline(cls, pipeline: Any) -> "CompiledPipeline":
+        """
+        Compile the final forest and, when possible, fuse a single
+        ColumnTransformer preprocessing step; other preprocessing is kept
+        as an sklearn Pipeline
+        """
+        from sklearn.pipeline import Pipeline
+
+        preprocessor = None
+        if len(pipeline.steps) == 2:
+            try:
+                preprocessor = FusedPreprocessor.from_fitted(pipeline.steps[0][1])
+            except UnsupportedPreprocessor as e:
+                logger.info(f"Keeping sklearn preprocessing: {e}")
+        if preprocessor is None and len(pipeline.steps) > 1:
+            preprocessor = Pipeline(pipeline.steps[:-1])
+        return cls(preprocessor, CompiledForest.from_estimator(pipeline.steps[-1][1]))
+
+    @property
+    def fused(self) -> bool:
+        """True if preprocessing runs through the fused kernel (accepts NumPy rows in feature order)"""
+        return isinstance(self.preprocessor, FusedPreprocessor)
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        if self.preprocessor is not None:
+            X = self.preprocessor.transform(X)
+        return self.forest.predict_proba(X)
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class ValidatedModel:
+    """Scores with both engines and raises if they disagree beyond ``tolerance``"""
+
+    def __init__(self, model: Any, compiled: Any, tolerance: float = 1e-9):
+        self.model = model
+        self.compiled = compiled
+        self.tolerance = tolerance
+        self.classes_ = compiled.classes_
+        if hasattr(model, "feature_names_in_"):
+            self.feature_names_in_ = model.feature_names_in_
+        self.max_abs_diff = 0.0
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        expected = self.model.predict_proba(X)
+        actual = self.compiled.predict_proba(X)
+        diff = float(np.max(np.abs(expected - actual))) if expected.size else 0.0
+        self.max_abs_diff = max(self.max_abs_diff, diff)
+        if diff > self.tolerance:
+            raise CompiledForestMismatch(
+                f"Compiled forest differs from sklearn by {diff:.3e} (tolerance {self.tolerance:.0e})"
+            )
+        return actual
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def compile_model(model: Any) -> Any:
+    """Compile a fitted RandomForestClassifier, or a Pipeline ending in one"""
+    if hasattr(model, "steps"):
+        return CompiledPipeline.from_pipeline(model)
+    return CompiledForest.from_estimator(model)
+
+
+def resolve_engine(engine: Optional[str] = None) -> str:
+    """Normalize ``engine``, defaulting to the FOREST_ENGINE environment variable"""
+    engine = (engine or os.environ.get("FOREST_ENGINE", "sklearn")).lower()
+    if engine not in FOREST_ENGINES:
+        raise ValueError(f"Unknown FOREST_ENGINE '{engine}', expected one of {FOREST_ENGINES}")
+    return engine
+
+
+def with_parallelism_policy(model: Any, name: Optional[str] = None) -> Any:
+    """Choose n_jobs per call for a model whose final estimator is parallel (see parallel.py)"""
+    estimator = model.steps[-1][1] if hasattr(model, "steps") else model
+    if not hasattr(estimator, "n_jobs"):
+        return model
+    return AdaptiveParallelModel(model, ParallelismPolicy.from_env(name))
+
+
+def load_inference_model(model: Any, engine: Optional[str] = None, name: Optional[str] = None) -> Any:
+    """
+    Wrap a loaded sklearn model for serving according to ``engine``
+    (defaults to the FOREST_ENGINE environment variable):
+
+    - ``sklearn``: the model, with n_jobs chosen per call from the batch size
+    - ``compiled``: return the compiled equivalent
+    - ``validate``: return a ValidatedModel checking both engines on every call
+
+    ``name`` selects the per-model parallelism settings (e.g. HEART_MAX_JOBS).
+    """
+    engine = resolve_engine(engine)
+    if engine == "sklearn":
+        return with_parallelism_policy(model, name)
+
+    compiled = compile_model(model)
+    logger.info(f"Serving compiled forest ({engine} mode)")
+    if engine == "validate":
+        return ValidatedModel(with_parallelism_policy(model, name), compiled)
+    return compiled
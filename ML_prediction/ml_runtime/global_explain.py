@@ -0,0 +1,263 @@
+"""
+Global model explanations
+
+Describes what a trained model learned as a whole, per raw feature (the
+manifest's ``raw_features``; the one-hot columns of a categorical feature
+always move together):
+
+    permutation importance       drop in ROC AUC when the feature's values are
+                                 shuffled across rows (``n_repeats`` shuffles)
+    one-way partial dependence   mean predicted probability over the data with
+                                 the feature set to each value of its grid
+    two-way partial dependence   the same over the grid of every feature pair
+
+Numeric features are gridded like ``sklearn.inspection``: every distinct
+value when there are few, otherwise evenly spaced values between the 5th and
+95th percentiles. Categorical features use their categories. Each feature and
+each pair is one task. Tasks run on a joblib process pool (``n_jobs``, all
+cores by default) and each scores a single stacked frame with a
+single-threaded forest.
+
+The results are computed once per ``model.pkl`` and written next to it as
+``global_explanations.json``, bound to the model's SHA-256 like its manifest.
+Training writes them, scored on the held-out split. Serving only reads them,
+and ``ensure_global_explanations`` computes them again, on the bundled
+dataset named in the manifest, only when the file is missing or describes a
+different ``model.pkl``.
+
+Compute them for an existing model from the ML_prediction directory with:
+    python -m ml_runtime.global_explain flask-heart/model.pkl
+"""
+
+import argparse
+import itertools
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .artifact import _to_list, file_sha256, import_pickle_modules
+from .manifest import ManifestEncoder, load_manifest
+from .parallel import AdaptiveParallelModel, ParallelismPolicy
+
+GLOBAL_EXPLANATIONS_FORMAT = "wellpredict-global-explanations"
+GLOBAL_EXPLANATIONS_VERSION = 1
+GLOBAL_EXPLANATIONS_FILENAME = "global_explanations.json"
+
+DEFAULT_REPEATS = 5
+DEFAULT_GRID_RESOLUTION = 20
+# Per feature of a pair: a pair scores resolution**2 copies of the data
+DEFAULT_PAIR_RESOLUTION = 10
+PERCENTILES = (5, 95)
+
+
+def global_explanations_path_for(model_path: str) -> str:
+    """Global explanations file that belongs to a ``model.pkl``"""
+    return os.path.join(os.path.dirname(os.path.abspath(model_path)), GLOBAL_EXPLANATIONS_FILENAME)
+
+
+def feature_grid(values: pd.Series, feature: Dict[str, Any], resolution: int) -> List[Any]:
+    """Values at which partial dependence is evaluated for one raw feature"""
+    if feature["kind"] == "categorical":
+        return list(feature["categories"])
+    distinct = np.unique(values.to_numpy())
+    if len(distinct) <= resolution:
+        return _to_list(distinct)
+    low, high = np.percentile(values.to_numpy(dtype=np.float64), PERCENTILES)
+    return _to_list(np.unique(np.linspace(low, high, resolution)))
+
+
+class _Scorer:
+    """Probabilities of the explained class for frames of raw features"""
+
+    def __init__(self, model: Any, manifest: Dict[str, Any], class_index: int):
+        # Tasks already run in parallel, so each scores with a single-threaded forest
+        self.model = AdaptiveParallelModel(model, ParallelismPolicy(max_jobs=1))
+        self.encoder = ManifestEncoder(manifest)
+        self.class_index = class_index
+
+    def __call__(self, raw: pd.DataFrame) -> np.ndarray:
+        return self.model.predict_proba(self.encoder.encode_frame(raw))[:, self.class_index]
+
+
+def _stacked(frame: pd.DataFrame, copies: int, columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """``copies`` copies of ``frame`` one after another, with ``columns`` replaced by the given values"""
+    stacked = frame.iloc[np.tile(np.arange(len(frame)), copies)].reset_index(drop=True)
+    for column, values in columns.items():
+        # Grid values of an integer feature may fall between integers, as in sklearn
+        dtype = frame[column].dtype if isinstance(frame[column].dtype, pd.CategoricalDtype) else None
+        stacked[column] = pd.Series(values, dtype=dtype)
+    return stacked
+
+
+def _permutation_importance(scorer: _Scorer, frame: pd.DataFrame, positive: np.ndarray, feature: str,
+                            baseline: float, n_repeats: int, seed: int) -> Dict[str, Any]:
+    from sklearn.metrics import roc_auc_score
+
+    rng = np.random.RandomState(seed)
+    values = frame[feature].to_numpy()
+    shuffled = np.concatenate([values[rng.permutation(len(frame))] for _ in range(n_repeats)])
+    probabilities = scorer(_stacked(frame, n_repeats, {feature: shuffled})).reshape(n_repeats, len(frame))
+    drops = np.array([baseline - roc_auc_score(positive, row) for row in probabilities])
+    return {"feature": feature, "mean": float(drops.mean()), "std": float(drops.std()), "drops": drops.tolist()}
+
+
+def _partial_dependence(scorer: _Scorer, frame: pd.DataFrame, features: Tuple[str, ...],
+                        grids: Tuple[List[Any], ...]) -> Dict[str, Any]:
+    points = list(itertools.product(*grids))
+    columns = {
+        feature: np.repeat(np.asarray([point[i] for point in points]), len(frame))
+        for i, feature in enumerate(features)
+    }
+    average = scorer(_stacked(frame, len(points), columns)).reshape(len(points), len(frame)).mean(axis=1)
+    if len(features) == 1:
+        return {"feature": features[0], "grid": grids[0], "average": average.tolist()}
+    return {"features": list(features), "grids": list(grids),
+            "average": average.reshape([len(grid) for grid in grids]).tolist()}
+
+
+def _run_task(scorer: _Scorer, frame: pd.DataFrame, task: Tuple[str, tuple]) -> Tuple[str, Dict[str, Any]]:
+    kind, args = task
+    if kind == "importance":
+        return kind, _permutation_importance(scorer, frame, *args)
+    return kind, _partial_dependence(scorer, frame, *args)
+
+
+def compute_global_explanations(model: Any, manifest: Dict[str, Any], frame: pd.DataFrame, y: Sequence[Any],
+                                source: str, n_repeats: int = DEFAULT_REPEATS,
+                                grid_resolution: int = DEFAULT_GRID_RESOLUTION,
+                                pair_resolution: int = DEFAULT_PAIR_RESOLUTION,
+                                n_jobs: Optional[int] = -1, random_state: int = 0,
+                                class_index: int = 1) -> Dict[str, Any]:
+    """
+    Permutation importance and partial dependence of the fitted ``model``
+    described by ``manifest``, on the raw feature columns of ``frame`` with
+    labels ``y``; ``source`` says where the rows come from.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.metrics import roc_auc_score
+
+    features = manifest["raw_features"]
+    names = [feature["name"] for feature in features]
+    frame = frame[names].reset_index(drop=True)
+    positive = np.asarray(y) == manifest["classes"][class_index]
+    scorer = _Scorer(model, manifest, class_index)
+    baseline = float(roc_auc_score(positive, scorer(frame)))
+
+    tasks = [("importance", (positive, name, baseline, n_repeats, random_state + i)) for i, name in enumerate(names)]
+    grids = {feature["name"]: feature_grid(frame[feature["name"]], feature, grid_resolution) for feature in features}
+    tasks += [("one_way", ((name,), (grids[name],))) for name in names]
+    pair_grids = {feature["name"]: feature_grid(frame[feature["name"]], feature, pair_resolution) for feature in features}
+    tasks += [("two_way", ((a, b), (pair_grids[a], pair_grids[b]))) for a, b in itertools.combinations(names, 2)]
+
+    results: Dict[str, List[Dict[str, Any]]] = {"importance": [], "one_way": [], "two_way": []}
+    for kind, result in Parallel(n_jobs=n_jobs)(delayed(_run_task)(scorer, frame, task) for task in tasks):
+        results[kind].append(result)
+
+    import sklearn
+
+    return {
+        "format": GLOBAL_EXPLANATIONS_FORMAT,
+        "format_version": GLOBAL_EXPLANATIONS_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "sklearn_version": sklearn.__version__,
+        "data": {"source": source, "rows": len(frame)},
+        "target": manifest.get("target"),
+        "explained_class": manifest["classes"][class_index],
+        "settings": {"n_repeats": n_repeats, "grid_resolution": grid_resolution,
+                     "pair_resolution": pair_resolution, "percentiles": list(PERCENTILES),
+                     "random_state": random_state},
+        "permutation_importance": {
+            "metric": "roc_auc",
+            "baseline": baseline,
+            "features": sorted(results["importance"], key=lambda item: item["mean"], reverse=True)
+        },
+        "partial_dependence": {"one_way": results["one_way"], "two_way": results["two_way"]}
+    }
+
+
+def write_global_explanations(model_path: str, explanations: Dict[str, Any]) -> str:
+    """Write ``explanations`` next to ``model_path`` (already saved), bound to its hash; returns the path"""
+    explanations = dict(explanations, model={"path": os.path.basename(model_path), "sha256": file_sha256(model_path)})
+    path = global_explanations_path_for(model_path)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(explanations, f)
+        f.write("\n")
+    os.replace(temporary, path)
+    return path
+
+
+def load_global_explanations(model_path: str, sha256: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    The global explanations of ``model_path`` (whose SHA-256 is ``sha256``,
+    hashed when not given); None when they are missing, unreadable or stale
+    """
+    try:
+        with open(global_explanations_path_for(model_path), encoding="utf-8") as f:
+            explanations = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (explanations.get("format") != GLOBAL_EXPLANATIONS_FORMAT
+            or explanations.get("format_version") != GLOBAL_EXPLANATIONS_VERSION):
+        return None
+    if explanations.get("model", {}).get("sha256") != (sha256 or file_sha256(model_path)):
+        return None
+    return explanations
+
+
+def ensure_global_explanations(model_path: str, n_jobs: Optional[int] = -1, force: bool = False,
+                               **settings: Any) -> Dict[str, Any]:
+    """
+    Current global explanations of ``model_path``: read from disk, or
+    computed on the bundled dataset named in its manifest and written when
+    missing or stale (or ``force``)
+    """
+    manifest = load_manifest(model_path)
+    if not force:
+        explanations = load_global_explanations(model_path, manifest["model"]["sha256"])
+        if explanations is not None:
+            return explanations
+
+    import joblib
+
+    from .dataset import load_dataset
+
+    import_pickle_modules()
+
+    dataset = manifest["dataset"]["name"]
+    frame = load_dataset(dataset)
+    explanations = compute_global_explanations(
+        joblib.load(model_path), manifest, frame, frame[manifest["target"]],
+        f"dataset {dataset}", n_jobs=n_jobs, **settings
+    )
+    write_global_explanations(model_path, explanations)
+    return load_global_explanations(model_path, manifest["model"]["sha256"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute the global explanations of a trained model.pkl")
+    parser.add_argument("model_path", help="Path to the trained model.pkl (with its manifest)")
+    parser.add_argument("--force", action="store_true", help="Recompute even if the current file matches the model")
+    parser.add_argument("--jobs", type=int, default=-1, help="Worker processes (default: all cores)")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Shuffles per feature")
+    parser.add_argument("--grid-resolution", type=int, default=DEFAULT_GRID_RESOLUTION,
+                        help="Grid values per feature for one-way partial dependence")
+    parser.add_argument("--pair-resolution", type=int, default=DEFAULT_PAIR_RESOLUTION,
+                        help="Grid values per feature for two-way partial dependence")
+    args = parser.parse_args()
+
+    explanations = ensure_global_explanations(
+        args.model_path, args.jobs, args.force, n_repeats=args.repeats,
+        grid_resolution=args.grid_resolution, pair_resolution=args.pair_resolution
+    )
+    top = explanations["permutation_importance"]["features"][:3]
+    print(f"✅ Global explanations in {global_explanations_path_for(args.model_path)} "
+          f"(top features: {', '.join(item['feature'] for item in top)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Model manifests
+
+Training writes ``model_manifest.json`` next to ``model.pkl``. It records what
+the model was trained on, so that serving code builds its encoder from it
+instead of re-reading the dataset or hard-coding a column order:
+
+    {
+      "format": "wellpredict-model-manifest", "format_version": 1,
+      "model": {"path": "model.pkl", "sha256": ..., "type": "RandomForestClassifier"},
+      "dataset": {"name": "diabetes", "rows": 500},
+      "target": "Outcome", "classes": [0, 1],
+      "raw_features": [                      dataset columns, in order
+        {"name": "Glucose", "kind": "numeric", "dtype": "int64", "min": 0, "max": 199},
+        {"name": "SmokingStatus", "kind": "categorical", "dtype": "category",
+         "categories": ["Non-Smoker", "Smoker"]}, ...],
+      "input_columns": [...],                columns predict_proba takes, in order
+      "one_hot": {"SmokingStatus_Smoker": ["SmokingStatus", "Smoker"], ...},
+      "encoded_columns": [...]               columns the forest sees (after a
+                                             Pipeline's preprocessing)
+    }
+
+A raw feature is categorical when the dataset stores it as a category or when
+the model's own OneHotEncoder encodes it; either way its vocabulary is listed.
+``one_hot`` maps each input column that ``pd.get_dummies`` produced back to
+its raw feature and category. Input columns that are not in it are raw
+features passed through unchanged.
+
+The manifest records the SHA-256 of the ``model.pkl`` it describes, and
+``load_manifest`` refuses one that does not match, so a retrained model never
+runs with a stale column order.
+
+Write a manifest for an existing model from the ML_prediction directory with:
+    python -m ml_runtime.manifest flask-diabetes/model.pkl --dataset diabetes
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import pandas as pd
+
+from .artifact import _describe_model, _to_list, file_sha256
+
+MANIFEST_FORMAT = "wellpredict-model-manifest"
+MANIFEST_VERSION = 1
+MANIFEST_FILENAME = "model_manifest.json"
+
+
+class ManifestError(Exception):
+    """Raised when a model manifest is missing, stale or does not fit its model"""
+
+
+def manifest_path_for(model_path: str) -> str:
+    """Manifest file that belongs to a ``model.pkl``"""
+    return os.path.join(os.path.dirname(os.path.abspath(model_path)), MANIFEST_FILENAME)
+
+
+def _describe_features(frame: pd.DataFrame, categories: Dict[str, list]) -> List[Dict[str, Any]]:
+    features = []
+    for column in frame.columns:
+        series = frame[column]
+        feature: Dict[str, Any] = {"name": str(column), "dtype": str(series.dtype)}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            feature.update(kind="categorical", categories=_to_list(series.cat.categories))
+        elif column in categories:
+            feature.update(kind="categorical", categories=categories[column])
+        else:
+            feature["kind"] = "numeric"
+        if pd.api.types.is_numeric_dtype(series):
+            feature.update(min=series.min().item(), max=series.max().item())
+        features.append(feature)
+    return features
+
+
+def build_manifest(model: Any, frame: pd.DataFrame, target: Optional[str] = None,
+                   dataset: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Describe a fitted ``model`` trained on the raw feature columns of
+    ``frame`` (before any one-hot encoding; a ``target`` column is dropped).
+    """
+    import sklearn
+
+    raw = frame.drop(columns=[target]) if target in frame.columns else frame
+    description = _describe_model(model)
+    raw_features = _describe_features(raw, description["categories"])
+    input_columns = description["feature_names"] or [feature["name"] for feature in raw_features]
+
+    one_hot = {}
+    raw_names = {feature["name"] for feature in raw_features}
+    dummies = {
+        f"{feature['name']}_{category}": [feature["name"], category]
+        for feature in raw_features if feature["kind"] == "categorical"
+        for category in feature["categories"]
+    }
+    for column in input_columns:
+        if column in raw_names:
+            continue
+        if column not in dummies:
+            raise ManifestError(f"Model input column {column} is neither a dataset column nor a one-hot "
+                                f"column of a categorical one")
+        one_hot[column] = dummies[column]
+
+    return {
+        "format": MANIFEST_FORMAT,
+        "format_version": MANIFEST_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "sklearn_version": sklearn.__version__,
+        "model": {"type": description["model_type"]},
+        "dataset": {"name": dataset, "rows": len(frame)},
+        "target": target,
+        "classes": _to_list(getattr(model, "classes_", [])),
+        "raw_features": raw_features,
+        "input_columns": input_columns,
+        "one_hot": one_hot,
+        "encoded_columns": description.get("encoded_feature_names") or input_columns
+    }
+
+
+def write_manifest(model_path: str, manifest: Dict[str, Any]) -> str:
+    """Write ``manifest`` next to ``model_path`` (already saved), bound to its hash; returns the path"""
+    manifest = dict(manifest, model=dict(manifest.get("model", {}), path=os.path.basename(model_path),
+                                         sha256=file_sha256(model_path)))
+    path = manifest_path_for(model_path)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    os.replace(temporary, path)
+    return path
+
+
+def load_manifest(model_path: str, verify: bool = True) -> Dict[str, Any]:
+    """The manifest of ``model_path``; with ``verify`` it must describe the current pickle"""
+    path = manifest_path_for(model_path)
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise ManifestError(f"No model manifest at {path}; retrain the model or run "
+                            f"python -m ml_runtime.manifest {model_path} --dataset <name>")
+    except ValueError as e:
+        raise ManifestError(f"Malformed model manifest {path}: {e}")
+
+    if manifest.get("format") != MANIFEST_FORMAT or manifest.get("format_version") != MANIFEST_VERSION:
+        raise ManifestError(f"Unsupported model manifest {path} "
+                            f"({manifest.get('format')} v{manifest.get('format_version')})")
+    if verify and manifest["model"].get("sha256") != file_sha256(model_path):
+        raise ManifestError(f"Model manifest {path} describes a different {os.path.basename(model_path)}; "
+                            f"regenerate it with python -m ml_runtime.manifest {model_path} --dataset <name>")
+    return manifest
+
+
+def model_version(manifest: Dict[str, Any]) -> str:
+    """Version ID of the model a manifest describes: the first 12 hex digits of its SHA-256"""
+    return manifest["model"]["sha256"][:12]
+
+
+def canary_records(manifest: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Raw-feature records spanning the training ranges (every feature at its
+    minimum, midpoint and maximum; categories taken in turn) for warming up a
+    freshly loaded model
+    """
+    records = []
+    for position in (0.0, 0.5, 1.0):
+        record = {}
+        for feature in manifest["raw_features"]:
+            if feature["kind"] == "categorical":
+                categories = feature["categories"]
+                record[feature["name"]] = categories[round(position * (len(categories) - 1))]
+            else:
+                value = feature["min"] + position * (feature["max"] - feature["min"])
+                record[feature["name"]] = round(value) if feature["dtype"].startswith("int") else value
+        records.append(record)
+    return records
+
+
+def check_model(manifest: Dict[str, Any], model: Any) -> None:
+    """Raise if ``model`` does not take the manifest's input columns"""
+    trained = _to_list(getattr(model, "feature_names_in_", []))
+    if trained and trained != manifest["input_columns"]:
+        raise ManifestError(f"Model was trained on features {trained}, "
+                            f"the manifest lists {manifest['input_columns']}")
+
+
+class ManifestEncoder:
+    """Builds model input rows from raw feature values, as a manifest describes them"""
+
+    def __init__(self, manifest: Dict[str, Any]):
+        self.manifest = manifest
+        self.columns: List[str] = list(manifest["input_columns"])
+        self.raw_features: List[str] = [feature["name"] for feature in manifest["raw_features"]]
+        self.categories: Dict[str, list] = {
+            feature["name"]: feature["categories"]
+            for feature in manifest["raw_features"] if feature["kind"] == "categorical"
+        }
+        one_hot = manifest["one_hot"]
+        # (input column, raw feature, category or None for a pass-through column)
+        self._plan = [
+            (column, *one_hot[column]) if column in one_hot else (column, column, None)
+            for column in self.columns
+        ]
+        self._one_hot_features = sorted({feature for feature, _ in one_hot.values()})
+
+    def encode(self, raw: Mapping[str, Any]) -> Dict[str, Any]:
+        """Input column -> value for one record of raw feature values"""
+        for feature in self._one_hot_features:
+            if feature not in raw:
+                raise ValueError(f"Missing required feature: {feature}")
+            if raw[feature] not in self.categories[feature]:
+                raise ValueError(f"{feature} must be one of {self.categories[feature]}, got {raw[feature]!r}")
+        row = {}
+        for column, feature, category in self._plan:
+            if category is None:
+                if feature not in raw:
+                    raise ValueError(f"Missing required feature: {feature}")
+                row[column] = raw[feature]
+            else:
+                row[column] = 1 if raw[feature] == category else 0
+        return row
+
+    def frame(self, records: Sequence[Mapping[str, Any]]) -> pd.DataFrame:
+        """Encoded records as a DataFrame with the model's input columns"""
+        return pd.DataFrame([self.encode(record) for record in records], columns=self.columns)
+
+    def encode_frame(self, raw: pd.DataFrame) -> pd.DataFrame:
+        """Model input columns for a frame of raw feature columns (one-hot columns as bool, like pd.get_dummies)"""
+        return pd.DataFrame({
+            column: raw[feature] if category is None else (raw[feature] == category).to_numpy()
+            for column, feature, category in self._plan
+        }, index=raw.index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the model manifest for a trained model.pkl")
+    parser.add_argument("model_path", help="Path to the trained model.pkl")
+    parser.add_argument("--dataset", required=True, help="Bundled dataset name or source file it was trained on")
+    parser.add_argument("--target", help="Target column (default: the bundled dataset's target)")
+    args = parser.parse_args()
+
+    import joblib
+
+    from .dataset import DATASETS, load_dataset
+
+    target = args.target or DATASETS.get(args.dataset, {}).get("target")
+    manifest = build_manifest(joblib.load(args.model_path), load_dataset(args.dataset), target, args.dataset)
+    print(f"✅ Model manifest written to {write_manifest(args.model_path, manifest)}")
+
+
+if __name__ == "__main__":
+    main()
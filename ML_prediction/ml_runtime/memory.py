@@ -0,0 +1,288 @@
+"""
+Memory instrumentation for the model services
+
+- ``model_memory``: trees, nodes and bytes of the node arrays of a loaded
+  model, whichever engine and wrappers serve it
+- ``TracemallocSession``: tracemalloc started on demand, with snapshots that
+  report the top allocation sites and the growth since the previous snapshot
+- ``MemoryWatchdog``: background thread that checks RSS and recycles the
+  worker (SIGTERM, so in-flight requests finish) once it crosses a threshold.
+  This needs a supervisor to start a replacement: serve.py for the backend,
+  gunicorn for the Flask services.
+
+Admin operations (tracemalloc) are refused unless ``ADMIN_TOKEN`` is set and
+sent back in the ``X-Admin-Token`` header.
+
+Configuration (environment):
+    MEMORY_RECYCLE_RSS_MB            RSS that triggers a recycle (default 0: never)
+    MEMORY_CHECK_INTERVAL_SECONDS    how often RSS is checked (default 30)
+    ADMIN_TOKEN                      enables the admin endpoints
+"""
+
+import hmac
+import logging
+import os
+import signal
+import threading
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import numpy as np
+
+from .forest import CompiledForest
+
+logger = logging.getLogger(__name__)
+
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+SNAPSHOT_KEY_TYPES = ("lineno", "filename", "traceback")
+
+# Compiled forest arrays holding tree nodes
+_COMPILED_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+def admin_authorized(token: Optional[str]) -> bool:
+    """Admin endpoints are disabled without ADMIN_TOKEN and need it sent back otherwise"""
+    expected = os.environ.get("ADMIN_TOKEN")
+    return bool(expected) and hmac.compare_digest(token or "", expected)
+
+
+def current_rss(pid: Optional[int] = None) -> Optional[int]:
+    """Resident set size of a process (this one by default) in bytes (one small /proc read)"""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if pid not in (None, os.getpid()):
+        return None
+    try:
+        import resource
+
+        # Peak rather than current RSS, in kB on Linux and bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return None
+
+
+def _forests(model: Any, seen: set) -> Iterator[Any]:
+    """Forests reachable from a served model through the runtime's wrappers"""
+    if model is None or id(model) in seen:
+        return
+    seen.add(id(model))
+    if isinstance(model, CompiledForest) or hasattr(model, "estimators_"):
+        yield model
+        return
+    if hasattr(model, "steps"):
+        yield from _forests(model.steps[-1][1], seen)
+    # AdaptiveParallelModel and ValidatedModel wrap .model (plus .compiled),
+    # CompiledPipeline wraps .forest
+    for attribute in ("model", "compiled", "forest"):
+        yield from _forests(getattr(model, attribute, None), seen)
+
+
+def _forest_memory(forest: Any) -> Dict[str, Any]:
+    if isinstance(forest, CompiledForest):
+        arrays = [getattr(forest, name) for name in _COMPILED_ARRAYS]
+        return {
+            "engine": "compiled",
+            "trees": int(len(forest.roots)),
+            "nodes": int(len(forest.left)),
+            "tree_bytes": int(sum(array.nbytes for array in arrays)),
+            # Arrays loaded from a model artifact are file-backed and shared between processes
+            "memory_mapped": any(isinstance(array, np.memmap) for array in arrays)
+        }
+
+    from sklearn.tree._tree import NODE_DTYPE
+
+    trees = [estimator.tree_ for estimator in forest.estimators_]
+    nodes = sum(tree.node_count for tree in trees)
+    return {
+        "engine": "sklearn",
+        "trees": len(trees),
+        "nodes": int(nodes),
+        # Node structs plus the per-node class value arrays
+        "tree_bytes": int(nodes * NODE_DTYPE.itemsize + sum(tree.value.nbytes for tree in trees)),
+        "memory_mapped": False
+    }
+
+
+def model_memory(model: Any) -> Dict[str, Any]:
+    """Tree counts and node array bytes of every forest behind a served model"""
+    forests = [_forest_memory(forest) for forest in _forests(model, set())]
+    return {
+        "forests": forests,
+        "tree_bytes": sum(forest["tree_bytes"] for forest in forests)
+    }
+
+
+class TracemallocSession:
+    """On-demand tracemalloc with snapshot diffs"""
+
+    def __init__(self):
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._started_here = False
+        self._lock = threading.Lock()
+
+    def start(self, frames: int = 1) -> Dict[str, Any]:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(max(1, frames))
+                self._started_here = True
+            self._previous = self._take()
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._started_here and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self._started_here = False
+            self._previous = None
+        return self.status()
+
+    @staticmethod
+    def _take() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+
+    def snapshot(self, limit: int = 25, key_type: str = "lineno") -> Dict[str, Any]:
+        """Top allocation sites now and their growth since the previous snapshot (or start)"""
+        if key_type not in SNAPSHOT_KEY_TYPES:
+            raise ValueError(f"key_type must be one of {SNAPSHOT_KEY_TYPES}")
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("tracemalloc is not running; start it first")
+            snapshot = self._take()
+            previous, self._previous = self._previous, snapshot
+
+        top = [
+            {"location": _location(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics(key_type)[:limit]
+        ]
+        growth = []
+        if previous is not None:
+            growth = [
+                {"location": _location(stat.traceback), "size_diff_bytes": stat.size_diff,
+                 "count_diff": stat.count_diff, "size_bytes": stat.size}
+                for stat in snapshot.compare_to(previous, key_type)[:limit]
+            ]
+        return {**self.status(), "key_type": key_type, "top": top, "growth_since_previous": growth}
+
+    @staticmethod
+    def status() -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else None,
+            "traced_bytes": current,
+            "peak_traced_bytes": peak
+        }
+
+
+def _location(traceback: tracemalloc.Traceback) -> str:
+    # Frames are stored oldest first; show the allocating line first
+    return " <- ".join(f"{frame.filename}:{frame.lineno}" for frame in reversed(traceback))
+
+
+def _terminate_self() -> None:
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+class MemoryWatchdog:
+    """Recycles the process once its RSS crosses ``max_rss_bytes``"""
+
+    def __init__(self, max_rss_bytes: int = 0, interval: float = 30.0,
+                 recycle: Callable[[], None] = _terminate_self, log: Optional[logging.Logger] = None):
+        self.max_rss_bytes = max_rss_bytes
+        self.interval = interval
+        self.recycle = recycle
+        self.log = log or logger
+        self.last_rss: Optional[int] = None
+        self.peak_rss: Optional[int] = None
+        self.checks = 0
+        self.recycling = False
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **overrides: Any) -> "MemoryWatchdog":
+        settings = dict(
+            max_rss_bytes=int(float(os.environ.get("MEMORY_RECYCLE_RSS_MB", "0")) * 1024 * 1024),
+            interval=float(os.environ.get("MEMORY_CHECK_INTERVAL_SECONDS", "30")),
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rss_bytes > 0
+
+    def check(self) -> bool:
+        """Record the current RSS; True when it is over the threshold"""
+        rss = current_rss()
+        self.checks += 1
+        self.last_rss = rss
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, rss)
+        return self.enabled and rss is not None and rss > self.max_rss_bytes
+
+    def ensure_started(self) -> None:
+        """Start the checking thread in this process; a no-op once it runs here.
+
+        Called lazily (first request) as well as at startup, so a server that
+        forks after importing the app (gunicorn --preload) watches each
+        worker rather than the master.
+        """
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopped = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="memory-watchdog", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            if self.check():
+                self.recycling = True
+                self.log.warning(
+                    f"RSS {self.last_rss / 2**20:.1f} MiB is over the {self.max_rss_bytes / 2**20:.1f} MiB "
+                    f"limit, recycling worker {os.getpid()}"
+                )
+                self.recycle()
+                return
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None and self._thread.is_alive() and self._pid == os.getpid(),
+            "max_rss_bytes": self.max_rss_bytes or None,
+            "check_interval_seconds": self.interval,
+            "last_rss_bytes": self.last_rss,
+            "peak_rss_bytes": self.peak_rss,
+            "checks": self.checks,
+            "recycling": self.recycling
+        }
+
+
+def memory_report(models: Dict[str, Any], watchdog: Optional[MemoryWatchdog] = None) -> Dict[str, Any]:
+    """RSS, per-model tree bytes, watchdog state and tracemalloc status for a stats endpoint"""
+    report: Dict[str, Any] = {
+        "pid": os.getpid(),
+        "rss_bytes": current_rss(),
+        "models": {name: model_memory(model) for name, model in models.items()},
+        "tracemalloc": TracemallocSession.status()
+    }
+    if watchdog is not None:
+        report["watchdog"] = watchdog.stats()
+    return report
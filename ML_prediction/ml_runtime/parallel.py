@@ -0,0 +1,109 @@
+"""
+Adaptive RandomForest parallelism
+
+The training scripts fit forests with ``n_jobs=-1`` and that setting is
+pickled with the model, so every single-row ``predict_proba`` dispatches
+joblib work across all cores. ``AdaptiveParallelModel`` chooses ``n_jobs``
+per call instead: serial below ``min_rows``, and above it the CPUs left over
+after sharing them among the calls currently in flight on the model.
+
+The pickled estimator is never mutated (it may be scored from several
+threads at once); each ``n_jobs`` value gets a shallow copy that shares the
+fitted trees.
+
+Configuration (per model, falling back to the FOREST_* defaults):
+    <MODEL>_PARALLEL_MIN_ROWS / FOREST_PARALLEL_MIN_ROWS   rows before going parallel
+    <MODEL>_MAX_JOBS / FOREST_MAX_JOBS                     cap on n_jobs (default: all CPUs)
+"""
+
+import copy
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+DEFAULT_PARALLEL_MIN_ROWS = 1000
+
+
+def _env_int(names, default: Optional[int]) -> Optional[int]:
+    for name in names:
+        value = os.environ.get(name)
+        if value:
+            return int(value)
+    return default
+
+
+class ParallelismPolicy:
+    """Maps batch size and in-flight calls to an ``n_jobs`` value"""
+
+    def __init__(self, min_rows: int = DEFAULT_PARALLEL_MIN_ROWS, max_jobs: Optional[int] = None,
+                 cpu_count: Optional[int] = None):
+        if cpu_count is None:
+            import joblib
+
+            cpu_count = joblib.cpu_count()
+        self.min_rows = max(1, min_rows)
+        self.cpu_count = max(1, cpu_count)
+        self.max_jobs = max(1, min(max_jobs or self.cpu_count, self.cpu_count))
+
+    @classmethod
+    def from_env(cls, model_name: Optional[str] = None) -> "ParallelismPolicy":
+        prefix = [f"{model_name.upper()}_"] if model_name else []
+        return cls(
+            min_rows=_env_int([p + "PARALLEL_MIN_ROWS" for p in prefix] + ["FOREST_PARALLEL_MIN_ROWS"],
+                              DEFAULT_PARALLEL_MIN_ROWS),
+            max_jobs=_env_int([p + "MAX_JOBS" for p in prefix] + ["FOREST_MAX_JOBS"], None)
+        )
+
+    def n_jobs(self, n_rows: int, concurrency: int = 1) -> int:
+        if n_rows < self.min_rows:
+            return 1
+        return max(1, min(self.max_jobs, self.cpu_count // max(1, concurrency)))
+
+
+class AdaptiveParallelModel:
+    """Serves a RandomForestClassifier (or a Pipeline ending in one) with per-call n_jobs"""
+
+    def __init__(self, model: Any, policy: ParallelismPolicy):
+        self.model = model
+        self.policy = policy
+        self.classes_ = model.classes_
+        if hasattr(model, "feature_names_in_"):
+            self.feature_names_in_ = model.feature_names_in_
+        self._variants: Dict[int, Any] = {}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.calls_by_jobs: Dict[int, int] = {}
+
+    def _with_n_jobs(self, n_jobs: int) -> Any:
+        variant = self._variants.get(n_jobs)
+        if variant is None:
+            if hasattr(self.model, "steps"):
+                variant = copy.copy(self.model)
+                name, forest = self.model.steps[-1]
+                forest = copy.copy(forest)
+                forest.n_jobs = n_jobs
+                variant.steps = self.model.steps[:-1] + [(name, forest)]
+            else:
+                variant = copy.copy(self.model)
+                variant.n_jobs = n_jobs
+            self._variants[n_jobs] = variant
+        return variant
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        with self._lock:
+            self._in_flight += 1
+            concurrency = self._in_flight
+        try:
+            n_jobs = self.policy.n_jobs(len(X), concurrency)
+            with self._lock:
+                model = self._with_n_jobs(n_jobs)
+                self.calls_by_jobs[n_jobs] = self.calls_by_jobs.get(n_jobs, 0) + 1
+            return model.predict_proba(X)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
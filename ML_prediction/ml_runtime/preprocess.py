@@ -0,0 +1,226 @@
+"""
+Fused preprocessing kernel
+
+Compiles the fitted ``ColumnTransformer`` built by
+``create_preprocessing_pipeline()`` (StandardScaler on numeric columns,
+dense OneHotEncoder on categorical columns) into precomputed arrays:
+
+- ``mean`` / ``scale`` vectors and the input/output index of every numeric column
+- for every categorical column, its input index, output offset and a
+  category -> output index lookup table
+
+``FusedPreprocessor.transform`` then writes the whole encoded matrix in one
+pass, without the per-transformer dispatch, validation and ``hstack`` of the
+sklearn path. The output is bit-identical to
+``pipeline.named_steps['preprocessor'].transform``.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class UnsupportedPreprocessor(ValueError):
+    """Raised when a fitted transformer cannot be expressed as a fused kernel"""
+
+
+class CategoricalColumn:
+    """Output positions of one one-hot encoded input column"""
+
+    def __init__(self, name: str, input_index: int, offset: int, categories: Sequence[Any],
+                 handle_unknown: str = "ignore"):
+        self.name = name
+        self.input_index = input_index
+        self.offset = offset
+        self.categories = np.asarray(categories)
+        self.handle_unknown = handle_unknown
+        # Numeric categories are located with searchsorted (categories_ is
+        # sorted); anything else goes through a dictionary lookup
+        self.numeric = self.categories.dtype.kind in "biuf"
+        self.lookup = {category: i for i, category in enumerate(self.categories.tolist())}
+
+    def positions(self, values: np.ndarray) -> np.ndarray:
+        """Category index of every value, -1 for unknown values"""
+        if self.numeric:
+            try:
+                values = np.asarray(values, dtype=np.float64)
+            except (TypeError, ValueError):
+                values = np.asarray([self._as_number(v) for v in values], dtype=np.float64)
+            index = np.searchsorted(self.categories, values)
+            clipped = np.minimum(index, len(self.categories) - 1)
+            return np.where(self.categories[clipped] == values, clipped, -1)
+        return np.fromiter((self.lookup.get(v, -1) for v in values), dtype=np.int64, count=len(values))
+
+    @staticmethod
+    def _as_number(value: Any) -> float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return np.nan
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "input_index": self.input_index,
+            "offset": self.offset,
+            "categories": self.categories.tolist(),
+            "handle_unknown": self.handle_unknown
+        }
+
+
+class FusedPreprocessor:
+    """Single-pass equivalent of a fitted scaler + one-hot ColumnTransformer"""
+
+    def __init__(self, feature_names: Sequence[str], n_output: int,
+                 numeric_input: np.ndarray, numeric_output: np.ndarray,
+                 mean: np.ndarray, scale: np.ndarray,
+                 categorical: List[CategoricalColumn],
+                 output_names: Optional[Sequence[str]] = None):
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        self.n_output = n_output
+        self.numeric_input = np.asarray(numeric_input, dtype=np.int64)
+        self.numeric_output = np.asarray(numeric_output, dtype=np.int64)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.categorical = categorical
+        self.output_names = list(output_names) if output_names is not None else None
+
+    @classmethod
+    def from_fitted(cls, fitted: Any) -> "FusedPreprocessor":
+        """
+        Compile a fitted ColumnTransformer, or a Pipeline whose first step
+        (``preprocessor`` in the training scripts) is one
+        """
+        if hasattr(fitted, "named_steps"):
+            fitted = fitted.named_steps.get("preprocessor", fitted.steps[0][1])
+        if not hasattr(fitted, "transformers_"):
+            raise UnsupportedPreprocessor(f"{type(fitted).__name__} is not a fitted ColumnTransformer")
+        if fitted.remainder != "drop" and fitted.remainder is not None:
+            raise UnsupportedPreprocessor("Only remainder='drop' can be fused")
+
+        feature_names = list(fitted.feature_names_in_)
+        column_index = {name: i for i, name in enumerate(feature_names)}
+
+        numeric_input, numeric_output, means, scales = [], [], [], []
+        categorical = []
+        n_output = 0
+
+        for name, transformer, columns in fitted.transformers_:
+            if transformer == "drop" or name == "remainder":
+                continue
+            columns = [feature_names[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+            steps = [step for _, step in getattr(transformer, "steps", [(None, transformer)])]
+            if len(steps) != 1:
+                raise UnsupportedPreprocessor(f"Transformer '{name}' must have exactly one step")
+            step = steps[0]
+
+            if hasattr(step, "scale_") or hasattr(step, "mean_"):
+                width = len(columns)
+                mean = step.mean_ if getattr(step, "with_mean", False) else np.zeros(width)
+                scale = step.scale_ if getattr(step, "with_std", False) else np.ones(width)
+                for j, column in enumerate(columns):
+                    numeric_input.append(column_index[column])
+                    numeric_output.append(n_output + j)
+                means.extend(np.asarray(mean, dtype=np.float64))
+                scales.extend(np.asarray(scale, dtype=np.float64))
+                n_output += width
+
+            elif hasattr(step, "categories_"):
+                if getattr(step, "drop_idx_", None) is not None:
+                    raise UnsupportedPreprocessor(f"OneHotEncoder '{name}' uses drop, which is not fused")
+                if getattr(step, "_infrequent_enabled", False):
+                    raise UnsupportedPreprocessor(f"OneHotEncoder '{name}' groups infrequent categories")
+                if getattr(step, "sparse_output", False):
+                    raise UnsupportedPreprocessor(f"OneHotEncoder '{name}' must produce dense output")
+                for column, categories in zip(columns, step.categories_):
+                    categorical.append(CategoricalColumn(
+                        column, column_index[column], n_output, categories, step.handle_unknown
+                    ))
+                    n_output += len(categories)
+
+            else:
+                raise UnsupportedPreprocessor(f"Transformer '{name}' ({type(step).__name__}) is not supported")
+
+        output_names = None
+        if hasattr(fitted, "get_feature_names_out"):
+            output_names = [str(n) for n in fitted.get_feature_names_out()]
+
+        return cls(feature_names, n_output, numeric_input, numeric_output,
+                   means, scales, categorical, output_names)
+
+    def output_inputs(self) -> np.ndarray:
+        """Input column index that every output column is computed from"""
+        inputs = np.empty(self.n_output, dtype=np.int64)
+        inputs[self.numeric_output] = self.numeric_input
+        for column in self.categorical:
+            inputs[column.offset:column.offset + len(column.categories)] = column.input_index
+        return inputs
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form; floats round-trip exactly through json"""
+        return {
+            "feature_names": [str(n) for n in self.feature_names_in_],
+            "n_output": self.n_output,
+            "numeric_input": self.numeric_input.tolist(),
+            "numeric_output": self.numeric_output.tolist(),
+            "mean": self.mean.tolist(),
+            "scale": self.scale.tolist(),
+            "categorical": [column.to_dict() for column in self.categorical],
+            "output_names": self.output_names
+        }
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> "FusedPreprocessor":
+        return cls(
+            spec["feature_names"], spec["n_output"],
+            spec["numeric_input"], spec["numeric_output"],
+            spec["mean"], spec["scale"],
+            [CategoricalColumn(**column) for column in spec["categorical"]],
+            spec.get("output_names")
+        )
+
+    def _columns(self, X: Any):
+        """Return a column getter over a DataFrame or a 2-D array in feature order"""
+        if hasattr(X, "columns"):
+            missing = [name for name in self.feature_names_in_ if name not in X.columns]
+            if missing:
+                raise ValueError(f"columns are missing: {set(missing)}")
+            names = self.feature_names_in_
+            return len(X), lambda i: X[names[i]].to_numpy()
+
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the preprocessor expects {self.n_features_in_}")
+        return X.shape[0], lambda i: X[:, i]
+
+    def transform(self, X: Any) -> np.ndarray:
+        n_samples, column = self._columns(X)
+        out = np.zeros((n_samples, self.n_output), dtype=np.float64)
+
+        if len(self.numeric_input):
+            if isinstance(X, np.ndarray) and X.dtype.kind in "biuf":
+                numeric = np.asarray(X, dtype=np.float64).reshape(n_samples, -1)[:, self.numeric_input]
+            else:
+                numeric = np.column_stack(
+                    [np.asarray(column(i), dtype=np.float64) for i in self.numeric_input]
+                )
+            numeric -= self.mean
+            numeric /= self.scale
+            out[:, self.numeric_output] = numeric
+
+        rows = np.arange(n_samples)
+        for spec in self.categorical:
+            positions = spec.positions(column(spec.input_index))
+            known = positions >= 0
+            if spec.handle_unknown == "error" and not known.all():
+                unknown = np.asarray(column(spec.input_index))[~known]
+                raise ValueError(f"Found unknown categories {list(unknown)} in column '{spec.name}'")
+            out[rows[known], spec.offset + positions[known]] = 1.0
+
+        return out
+
+    def get_feature_names_out(self) -> np.ndarray:
+        return np.asarray(self.output_names, dtype=object)
@@ -0,0 +1,409 @@
+"""
+Opt-in per-request CPU profiling
+
+A request is profiled when it sends an ``X-Profile`` header (header triggers
+must be enabled, and ``X-Profile-Token`` must match ``PROFILE_TOKEN`` when one
+is set) or when it is picked at random at ``PROFILE_SAMPLE_RATE``. Each
+profile is written to ``PROFILE_DIR`` as:
+
+    <id>.pstats      cProfile statistics (deterministic mode), for pstats or snakeviz
+    <id>.collapsed   "frame;frame;frame weight" lines for flamegraph.pl, inferno or speedscope
+
+and the response carries ``X-Profile-Id`` plus a ``Link`` header pointing at
+both files (served under ``/profiles/<file>``). Only the newest
+``PROFILE_MAX_FILES`` profiles are kept.
+
+Modes (``PROFILE_MODE``, or per request as the ``X-Profile`` value):
+
+- deterministic: cProfile on the threads serving the request. The collapsed
+  stacks are rebuilt from the call graph, weighted in microseconds.
+- sampling: a background thread records the stacks of the serving threads
+  every ``PROFILE_SAMPLE_INTERVAL_MS``, weighted in samples. Much cheaper
+  for slow requests, but it writes collapsed stacks only.
+
+When neither trigger is configured ``RequestProfiler.enabled`` is False and
+the services do not install their hooks at all.
+
+Configuration (environment):
+    PROFILE_HEADER_ENABLED       honour the X-Profile request header (default false)
+    PROFILE_TOKEN                secret X-Profile-Token value required for header triggers and downloads
+    PROFILE_SAMPLE_RATE          share of requests profiled at random (default 0)
+    PROFILE_MODE                 deterministic (default) or sampling
+    PROFILE_SAMPLE_INTERVAL_MS   sampling interval (default 1)
+    PROFILE_DIR                  output directory (default logs/profiles)
+    PROFILE_MAX_FILES            profiles kept before the oldest are deleted (default 100)
+"""
+
+import cProfile
+import functools
+import hmac
+import itertools
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+PROFILE_MODES = ("deterministic", "sampling")
+PROFILE_HEADER = "X-Profile"
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_SUFFIXES = (".pstats", ".collapsed")
+
+# Deepest call path, and smallest share of the profile a path needs to be kept,
+# when rebuilding stacks from cProfile (bounds the walk for long requests)
+MAX_STACK_DEPTH = 128
+MIN_STACK_SHARE = 1e-3
+
+_PROFILE_FILE = re.compile(r"^[\w.-]+\.(pstats|collapsed)$")
+
+# The session of the request being served, so code that hands work to other
+# threads (the backend's inference executor) can profile it there as well
+current_session: ContextVar[Optional["ProfileSession"]] = ContextVar("profile_session", default=None)
+
+# Threads that currently have a cProfile hook; a thread holds one at a time
+_profiled_threads: Set[int] = set()
+_profiled_threads_lock = threading.Lock()
+
+
+def _frame_label(code_file: str, line: int, name: str) -> str:
+    if code_file == "~":
+        # Built-ins are reported as ('~', 0, '<built-in method ...>')
+        label = name.strip("<>")
+    else:
+        label = f"{name} ({os.path.basename(code_file)}:{line})"
+    # ';' separates frames (the weight follows the last space, so spaces are fine)
+    return label.replace(";", ",")
+
+
+def collapse_stats(stats: pstats.Stats) -> Dict[str, int]:
+    """
+    Rebuild collapsed stacks (µs per call path) from cProfile's caller/callee
+    graph. Time on an edge is split across the caller's own paths in
+    proportion, as flameprof and gprof2dot do. Recursion is cut at the first
+    repeated function, and paths below ``MIN_STACK_SHARE`` of the profile are
+    folded into their parent frame.
+    """
+    entries = stats.stats
+    children: Dict[Any, List[Tuple[Any, float]]] = defaultdict(list)
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            if caller in entries:
+                children[caller].append((func, edge[3]))
+    roots = [func for func, (_, _, _, _, callers) in entries.items()
+             if not any(caller in entries for caller in callers)]
+
+    stacks: Counter = Counter()
+    min_seconds = max(1e-6, sum(entries[root][3] for root in roots) * MIN_STACK_SHARE)
+
+    def walk(func: Any, path: List[str], on_path: Set[Any], total: float) -> None:
+        _, _, own, cumulative, _ = entries[func]
+        scale = total / cumulative if cumulative else 0.0
+        path.append(_frame_label(*func))
+        on_path.add(func)
+        # Callees too small (or too deep) to get their own path stay in this frame
+        kept = own * scale
+        for child, edge_cumulative in children.get(func, ()):
+            child_total = edge_cumulative * scale
+            if child in on_path:
+                continue
+            if child_total >= min_seconds and len(path) < MAX_STACK_DEPTH:
+                walk(child, path, on_path, child_total)
+            else:
+                kept += child_total
+        kept_us = int(kept * 1e6)
+        if kept_us > 0:
+            stacks[";".join(path)] += kept_us
+        on_path.discard(func)
+        path.pop()
+
+    for root in roots:
+        walk(root, [], set(), entries[root][3])
+    return dict(stacks)
+
+
+def _thread_stack(frame: Any) -> List[str]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(_frame_label(code.co_filename, frame.f_lineno, code.co_name))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of a set of threads at a fixed interval"""
+
+    def __init__(self, thread_ids: Set[int], interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_ids = thread_ids
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.thread_ids):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    if thread_id not in names:
+                        names = {thread.ident: thread.name for thread in threading.enumerate()}
+                    thread_name = names.get(thread_id, str(thread_id))
+                    self.samples[";".join([thread_name] + _thread_stack(frame))] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+class ProfileSession:
+    """Profiling state of one request"""
+
+    def __init__(self, profile_id: str, mode: str, interval: float):
+        self.id = profile_id
+        self.mode = mode
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.seconds: Optional[float] = None
+        self._profiles: List[cProfile.Profile] = []
+        self._thread_ids: Set[int] = set()
+        self._sampler: Optional[StackSampler] = None
+        self._main: Optional[cProfile.Profile] = None
+        self._main_thread: Optional[int] = None
+
+    def start(self) -> "ProfileSession":
+        thread_id = threading.get_ident()
+        if self.mode == "deterministic":
+            self._main = self._enable(thread_id)
+            if self._main is None:
+                # Another profiled request holds this thread's hook (e.g. the
+                # asyncio loop thread): fall back to sampling
+                self.mode = "sampling"
+            else:
+                self._main_thread = thread_id
+        if self.mode == "sampling":
+            self._thread_ids.add(thread_id)
+            self._sampler = StackSampler(self._thread_ids, self.interval)
+            self._sampler.start()
+        return self
+
+    def _enable(self, thread_id: int) -> Optional[cProfile.Profile]:
+        with _profiled_threads_lock:
+            if thread_id in _profiled_threads or sys.getprofile() is not None:
+                return None
+            _profiled_threads.add(thread_id)
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    @staticmethod
+    def _release(profile: cProfile.Profile, thread_id: int) -> None:
+        profile.disable()
+        with _profiled_threads_lock:
+            _profiled_threads.discard(thread_id)
+
+    def run_in_thread(self, call: Callable[[], Any]) -> Any:
+        """Run ``call`` (on another thread) as part of this request's profile"""
+        thread_id = threading.get_ident()
+        if self.mode == "sampling":
+            self._thread_ids.add(thread_id)
+            try:
+                return call()
+            finally:
+                self._thread_ids.discard(thread_id)
+
+        profile = self._enable(thread_id)
+        if profile is None:
+            return call()
+        try:
+            return call()
+        finally:
+            self._release(profile, thread_id)
+            self._profiles.append(profile)
+
+    def stop(self) -> None:
+        """Stop profiling; safe to call more than once"""
+        if self.seconds is not None:
+            return
+        self.seconds = time.perf_counter() - self.started
+        if self._main is not None:
+            self._release(self._main, self._main_thread)
+            self._profiles.insert(0, self._main)
+        if self._sampler is not None:
+            self._sampler.stop()
+
+    def stats(self) -> Optional[pstats.Stats]:
+        if not self._profiles:
+            return None
+        return pstats.Stats(*self._profiles)
+
+    def collapsed(self) -> Dict[str, int]:
+        if self._sampler is not None:
+            return dict(self._sampler.samples)
+        stats = self.stats()
+        return collapse_stats(stats) if stats else {}
+
+
+class RequestProfiler:
+    """Decides which requests to profile and stores their profiles with rotation"""
+
+    def __init__(self, header_enabled: bool = False, token: Optional[str] = None,
+                 sample_rate: float = 0.0, mode: str = "deterministic",
+                 sample_interval: float = 0.001, profile_dir: str = "logs/profiles",
+                 max_files: int = 100, url_prefix: str = "/profiles"):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}', expected one of {PROFILE_MODES}")
+        self.header_enabled = header_enabled
+        self.token = token or None
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.profile_dir = profile_dir
+        self.max_files = max_files
+        self.url_prefix = url_prefix
+        self.profiled = 0
+        self._sequence = itertools.count(1)
+        self._save_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **overrides: Any) -> "RequestProfiler":
+        settings = dict(
+            header_enabled=os.environ.get("PROFILE_HEADER_ENABLED", "false").lower() == "true",
+            token=os.environ.get("PROFILE_TOKEN"),
+            sample_rate=float(os.environ.get("PROFILE_SAMPLE_RATE", "0")),
+            mode=os.environ.get("PROFILE_MODE", "deterministic").lower(),
+            sample_interval=float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "1")) / 1000,
+            profile_dir=os.environ.get("PROFILE_DIR", "logs/profiles"),
+            max_files=int(os.environ.get("PROFILE_MAX_FILES", "100")),
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    @property
+    def enabled(self) -> bool:
+        return self.header_enabled or self.sample_rate > 0
+
+    def authorized(self, token: Optional[str]) -> bool:
+        return self.token is None or hmac.compare_digest(token or "", self.token)
+
+    def choose(self, header: Optional[str], token: Optional[str]) -> Optional[str]:
+        """The profiling mode for a request, or None to serve it unprofiled"""
+        if header and self.header_enabled and self.authorized(token):
+            header = header.strip().lower()
+            return header if header in PROFILE_MODES else self.mode
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return self.mode
+        return None
+
+    def start(self, mode: str, route: str) -> ProfileSession:
+        slug = re.sub(r"[^\w]+", "-", route).strip("-") or "root"
+        profile_id = f"{datetime.now():%Y%m%dT%H%M%S%f}-{os.getpid()}-{next(self._sequence)}-{slug}"
+        return ProfileSession(profile_id, mode, self.sample_interval).start()
+
+    def response_headers(self, session: ProfileSession) -> List[Tuple[str, str]]:
+        links = ", ".join(
+            f'<{self.url_prefix}/{session.id}{suffix}>; rel="profile"; type="{suffix[1:]}"'
+            for suffix in self.files_for(session)
+        )
+        return [(PROFILE_ID_HEADER, session.id), ("Link", links)]
+
+    @staticmethod
+    def files_for(session: ProfileSession) -> Tuple[str, ...]:
+        return PROFILE_SUFFIXES if session.mode == "deterministic" else (".collapsed",)
+
+    def save(self, session: ProfileSession) -> List[str]:
+        """Write the session's files and delete the oldest profiles beyond the limit"""
+        session.stop()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        written = []
+        stats = session.stats() if session.mode == "deterministic" else None
+        if stats is not None:
+            path = os.path.join(self.profile_dir, session.id + ".pstats")
+            stats.dump_stats(path)
+            written.append(path)
+        path = os.path.join(self.profile_dir, session.id + ".collapsed")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, weight in sorted(session.collapsed().items()):
+                f.write(f"{stack} {weight}\n")
+        written.append(path)
+        with self._save_lock:
+            self.profiled += 1
+            self._rotate()
+        return written
+
+    def _rotate(self) -> None:
+        profile_ids = sorted({
+            name.rsplit(".", 1)[0] for name in os.listdir(self.profile_dir) if _PROFILE_FILE.match(name)
+        })
+        for profile_id in profile_ids[:max(0, len(profile_ids) - self.max_files)]:
+            for suffix in PROFILE_SUFFIXES:
+                try:
+                    os.remove(os.path.join(self.profile_dir, profile_id + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def path_for(self, name: str) -> Optional[str]:
+        """Path of a stored profile file, or None for unknown or unsafe names"""
+        if not _PROFILE_FILE.match(name):
+            return None
+        path = os.path.join(self.profile_dir, name)
+        return path if os.path.isfile(path) else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "header_enabled": self.header_enabled,
+            "token_required": self.token is not None,
+            "sample_rate": self.sample_rate,
+            "mode": self.mode,
+            "profile_dir": self.profile_dir,
+            "max_files": self.max_files,
+            "profiled": self.profiled
+        }
+
+
+def profiled_call(call: Callable[[], Any]) -> Callable[[], Any]:
+    """Wrap a callable about to be handed to a worker thread so the current request's profile covers it"""
+    session = current_session.get()
+    if session is None:
+        return call
+    return functools.partial(session.run_in_thread, call)
+
+
+class ProfilingWSGIMiddleware:
+    """WSGI middleware (the Flask services) profiling selected requests"""
+
+    def __init__(self, app: Callable, profiler: RequestProfiler, path_prefix: str = "/"):
+        self.app = app
+        self.profiler = profiler
+        self.path_prefix = path_prefix
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        path = environ.get("PATH_INFO", "")
+        mode = None
+        if path.startswith(self.path_prefix):
+            mode = self.profiler.choose(environ.get("HTTP_X_PROFILE"), environ.get("HTTP_X_PROFILE_TOKEN"))
+        if mode is None:
+            return self.app(environ, start_response)
+
+        session = self.profiler.start(mode, path)
+        token = current_session.set(session)
+
+        def start_with_links(status, headers, exc_info=None):
+            session.stop()
+            return start_response(status, list(headers) + self.profiler.response_headers(session), exc_info)
+
+        try:
+            return self.app(environ, start_with_links)
+        finally:
+            current_session.reset(token)
+            self.profiler.save(session)
@@ -0,0 +1,291 @@
+"""
+Hot model reload
+
+A ``ModelSlot`` holds the version of a model that is being served and the
+version before it. ``reload()`` loads a candidate alongside the serving one,
+so requests keep being answered, and warms it with canary predictions. It
+then swaps the candidate in by rebinding ``slot.current`` under a lock. A
+request reads ``slot.current`` once when it starts, so requests in flight
+finish on the version they started with. ``rollback()`` swaps the previous
+version back in. That version is still loaded, so a rollback is instant.
+``promote()`` swaps in a version that was loaded elsewhere, such as a canary
+that has proven itself; a rollback undoes it the same way.
+
+``load_with_manifest`` and ``warm_with_canaries`` are the loader and warmup
+for a service that serves ``model.pkl`` through its manifest encoder (the
+Flask apps): the slot then holds ``(model, encoder)`` pairs.
+
+A version ID is the first 12 hex digits of the ``model.pkl`` SHA-256, as
+recorded in the model manifest (``model_version``).
+
+``ModelFileWatcher`` polls the mtime and size of the model files. After a
+change it waits until the files stay the same for a whole poll interval, and
+only then calls back. This way a reload does not start in the middle of a
+training run that is still writing ``model.pkl``, its artifact and its
+manifest. If a reload fails (a manifest that is stale for the new pickle, a
+canary that raises), the serving version is kept. The next change to the
+files triggers another attempt.
+
+Configuration (environment):
+    MODEL_WATCH_INTERVAL_SECONDS   poll the model files this often (default 0: no watcher)
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from .artifact import load_serving_model
+from .manifest import ManifestEncoder, canary_records, check_model, load_manifest, model_version
+
+logger = logging.getLogger(__name__)
+
+
+class ModelVersion:
+    """One loaded version of a model"""
+
+    def __init__(self, version: str, model: Any, load_seconds: float = 0.0, warmup_seconds: float = 0.0):
+        self.version = version
+        self.model = model
+        self.loaded_at = datetime.now().isoformat()
+        self.load_seconds = load_seconds
+        self.warmup_seconds = warmup_seconds
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "load_ms": round(self.load_seconds * 1000, 1),
+            "warmup_ms": round(self.warmup_seconds * 1000, 1)
+        }
+
+
+class ModelSlot:
+    """The serving and previous versions of one model, swapped atomically"""
+
+    def __init__(self, name: str, loader: Callable[[], Tuple[Any, str]],
+                 warmup: Optional[Callable[[Any], Any]] = None,
+                 on_swap: Optional[Callable[[ModelVersion], None]] = None,
+                 log: Optional[logging.Logger] = None):
+        """
+        ``loader`` returns a freshly loaded model and its version ID.
+        ``warmup`` runs canary predictions on a candidate and raises if it is
+        unfit to serve. ``on_swap`` is called with each version that is
+        swapped in, including by a rollback.
+        """
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.on_swap = on_swap
+        self.log = log or logger
+        self.current: Optional[ModelVersion] = None
+        self.previous: Optional[ModelVersion] = None
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.rollbacks = 0
+        self.promotions = 0
+        self.last_reload: Optional[Dict[str, Any]] = None
+        self._reload_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+
+    def _load(self) -> ModelVersion:
+        started = time.perf_counter()
+        model, version = self.loader()
+        loaded = time.perf_counter()
+        if self.warmup is not None:
+            self.warmup(model)
+        return ModelVersion(version, model, loaded - started, time.perf_counter() - loaded)
+
+    def load(self) -> ModelVersion:
+        """Load and serve the initial version; errors propagate"""
+        candidate = self._load()
+        self._swap(candidate)
+        return candidate
+
+    def _swap(self, candidate: ModelVersion) -> None:
+        with self._swap_lock:
+            if self.on_swap is not None:
+                self.on_swap(candidate)
+            self.previous, self.current = self.current, candidate
+
+    @property
+    def reloading(self) -> bool:
+        return self._reload_lock.locked()
+
+    def reload(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Load, warm and swap in the model on disk. An unchanged version is not
+        swapped unless ``force`` is set. A reload already running is not
+        started twice. Failures leave the serving version in place and are
+        reported, not raised.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return {"model": self.name, "status": "in_progress"}
+        try:
+            serving = self.current.version if self.current else None
+            try:
+                candidate = self._load()
+            except Exception as e:
+                self.failed_reloads += 1
+                self.log.error(f"Reloading the {self.name} model failed, still serving {serving}: {e}")
+                result = {"model": self.name, "status": "failed", "version": serving, "error": str(e)}
+            else:
+                if candidate.version == serving and not force:
+                    result = {"model": self.name, "status": "unchanged", "version": serving}
+                else:
+                    self._swap(candidate)
+                    self.reloads += 1
+                    self.log.info(f"Swapped in {self.name} model {candidate.version} (was {serving}), "
+                                  f"loaded in {candidate.load_seconds * 1000:.0f} ms, "
+                                  f"warmed in {candidate.warmup_seconds * 1000:.0f} ms")
+                    result = {"model": self.name, "status": "swapped", "version": candidate.version,
+                              "previous": serving, **candidate.describe()}
+            self.last_reload = dict(result, at=datetime.now().isoformat())
+            return result
+        finally:
+            self._reload_lock.release()
+
+    def reload_in_background(self, force: bool = False) -> bool:
+        """Start ``reload`` on a thread; False if a reload is already running"""
+        if self.reloading:
+            return False
+        threading.Thread(target=self.reload, args=(force,), name=f"reload-{self.name}", daemon=True).start()
+        return True
+
+    def rollback(self) -> Dict[str, Any]:
+        """Serve the previous version again (the current one becomes the previous)"""
+        with self._reload_lock:
+            if self.previous is None:
+                raise LookupError(f"No previous {self.name} model version to roll back to")
+            rolled_back = self.current.version
+            self._swap(self.previous)
+            self.rollbacks += 1
+            self.log.warning(f"Rolled the {self.name} model back from {rolled_back} to {self.current.version}")
+            return {"model": self.name, "status": "rolled_back", "version": self.current.version,
+                    "previous": rolled_back}
+
+    def promote(self, candidate: ModelVersion) -> Dict[str, Any]:
+        """Serve a version that is already loaded and warmed (the current one becomes the previous)"""
+        with self._reload_lock:
+            serving = self.current.version if self.current else None
+            self._swap(candidate)
+            self.promotions += 1
+            self.log.info(f"Promoted {self.name} model {candidate.version} (was {serving})")
+            return {"model": self.name, "status": "promoted", "version": candidate.version, "previous": serving}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "current": self.current.describe() if self.current else None,
+            "previous": self.previous.describe() if self.previous else None,
+            "reloading": self.reloading,
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+            "rollbacks": self.rollbacks,
+            "promotions": self.promotions,
+            "last_reload": self.last_reload
+        }
+
+
+def _signature(paths: Sequence[str]) -> Tuple[Optional[Tuple[int, int]], ...]:
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class ModelFileWatcher:
+    """Calls back once watched files have changed and then stayed unchanged for one interval"""
+
+    def __init__(self, paths: Sequence[str], callback: Callable[[], Any], interval: float = 0.0,
+                 log: Optional[logging.Logger] = None):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.callback = callback
+        self.interval = interval
+        self.log = log or logger
+        self.changes = 0
+        self._seen = _signature(self.paths)
+        self._pending = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, paths: Sequence[str], callback: Callable[[], Any], **overrides: Any) -> "ModelFileWatcher":
+        settings = dict(interval=float(os.environ.get("MODEL_WATCH_INTERVAL_SECONDS", "0")))
+        settings.update(overrides)
+        return cls(paths, callback, **settings)
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def poll(self) -> bool:
+        """One check; True when the callback ran"""
+        signature = _signature(self.paths)
+        if signature == self._seen:
+            self._pending = None
+            return False
+        if signature != self._pending:
+            # Changed since the last poll: wait until it settles
+            self._pending = signature
+            return False
+        self._seen, self._pending = signature, None
+        self.changes += 1
+        self.log.info(f"Model files changed: {', '.join(os.path.basename(path) for path in self.paths)}")
+        try:
+            self.callback()
+        except Exception as e:
+            self.log.error(f"Model reload after a file change failed: {e}")
+        return True
+
+    def ensure_started(self) -> None:
+        """Start the polling thread in this process; a no-op once it runs here (see MemoryWatchdog)"""
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopped = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.poll()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None and self._thread.is_alive() and self._pid == os.getpid(),
+            "interval_seconds": self.interval,
+            "paths": self.paths,
+            "changes": self.changes
+        }
+
+
+def load_with_manifest(model_path: str, name: Optional[str] = None) -> Tuple[Tuple[Any, ManifestEncoder], str]:
+    """``ModelSlot`` loader: the serving model with its manifest encoder, and its version ID"""
+    manifest = load_manifest(model_path)
+    model = load_serving_model(model_path, name=name)
+    check_model(manifest, model)
+    return (model, ManifestEncoder(manifest)), model_version(manifest)
+
+
+def warm_with_canaries(serving: Tuple[Any, ManifestEncoder]) -> None:
+    """``ModelSlot`` warmup: score records spanning the training ranges; raises on bad output"""
+    model, encoder = serving
+    for probability in model.predict_proba(encoder.frame(canary_records(encoder.manifest)))[:, -1]:
+        if not (math.isfinite(probability) and 0.0 <= probability <= 1.0):
+            raise ValueError(f"Canary prediction returned probability {probability}")
@@ -0,0 +1,112 @@
+"""
+Benchmark: per-request vs batch prediction throughput
+
+Scores the same set of records through the per-record ``predict`` path and the
+vectorized ``predict_batch`` path of both predictors and reports rows/sec.
+
+Run from the backend directory:
+    python -m benchmarks.batch_throughput --rows 2000
+"""
+
+import argparse
+import time
+import warnings
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from models.heart_model import HeartDiseasePredictor
+from models.diabetes_model import DiabetesPredictor
+
+warnings.filterwarnings("ignore")
+
+
+def make_heart_records(n: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Generate heart records within the HeartPredictionRequest bounds"""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "age": int(rng.integers(29, 81)),
+            "sex": int(rng.integers(0, 2)),
+            "cp": int(rng.integers(0, 4)),
+            "trestbps": int(rng.integers(90, 181)),
+            "chol": int(rng.integers(150, 351)),
+            "fbs": int(rng.integers(0, 2)),
+            "restecg": int(rng.integers(0, 3)),
+            "thalach": int(rng.integers(90, 201)),
+            "exang": int(rng.integers(0, 2)),
+            "oldpeak": round(float(rng.uniform(0.0, 4.0)), 1),
+            "slope": int(rng.integers(0, 3)),
+            "ca": int(rng.integers(0, 5)),
+            "thal": int(rng.integers(1, 4)),
+        }
+        for _ in range(n)
+    ]
+
+
+def make_diabetes_records(n: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Generate diabetes records within the DiabetesPredictionRequest bounds"""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "pregnancies": int(rng.integers(0, 15)),
+            "glucose": int(rng.integers(70, 200)),
+            "blood_pressure": int(rng.integers(50, 110)),
+            "skin_thickness": int(rng.integers(10, 50)),
+            "insulin": int(rng.integers(0, 300)),
+            "bmi": round(float(rng.uniform(18.0, 45.0)), 1),
+            "diabetes_pedigree": round(float(rng.uniform(0.1, 2.4)), 3),
+            "age": int(rng.integers(20, 80)),
+            "family_history": int(rng.integers(0, 2)),
+            "physical_activity": float(rng.integers(0, 10)),
+            "smoking": int(rng.integers(0, 2)),
+            "alcohol": int(rng.integers(0, 15)),
+        }
+        for _ in range(n)
+    ]
+
+
+def rows_per_second(fn: Callable[[], Any], rows: int) -> float:
+    """Time a callable and return the achieved throughput"""
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    return rows / elapsed
+
+
+def run(rows: int, single_rows: int) -> None:
+    predictors = [
+        ("heart", HeartDiseasePredictor(), make_heart_records),
+        ("diabetes", DiabetesPredictor(), make_diabetes_records),
+    ]
+
+    print(f"{'model':<10} {'path':<12} {'rows':>7} {'rows/sec':>12}")
+    print("-" * 44)
+    for name, predictor, make_records in predictors:
+        single_records = make_records(single_rows)
+        batch_records = make_records(rows)
+
+        # Warm up both paths so one-off allocations are not measured
+        predictor.predict(single_records[0])
+        predictor.predict_batch(batch_records[:10])
+
+        single = rows_per_second(lambda: [predictor.predict(r) for r in single_records], single_rows)
+        batch = rows_per_second(lambda: predictor.predict_batch(batch_records), rows)
+
+        print(f"{name:<10} {'per-request':<12} {single_rows:>7} {single:>12.1f}")
+        print(f"{name:<10} {'batch':<12} {rows:>7} {batch:>12.1f}")
+        print(f"{name:<10} speedup: {batch / single:.1f}x")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-request and batch prediction throughput")
+    parser.add_argument("--rows", type=int, default=2000, help="Records scored by the batch path")
+    parser.add_argument("--single-rows", type=int, default=200, help="Records scored one at a time")
+    args = parser.parse_args()
+
+    run(args.rows, args.single_rows)
+
+
+if __name__ == "__main__":
+    main()
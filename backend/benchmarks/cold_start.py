@@ -0,0 +1,81 @@
+"""
+Benchmark: backend cold start
+
+Starts a fresh uvicorn process for each forest engine, polls /predict/heart
+until it answers and reports the wall time from spawn to the first
+prediction, alongside the server's own /stats/startup breakdown (import,
+per-model load, runtime start).
+
+Run from the backend directory:
+    python -m benchmarks.cold_start --engines sklearn compiled
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.batch_throughput import make_heart_records
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+
+def cold_start(engine: str, port: int, timeout: float) -> Dict[str, Any]:
+    record = make_heart_records(1)[0]
+    env = dict(os.environ, FOREST_ENGINE=engine)
+    spawned = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=10.0) as client:
+            deadline = spawned + timeout
+            while time.perf_counter() < deadline:
+                try:
+                    response = client.post("/predict/heart", json=record)
+                    if response.status_code == 200:
+                        first_prediction = time.perf_counter() - spawned
+                        return {"first_prediction_seconds": first_prediction,
+                                "server": client.get("/stats/startup").json()}
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.01)
+        raise SystemExit(f"❌ {engine}: no prediction within {timeout:.0f}s")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def run(engines: List[str], port: int, repeat: int, timeout: float) -> None:
+    print(f"{'engine':>9} {'first pred s':>13} {'import s':>9} {'heart s':>8} {'diabetes s':>11} "
+          f"{'models s':>9} {'runtime s':>10} {'ready s':>8}")
+    for engine in engines:
+        for _ in range(repeat):
+            result = cold_start(engine, port, timeout)
+            server = result["server"]
+            phases = server["phases_seconds"]
+            print(f"{engine:>9} {result['first_prediction_seconds']:>13.3f} {phases.get('import', 0):>9.3f} "
+                  f"{phases.get('load_heart', 0):>8.3f} {phases.get('load_diabetes', 0):>11.3f} "
+                  f"{phases.get('load_models', 0):>9.3f} {phases.get('start_runtime', 0):>10.3f} "
+                  f"{server['ready_seconds']:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure backend time to first prediction")
+    parser.add_argument("--engines", nargs="+", default=["sklearn", "compiled"])
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--repeat", type=int, default=3, help="Cold starts per engine")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    run(args.engines, args.port, args.repeat, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: pd.read_excel vs the columnar dataset cache
+
+Times loading each bundled dataset with ``pd.read_excel`` and through
+``ml_runtime.dataset.load_dataset`` (first load, which builds the cache, and
+warm loads), and checks that both give the same values. ``--extract-rows``
+adds a synthetic extract of that size, written to a temporary .xlsx, to show
+how the gap grows with file size.
+
+Run from the backend directory:
+    python -m benchmarks.dataset_cache --extract-rows 50000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction'))
+from ml_runtime.dataset import DATASETS, DatasetCache, dataset_path
+
+warnings.filterwarnings("ignore")
+
+
+def best_ms(fn: Callable[[], object], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def compare(label: str, source: str, dtypes: Optional[dict], cache: DatasetCache, repeats: int) -> None:
+    excel_ms = best_ms(lambda: pd.read_excel(source), repeats)
+    start = time.perf_counter()
+    cached = cache.load(source, dtypes)
+    build_ms = (time.perf_counter() - start) * 1000
+    warm_ms = best_ms(lambda: cache.load(source, dtypes), repeats * 5)
+
+    excel = pd.read_excel(source)
+    same = all(
+        np.array_equal(excel[column].astype(object).to_numpy(), cached[column].astype(object).to_numpy())
+        for column in excel.columns
+    )
+    print(f"{label:<24} {len(cached):>8} {excel_ms:>12.1f} {build_ms:>12.1f} {warm_ms:>11.2f} "
+          f"{excel_ms / warm_ms:>8.0f}x {'✅' if same else '❌'}")
+
+
+def run(extract_rows: int, repeats: int) -> None:
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = DatasetCache(cache_dir=cache_dir)
+        print(f"{'dataset':<24} {'rows':>8} {'read_excel':>12} {'first load':>12} {'cached':>11} "
+              f"{'speedup':>9} same")
+        for name, spec in DATASETS.items():
+            compare(name, dataset_path(name), spec["dtypes"], cache, repeats)
+
+        if extract_rows:
+            from benchmarks.workload import WorkloadGenerator
+
+            extract = os.path.join(cache_dir, f"heart_extract_{extract_rows}.xlsx")
+            next(WorkloadGenerator.fit("heart").chunks(extract_rows, extract_rows)).to_excel(extract, index=False)
+            compare("heart extract", extract, None, cache, max(1, repeats // 2))
+        print("(milliseconds, best of the repeats; first load parses the source and writes the cache)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare read_excel with the columnar dataset cache")
+    parser.add_argument("--extract-rows", type=int, default=0, help="Also time a synthetic .xlsx of this many rows")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    run(args.extract_rows, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
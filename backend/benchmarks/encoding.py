@@ -0,0 +1,116 @@
+"""
+Benchmark: pandas vs NumPy feature encoding
+
+Checks that the NumPy encoders built at model load produce bit-identical
+model inputs and probabilities to the pandas reference path
+(``benchmarks.reference``), then reports the
+per-request preprocessing time of both.
+
+Run from the backend directory:
+    python -m benchmarks.encoding --rows 2000
+"""
+
+import argparse
+import logging
+import time
+import warnings
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from models.heart_model import HeartDiseasePredictor
+from models.diabetes_model import DiabetesPredictor
+from benchmarks.batch_throughput import make_heart_records, make_diabetes_records
+from benchmarks.reference import diabetes_frame, heart_frame
+
+warnings.filterwarnings("ignore")
+
+
+def with_text_fields(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Mix in the text forms the diabetes encoder accepts (e.g. smoking='yes')"""
+    activities = ['sedentary', 'low', 'moderate', 'active', 'high']
+    alcohol = ['none', 'light', 'moderate', 'heavy']
+    mixed = []
+    for i, record in enumerate(records):
+        record = dict(record)
+        if i % 3 == 0:
+            record['smoking'] = 'yes' if record['smoking'] else 'no'
+            record['family_history'] = 'Yes' if record['family_history'] else 'No'
+        if i % 5 == 0:
+            record['physical_activity'] = activities[i % len(activities)]
+            record['alcohol'] = alcohol[i % len(alcohol)]
+        mixed.append(record)
+    return mixed
+
+
+def microseconds_per_row(fn: Callable[[Dict[str, Any]], Any], records: List[Dict[str, Any]]) -> float:
+    start = time.perf_counter()
+    for record in records:
+        fn(record)
+    return (time.perf_counter() - start) / len(records) * 1e6
+
+
+def check_heart(predictor: HeartDiseasePredictor, records: List[Dict[str, Any]]) -> None:
+    for record in records:
+        reference = heart_frame(predictor, record).to_numpy()
+        encoded = predictor._model_input(predictor.encoder.encode(record)).to_numpy()
+        assert np.array_equal(reference, encoded), f"heart encoding differs for {record}"
+
+    reference = predictor.model.predict_proba(heart_frame(predictor, records[0]))
+    encoded = predictor.model.predict_proba(predictor._model_input(predictor.encoder.encode(records[0])))
+    assert np.array_equal(reference, encoded), "heart probabilities differ"
+
+
+def check_diabetes(predictor: DiabetesPredictor, records: List[Dict[str, Any]]) -> None:
+    for record in records:
+        reference = diabetes_frame(predictor, record).to_numpy(dtype=np.float64)[0]
+        encoded = predictor.encoder.encode(record)
+        assert np.array_equal(reference, encoded), f"diabetes encoding differs for {record}"
+
+    batch = records[:200]
+    reference = predictor.model.predict_proba(
+        pd.concat([diabetes_frame(predictor, record) for record in batch], ignore_index=True)
+    )
+    encoded = predictor.model.predict_proba(predictor._model_input(predictor.encoder.encode_batch(batch)))
+    assert np.array_equal(reference, encoded), "diabetes probabilities differ"
+
+
+def run(rows: int) -> None:
+    heart = HeartDiseasePredictor()
+    diabetes = DiabetesPredictor()
+    heart_records = make_heart_records(rows)
+    diabetes_records = with_text_fields(make_diabetes_records(rows))
+
+    # Keep the reference path's per-request INFO logging out of the measurement
+    logging.disable(logging.INFO)
+
+    check_heart(heart, heart_records)
+    check_diabetes(diabetes, diabetes_records)
+    print("✅ NumPy encoders are bit-identical to the pandas path")
+    print()
+
+    results = [
+        ("heart", "pandas", microseconds_per_row(lambda r: heart_frame(heart, r), heart_records)),
+        ("heart", "numpy", microseconds_per_row(
+            lambda r: heart.encoder.scale_matrix(heart.encoder.encode(r)), heart_records)),
+        ("diabetes", "pandas", microseconds_per_row(lambda r: diabetes_frame(diabetes, r), diabetes_records)),
+        ("diabetes", "numpy", microseconds_per_row(diabetes.encoder.encode, diabetes_records)),
+    ]
+
+    print(f"{'model':<10} {'path':<8} {'us/request':>12}")
+    print("-" * 32)
+    for name, path, us in results:
+        print(f"{name:<10} {path:<8} {us:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pandas and NumPy feature encoding")
+    parser.add_argument("--rows", type=int, default=2000, help="Records to encode")
+    args = parser.parse_args()
+
+    run(args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark: per-prediction feature attribution
+
+Checks that ``PathExplainer`` (``ml_runtime.explain``) gives the same
+per-field contributions as a reference Saabas walk, which follows every
+tree's ``decision_path`` record by record as treeinterpreter does. The check
+covers every record of both bundled datasets, within 1e-9. It also checks
+that the bias plus the contributions add up to the probability the predictor
+returns. Then reports the time per patient of both, through the predictors'
+``explain_batch`` (encoding included) for the attributions, for several
+batch sizes.
+
+Run from the backend directory:
+    python -m benchmarks.explain --batch-sizes 1 16 256
+"""
+
+import argparse
+import logging
+import time
+import warnings
+from typing import Any, Callable, List
+
+import joblib
+import numpy as np
+
+from benchmarks.rule_engine import dataset_records
+from models.diabetes_model import DiabetesPredictor
+from models.heart_model import HeartDiseasePredictor
+
+warnings.filterwarnings("ignore")
+
+
+def forest_input(predictor: Any, records: List[dict]) -> np.ndarray:
+    """Rows the forest itself sees (after any pipeline preprocessing), as the explainer builds them"""
+    explainer = predictor.explainer
+    if isinstance(predictor, HeartDiseasePredictor):
+        rows = predictor.encoder.scale_matrix(predictor.encoder.encode_batch(records))[:, predictor._model_columns]
+    else:
+        rows = predictor.encoder.encode_batch(records)
+    return explainer.preprocessor.transform(rows) if explainer.preprocessor is not None else rows
+
+
+def sklearn_forest(predictor: Any) -> Any:
+    """The pickled RandomForestClassifier the predictor serves"""
+    model = joblib.load(predictor.model_path)
+    return model.steps[-1][1] if hasattr(model, "steps") else model
+
+
+def reference_contributions(predictor: Any, forest: Any, records: List[dict]) -> np.ndarray:
+    """Saabas contributions from sklearn's decision paths, one tree and one record at a time"""
+    explainer = predictor.explainer
+    group_index = {group: i for i, group in enumerate(explainer.groups)}
+    if isinstance(predictor, HeartDiseasePredictor):
+        input_groups = [predictor.feature_names[i] for i in predictor._model_columns]
+    else:
+        input_groups = predictor.encoder.request_fields
+    input_groups = np.array([group_index[group] for group in input_groups])
+    encoded_groups = (input_groups[explainer.preprocessor.output_inputs()]
+                      if explainer.preprocessor is not None else input_groups)
+
+    X = forest_input(predictor, records).astype(np.float32)
+    contributions = np.zeros((len(records), len(explainer.groups)))
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :]
+        value = (value / value.sum(axis=1, keepdims=True))[:, explainer.class_index]
+        paths = estimator.decision_path(X)
+        for i in range(len(records)):
+            # Node ids grow from the root down, so the sorted path is in walk order
+            path = paths.indices[paths.indptr[i]:paths.indptr[i + 1]]
+            for parent, child in zip(path[:-1], path[1:]):
+                contributions[i, encoded_groups[tree.feature[parent]]] += value[child] - value[parent]
+    return contributions / len(forest.estimators_)
+
+
+def check(name: str, predictor: Any, forest: Any, records: List[dict]) -> None:
+    results = predictor.explain_batch(records)
+    groups = predictor.explainer.groups
+    actual = np.array([
+        [{item["feature"]: item["contribution"] for item in result["contributions"]}[group] for group in groups]
+        for result in results
+    ])
+    diff = float(np.max(np.abs(actual - reference_contributions(predictor, forest, records))))
+    assert diff <= 1e-9, f"{name}: contributions differ from the reference walk by {diff:.1e}"
+
+    predictions = predictor.predict_batch(records)
+    for result, prediction in zip(results, predictions):
+        assert result["prediction"] == prediction["prediction"]
+        assert result["probability"] == prediction["probability"]
+        total = result["base_value"] + sum(item["contribution"] for item in result["contributions"])
+        assert abs(total - result["probability"]) <= 1e-9
+    print(f"✅ {name}: attributions match the reference walk on {len(records)} records "
+          f"(max abs diff {diff:.1e}) and add up to the predicted probability")
+
+
+def milliseconds_per_patient(fn: Callable[[], Any], rows: int, repeats: int = 3) -> float:
+    fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) / rows * 1000
+
+
+def run(batch_sizes: List[int]) -> None:
+    logging.disable(logging.INFO)
+    for name, predictor in (("heart", HeartDiseasePredictor()), ("diabetes", DiabetesPredictor())):
+        records = dataset_records(name)
+        forest = sklearn_forest(predictor)
+        check(name, predictor, forest, records)
+
+        print(f"{'batch':>7} {'reference ms':>14} {'explainer ms':>14} {'speedup':>9}   (per patient)")
+        for size in batch_sizes:
+            batch = (records * (size // len(records) + 1))[:size]
+            reference_ms = milliseconds_per_patient(lambda: reference_contributions(predictor, forest, batch), size)
+            explainer_ms = milliseconds_per_patient(lambda: predictor.explain_batch(batch), size)
+            print(f"{size:>7} {reference_ms:>14.3f} {explainer_ms:>14.3f} {reference_ms / explainer_ms:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time per-prediction feature attributions")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 256],
+                        help="Records explained per call")
+    args = parser.parse_args()
+
+    run(args.batch_sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: sklearn vs compiled RandomForest inference
+
+Validates that the compiled forest reproduces sklearn's probabilities on every
+row of the bundled datasets (within 1e-9) and reports predict_proba latency
+for several batch sizes with both engines.
+
+Run from the backend directory:
+    python -m benchmarks.forest_engine
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+from typing import Any, List, Tuple
+
+import joblib
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction'))
+from ml_runtime.forest import ValidatedModel, compile_model
+
+warnings.filterwarnings("ignore")
+
+ML_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction')
+
+
+def load_models() -> List[Tuple[str, Any, pd.DataFrame]]:
+    """Load both pickled models with the dataset rows they are scored on"""
+    heart = joblib.load(os.path.join(ML_DIR, 'flask-heart', 'model.pkl'))
+    heart_X = pd.read_excel(os.path.join(ML_DIR, 'heart.xlsx')).drop(columns='target')
+
+    diabetes = joblib.load(os.path.join(ML_DIR, 'flask-diabetes', 'model.pkl'))
+    diabetes_df = pd.read_excel(os.path.join(ML_DIR, 'enhanced_diabetes_dataset.xlsx')).drop(columns='Outcome')
+    diabetes_X = pd.get_dummies(diabetes_df).reindex(columns=diabetes.feature_names_in_, fill_value=0).astype(float)
+
+    return [("heart", heart, heart_X), ("diabetes", diabetes, diabetes_X)]
+
+
+def milliseconds(fn, X, repeat: int) -> float:
+    fn(X)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(X)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(batch_sizes: List[int], repeat: int) -> None:
+    for name, model, X in load_models():
+        compiled = compile_model(model)
+
+        validated = ValidatedModel(model, compiled)
+        validated.predict_proba(X)
+        print(f"✅ {name}: compiled forest matches sklearn on {len(X)} rows "
+              f"(max abs diff {validated.max_abs_diff:.1e})")
+
+        print(f"{'rows':>7} {'sklearn ms':>12} {'compiled ms':>12} {'speedup':>8}")
+        for size in batch_sizes:
+            batch = X.sample(n=size, replace=True, random_state=0)
+            sklearn_ms = milliseconds(model.predict_proba, batch, repeat)
+            compiled_ms = milliseconds(compiled.predict_proba, batch, repeat)
+            print(f"{size:>7} {sklearn_ms:>12.2f} {compiled_ms:>12.2f} {sklearn_ms / compiled_ms:>7.1f}x")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sklearn and compiled forest inference")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=10, help="Timed calls per batch size")
+    args = parser.parse_args()
+
+    run(args.batch_sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: RandomForest n_jobs crossover
+
+Times sklearn predict_proba at several batch sizes with n_jobs=1 and with
+parallel n_jobs values, reports the smallest batch where parallel scoring
+wins (the value to use for <MODEL>_PARALLEL_MIN_ROWS), and compares
+concurrent single-row requests under the pickled n_jobs=-1 setting with the
+adaptive policy.
+
+Run from the backend directory:
+    python -m benchmarks.forest_parallelism
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import joblib
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction'))
+from ml_runtime.parallel import AdaptiveParallelModel, ParallelismPolicy
+
+from benchmarks.forest_engine import load_models, milliseconds
+
+warnings.filterwarnings("ignore")
+
+
+# Parallel scoring must beat n_jobs=1 by this factor to count as a win
+MIN_SPEEDUP = 1.1
+
+
+def crossover(model, X, batch_sizes: List[int], job_counts: List[int], repeat: int) -> Optional[int]:
+    # n_jobs=-1 resolves to the CPU count; drop values that collapse onto another
+    job_counts = list(dict.fromkeys(joblib.effective_n_jobs(n) for n in job_counts))
+    adaptive = AdaptiveParallelModel(model, ParallelismPolicy(min_rows=1, cpu_count=max(job_counts)))
+    header = " ".join(f"{f'n_jobs={n} ms':>13}" for n in job_counts)
+    print(f"{'rows':>7} {header}")
+
+    found = None
+    for size in batch_sizes:
+        batch = X.sample(n=size, replace=True, random_state=0)
+        runs = max(1, repeat if size < 10000 else repeat // 5)
+        timings = [milliseconds(adaptive._with_n_jobs(n).predict_proba, batch, runs) for n in job_counts]
+        print(f"{size:>7} " + " ".join(f"{t:>13.2f}" for t in timings))
+        if found is None and len(timings) > 1 and min(timings[1:]) * MIN_SPEEDUP < timings[0]:
+            found = size
+    return found
+
+
+def concurrent_singles(model, X, clients: int, requests: int) -> float:
+    rows = [X.iloc[[i % len(X)]] for i in range(requests)]
+    model.predict_proba(rows[0])
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(model.predict_proba, rows))
+    return requests / (time.perf_counter() - start)
+
+
+def run(batch_sizes: List[int], job_counts: List[int], repeat: int, clients: int, requests: int) -> None:
+    print(f"CPUs available: {joblib.cpu_count()}\n")
+    for name, model, X in load_models():
+        print(f"{name}:")
+        found = crossover(model, X, batch_sizes, job_counts, repeat)
+        if found is None:
+            print(f"➡️  parallel scoring never beat n_jobs=1 by {MIN_SPEEDUP:.1f}x here; keep {name.upper()}_PARALLEL_MIN_ROWS "
+                  f"above {batch_sizes[-1]}")
+        else:
+            print(f"➡️  parallel scoring is {MIN_SPEEDUP:.1f}x faster from {found} rows; set {name.upper()}_PARALLEL_MIN_ROWS={found}")
+
+        pickled = AdaptiveParallelModel(model, ParallelismPolicy(min_rows=1, cpu_count=max(job_counts)))._with_n_jobs(-1)
+        adaptive = AdaptiveParallelModel(model, ParallelismPolicy.from_env(name))
+        print(f"{clients} concurrent clients, single rows: "
+              f"n_jobs=-1 {concurrent_singles(pickled, X, clients, requests):.0f} req/s, "
+              f"adaptive {concurrent_singles(adaptive, X, clients, requests):.0f} req/s\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the n_jobs crossover for RandomForest inference")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000, 50000])
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, -1],
+                        help="n_jobs values to compare; the first must be 1")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed calls per batch size")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400)
+    args = parser.parse_args()
+
+    run(args.batch_sizes, args.jobs, args.repeat, args.clients, args.requests)
+
+
+if __name__ == "__main__":
+    main()
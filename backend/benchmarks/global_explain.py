@@ -0,0 +1,107 @@
+"""
+Benchmark: global explanations
+
+Checks that the partial dependence ``ml_runtime.global_explain`` computes
+equals ``sklearn.inspection.partial_dependence`` (brute method) on the same
+grids, for every feature and a few feature pairs of both bundled models,
+within 1e-12. Then reports the time to compute the full set of global
+explanations (permutation importance, one-way and two-way partial dependence)
+with one and with all worker processes, and the time to read the stored file,
+which is all serving does once per model hash.
+
+Run from the backend directory:
+    python -m benchmarks.global_explain --jobs 1 -1
+"""
+
+import argparse
+import itertools
+import logging
+import time
+import warnings
+from typing import Any, List
+
+import joblib
+import numpy as np
+
+from models.diabetes_model import DiabetesPredictor
+from models.heart_model import HeartDiseasePredictor
+# ml_runtime is on the path once the predictors are imported
+from ml_runtime.dataset import load_dataset
+from ml_runtime.global_explain import (
+    _Scorer, _partial_dependence, compute_global_explanations, feature_grid, load_global_explanations
+)
+from ml_runtime.manifest import ManifestEncoder, load_manifest
+
+warnings.filterwarnings("ignore")
+
+CHECKED_PAIRS = 3
+
+
+def check(name: str, model_path: str) -> None:
+    from sklearn.inspection import partial_dependence
+
+    manifest = load_manifest(model_path)
+    model = joblib.load(model_path)
+    features = {feature["name"]: feature for feature in manifest["raw_features"]}
+    frame = load_dataset(manifest["dataset"]["name"])[list(features)].reset_index(drop=True)
+    scorer = _Scorer(model, manifest, 1)
+    # sklearn refuses integer columns it would have to set to grid values
+    X = ManifestEncoder(manifest).encode_frame(frame)
+    X = X.astype({column: np.float64 for column in X.columns if X[column].dtype.kind in "iu"})
+
+    one_way = [((feature,), 20) for feature in features if feature in X.columns]
+    pairs = [(pair, 10) for pair in itertools.combinations(
+        [feature for feature in features if feature in X.columns], 2)][:CHECKED_PAIRS]
+    diff = 0.0
+    for selected, resolution in one_way + pairs:
+        grids = tuple(feature_grid(frame[feature], features[feature], resolution) for feature in selected)
+        actual = np.array(_partial_dependence(scorer, frame, selected, grids)["average"])
+        expected = partial_dependence(
+            model, X, list(selected), kind="average", method="brute",
+            custom_values={feature: np.array(grid, dtype=np.float64) for feature, grid in zip(selected, grids)}
+        )["average"][0]
+        diff = max(diff, float(np.max(np.abs(actual - expected))))
+    assert diff <= 1e-12, f"{name}: partial dependence differs from sklearn by {diff:.1e}"
+    print(f"✅ {name}: partial dependence of {len(one_way)} features and {len(pairs)} pairs matches "
+          f"sklearn.inspection (max abs diff {diff:.1e})")
+
+
+def seconds(fn, repeats: int = 1) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(jobs: List[int]) -> None:
+    logging.disable(logging.INFO)
+    for name, predictor in (("heart", HeartDiseasePredictor()), ("diabetes", DiabetesPredictor())):
+        check(name, predictor.model_path)
+
+        manifest = load_manifest(predictor.model_path)
+        model: Any = joblib.load(predictor.model_path)
+        frame = load_dataset(manifest["dataset"]["name"])
+        for n_jobs in jobs:
+            elapsed = seconds(lambda: compute_global_explanations(
+                model, manifest, frame, frame[manifest["target"]], "benchmark", n_jobs=n_jobs))
+            print(f"   compute, n_jobs={n_jobs:>2}: {elapsed:8.2f} s")
+        if load_global_explanations(predictor.model_path, predictor.model_sha256) is None:
+            print("   no current global_explanations.json to read")
+        else:
+            elapsed = seconds(lambda: load_global_explanations(predictor.model_path, predictor.model_sha256), 5)
+            print(f"   read stored file:  {elapsed * 1000:8.2f} ms (once per model hash)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time the global explanations")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, -1],
+                        help="Worker processes to compute with (-1: all cores)")
+    args = parser.parse_args()
+
+    run(args.jobs)
+
+
+if __name__ == "__main__":
+    main()
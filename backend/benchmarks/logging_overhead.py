@@ -0,0 +1,165 @@
+"""
+Benchmark: request-thread cost of prediction logging
+
+Compares the previous setup against the queue-based pipeline:
+
+- previous: ``logging.basicConfig`` FileHandler + StreamHandler in text
+  format, two INFO records per request carrying the full request and result
+- pipeline: DroppingQueueHandler + batching writer thread, one JSON record
+  per request, full payloads for 1% of requests
+
+It reports the logging calls alone (µs per request on the calling thread)
+and end-to-end /predict/heart latency through the ASGI app in-process, with
+the app in ``LOG_MODE=sync LOG_FORMAT=text LOG_PAYLOAD_SAMPLE_RATE=1``
+(closest to the previous behaviour) versus its defaults.
+
+Run from the backend directory:
+    python -m benchmarks.logging_overhead
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.batch_throughput import make_heart_records
+from observability.log_pipeline import LogPipeline, PayloadSampler, TEXT_FORMAT
+
+warnings.filterwarnings("ignore")
+
+SAMPLE_RESULT = {
+    "prediction": 1, "probability": 0.54, "risk_level": "Moderate Risk", "confidence": 0.54,
+    "recommendations": ["🏥 Consult a cardiologist immediately for comprehensive evaluation"] * 8,
+    "risk_factors": ["Advanced age (>55 years)", "Male gender", "High blood pressure"],
+    "timestamp": "2026-01-01T00:00:00"
+}
+
+# Settings that reproduce the previous logging behaviour in main.py
+PREVIOUS_ENV = {"LOG_MODE": "sync", "LOG_FORMAT": "text", "LOG_PAYLOAD_SAMPLE_RATE": "1"}
+
+
+def _reset_root() -> None:
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def time_previous(records: List[Dict[str, Any]], log_file: str, console) -> float:
+    _reset_root()
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    for handler in (logging.FileHandler(log_file, encoding="utf-8"), logging.StreamHandler(console)):
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(handler)
+    logger = logging.getLogger("main")
+
+    start = time.perf_counter()
+    for record in records:
+        logger.info(f"Received heart disease prediction request: {record}")
+        logger.info(f"Heart disease prediction result: {SAMPLE_RESULT}")
+    elapsed = time.perf_counter() - start
+    _reset_root()
+    return elapsed / len(records) * 1e6
+
+
+def time_pipeline(records: List[Dict[str, Any]], log_file: str, console) -> float:
+    _reset_root()
+    pipeline = LogPipeline(log_file=log_file, console=False).start()
+    # Console output goes through the writer thread like the file
+    from observability.log_pipeline import TextFormatter, _Sink
+    pipeline.writer.sinks.append(_Sink(console, TextFormatter()))
+    sampler = PayloadSampler(0.01)
+    logger = logging.getLogger("main")
+
+    start = time.perf_counter()
+    for record in records:
+        fields = {"route": "/predict/heart", "model": "heart", "prediction": 1,
+                  "probability": 0.54, "risk_level": "Moderate Risk"}
+        if sampler.sample("/predict/heart"):
+            fields["request"] = record
+            fields["result"] = SAMPLE_RESULT
+        logger.info("Prediction served", extra={"fields": fields})
+    elapsed = time.perf_counter() - start
+    pipeline.stop()
+    return elapsed / len(records) * 1e6
+
+
+async def _end_to_end(requests: int) -> Dict[str, float]:
+    import httpx
+    import main
+
+    await main.startup_event()
+    records = make_heart_records(requests, seed=7)
+    latencies = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for record in records[:20]:
+            await client.post("/predict/heart", json=record)
+        for record in records:
+            start = time.perf_counter()
+            response = await client.post("/predict/heart", json=record)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+    await main.shutdown_event()
+    ms = np.array(latencies) * 1000
+    return {"mean_ms": float(ms.mean()), "p50_ms": float(np.percentile(ms, 50)),
+            "p99_ms": float(np.percentile(ms, 99))}
+
+
+def end_to_end(env: Dict[str, str], requests: int, log_dir: str) -> Dict[str, float]:
+    child_env = dict(os.environ, FOREST_ENGINE="compiled", PREDICTION_CACHE_SIZE="0",
+                     MICROBATCH_ENABLED="false", LOG_FILE=os.path.join(log_dir, "e2e.log"), **env)
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-m", "benchmarks.logging_overhead", "--child", str(requests)],
+        cwd=os.path.join(os.path.dirname(__file__), '..'), env=child_env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(requests: int, e2e_requests: int) -> None:
+    records = make_heart_records(requests)
+    with tempfile.TemporaryDirectory() as log_dir, open(os.devnull, "w") as console:
+        previous_us = time_previous(records, os.path.join(log_dir, "previous.log"), console)
+        pipeline_us = time_pipeline(records, os.path.join(log_dir, "pipeline.log"), console)
+        print(f"Logging calls on the request thread ({requests} requests):")
+        print(f"  previous (sync file + console, full payloads): {previous_us:8.1f} µs/request")
+        print(f"  pipeline (queue + batched writer, 1% sampled): {pipeline_us:8.1f} µs/request")
+        print(f"  ✅ {previous_us / pipeline_us:.1f}x less time spent logging per request\n")
+
+        previous = end_to_end(PREVIOUS_ENV, e2e_requests, log_dir)
+        pipeline = end_to_end({}, e2e_requests, log_dir)
+        print(f"End-to-end /predict/heart in-process ({e2e_requests} sequential requests, compiled engine):")
+        print(f"{'':>10} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, result in (("previous", previous), ("pipeline", pipeline)):
+            print(f"{name:>10} {result['mean_ms']:>8.3f} {result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure prediction logging overhead")
+    parser.add_argument("--requests", type=int, default=20000, help="Requests for the logging-only timing")
+    parser.add_argument("--e2e-requests", type=int, default=1000, help="Requests for the end-to-end timing")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Keep the app's console output away from the JSON result on stdout
+        sys.stderr = open(os.devnull, "w")
+        print(json.dumps(asyncio.run(_end_to_end(args.child))))
+        return
+
+    run(args.requests, args.e2e_requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark: cost of the /metrics instrumentation per prediction request
+
+Times the instrumentation a single /predict/heart request performs (three
+request-stage and three model-stage observations, the request histogram,
+two counters, the timer reads and the middleware's context variable and send
+wrapper) in isolation, and compares it with the
+mean end-to-end request time through the ASGI app in-process. The share must
+stay under 1%.
+
+Run from the backend directory:
+    python -m benchmarks.metrics_overhead
+"""
+
+import argparse
+import asyncio
+import time
+import warnings
+from typing import Dict
+
+import httpx
+import numpy as np
+
+from benchmarks.batch_throughput import make_heart_records
+from observability.metrics import MetricsRegistry, PredictionTimingMiddleware, RequestTiming
+
+warnings.filterwarnings("ignore")
+
+MAX_OVERHEAD = 0.01
+
+
+def instrumentation_us(iterations: int) -> float:
+    """Microseconds of metrics work done for one single prediction"""
+    registry = MetricsRegistry()
+    middleware = PredictionTimingMiddleware(None, {"/predict/heart": "heart"}, registry)
+    stage_seconds = {
+        stage: registry.histogram("prediction_model_stage_seconds", model="heart", stage=stage)
+        for stage in ("encode", "predict_proba", "postprocess")
+    }
+    perf_counter = time.perf_counter
+
+    start = perf_counter()
+    for _ in range(iterations):
+        timing = RequestTiming(perf_counter())
+        timing.handler_started = perf_counter()
+        # Predictor stages, as in HeartDiseasePredictor.predict
+        started = perf_counter()
+        encoded = perf_counter()
+        stage_seconds["encode"].observe(encoded - started)
+        stage_seconds["predict_proba"].observe(perf_counter() - encoded)
+        postprocess_started = perf_counter()
+        stage_seconds["postprocess"].observe(perf_counter() - postprocess_started)
+        registry.inc("prediction_risk_level_total", model="heart", risk_level="Moderate Risk")
+        timing.inference_finished = perf_counter()
+        timing.response_started = perf_counter()
+        middleware._record("/predict/heart", "heart", timing, 200)
+    return (perf_counter() - start) / iterations * 1e6
+
+
+async def dispatch_us(iterations: int) -> float:
+    """Microseconds the ASGI middleware adds around a trivial app (context variable and send wrapper)"""
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "path": "/predict/heart"}
+    middleware = PredictionTimingMiddleware(app, {"/predict/heart": "heart"}, MetricsRegistry())
+    elapsed = {}
+    for name, target in (("bare", app), ("middleware", middleware)):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await target(scope, None, send)
+        elapsed[name] = time.perf_counter() - start
+    return max(elapsed["middleware"] - elapsed["bare"], 0.0) / iterations * 1e6
+
+
+async def request_ms(requests: int) -> Dict[str, float]:
+    import main
+
+    await main.startup_event()
+    records = make_heart_records(requests, seed=11)
+    latencies = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for record in records[:20]:
+            await client.post("/predict/heart", json=record)
+        for record in records:
+            start = time.perf_counter()
+            response = await client.post("/predict/heart", json=record)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+    await main.shutdown_event()
+    ms = np.array(latencies) * 1000
+    return {"mean_ms": float(ms.mean()), "p50_ms": float(np.percentile(ms, 50))}
+
+
+def run(iterations: int, requests: int) -> None:
+    # The middleware's own recording is part of instrumentation_us, so this double counts it slightly
+    overhead_us = instrumentation_us(iterations) + asyncio.run(dispatch_us(iterations))
+    latency = asyncio.run(request_ms(requests))
+    share = overhead_us / (latency["mean_ms"] * 1000)
+    print(f"Instrumentation per request:      {overhead_us:8.2f} µs")
+    print(f"Mean /predict/heart request time: {latency['mean_ms'] * 1000:8.1f} µs "
+          f"(p50 {latency['p50_ms'] * 1000:.1f} µs, {requests} sequential requests)")
+    marker = "✅" if share < MAX_OVERHEAD else "❌"
+    print(f"{marker} Measurement overhead: {share:.3%} of request time (limit {MAX_OVERHEAD:.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-request cost of the metrics instrumentation")
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    run(args.iterations, args.requests)
+
+
+if __name__ == "__main__":
+    main()
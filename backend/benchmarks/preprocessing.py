@@ -0,0 +1,73 @@
+"""
+Benchmark: sklearn ColumnTransformer vs fused preprocessing kernel
+
+Checks that the fused kernel reproduces ``pipeline.named_steps['preprocessor']
+.transform`` bit for bit and reports transform latency for 1, 100 and
+100k rows. The fused kernel is timed on both DataFrame input and NumPy rows
+in training column order (what the backend heart predictor passes it).
+
+Run from the backend directory:
+    python -m benchmarks.preprocessing
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+from typing import List
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction'))
+from ml_runtime.preprocess import FusedPreprocessor
+
+warnings.filterwarnings("ignore")
+
+ML_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction')
+
+
+def milliseconds(fn, X, repeat: int) -> float:
+    fn(X)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(X)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(batch_sizes: List[int], repeat: int) -> None:
+    pipeline = joblib.load(os.path.join(ML_DIR, 'flask-heart', 'model.pkl'))
+    preprocessor = pipeline.named_steps['preprocessor']
+    fused = FusedPreprocessor.from_fitted(pipeline)
+    X = pd.read_excel(os.path.join(ML_DIR, 'heart.xlsx')).drop(columns='target')
+    X = X[list(preprocessor.feature_names_in_)]
+
+    if not np.array_equal(fused.transform(X), preprocessor.transform(X)):
+        raise SystemExit("❌ Fused kernel output differs from the ColumnTransformer")
+    print(f"✅ heart: fused kernel matches the ColumnTransformer bit for bit on {len(X)} rows")
+
+    print(f"{'rows':>7} {'sklearn ms':>12} {'fused df ms':>12} {'fused np ms':>12} {'speedup':>8}")
+    for size in batch_sizes:
+        batch = X.sample(n=size, replace=True, random_state=0)
+        rows = batch.to_numpy(dtype=np.float64)
+        runs = max(1, repeat if size < 10000 else repeat // 10)
+        sklearn_ms = milliseconds(preprocessor.transform, batch, runs)
+        fused_df_ms = milliseconds(fused.transform, batch, runs)
+        fused_np_ms = milliseconds(fused.transform, rows, runs)
+        print(f"{size:>7} {sklearn_ms:>12.3f} {fused_df_ms:>12.3f} {fused_np_ms:>12.3f} "
+              f"{sklearn_ms / fused_np_ms:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ColumnTransformer and fused preprocessing")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 100000])
+    parser.add_argument("--repeat", type=int, default=100, help="Timed calls per batch size")
+    args = parser.parse_args()
+
+    run(args.batch_sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Reference implementations
+
+The original pandas code paths that the predictors' NumPy encoders replaced.
+The predictors no longer carry them; the benchmarks time the encoders
+against them and the tests in ``backend/tests`` check that both give the
+same results.
+"""
+
+from typing import Any, Dict, List
+
+import pandas as pd
+
+
+def heart_frame(predictor: Any, input_data: Dict[str, Any]) -> pd.DataFrame:
+    """Scaled model input for one heart request, built with pandas"""
+    # Create DataFrame with correct feature order
+    df = pd.DataFrame([input_data])
+
+    # Ensure all required features are present
+    for feature in predictor.feature_names:
+        if feature not in df.columns:
+            raise ValueError(f"Missing required feature: {feature}")
+
+    # Select only the required features in correct order
+    df = df[predictor.feature_names]
+
+    # Apply scaling if scaler is available
+    if predictor.scaler:
+        return pd.DataFrame(predictor.scaler.transform(df), columns=predictor.feature_names)
+    return df
+
+
+def diabetes_features(predictor: Any, input_data: Dict[str, Any]) -> List[Any]:
+    """Feature values for one diabetes request, in the model's input column order"""
+    # Initialize feature vector with default values
+    features = {
+        'Pregnancies': 0,
+        'Glucose': 100,
+        'BloodPressure': 80,
+        'SkinThickness': 20,
+        'Insulin': 0,
+        'BMI': 25.0,
+        'DiabetesPedigreeFunction': 0.5,
+        'Age': 25,
+        'PhysicalActivity': 5,  # Default moderate activity
+        'AlcoholConsumption': 0,  # Default no alcohol
+        'FamilyHistory_No': 1,
+        'FamilyHistory_Yes': 0,
+        'SmokingStatus_Non-Smoker': 1,
+        'SmokingStatus_Smoker': 0
+    }
+
+    # Map input field names to model feature names
+    field_mapping = {
+        'pregnancies': 'Pregnancies',
+        'glucose': 'Glucose',
+        'blood_pressure': 'BloodPressure',
+        'skin_thickness': 'SkinThickness',
+        'insulin': 'Insulin',
+        'bmi': 'BMI',
+        'diabetes_pedigree': 'DiabetesPedigreeFunction',
+        'age': 'Age'
+    }
+
+    # Update numerical features
+    for input_key, model_key in field_mapping.items():
+        if input_key in input_data:
+            features[model_key] = float(input_data[input_key])
+
+    # Physical Activity - convert text to number if needed
+    if 'physical_activity' in input_data:
+        activity = input_data['physical_activity']
+        if isinstance(activity, str):
+            activity_map = {
+                'sedentary': 0, 'low': 2, 'light': 2,
+                'moderate': 5, 'active': 7, 'high': 9
+            }
+            features['PhysicalActivity'] = activity_map.get(activity.lower(), 5)
+        else:
+            features['PhysicalActivity'] = int(activity)
+
+    # Alcohol Consumption - convert text to number if needed
+    if 'alcohol' in input_data:
+        alcohol = input_data['alcohol']
+        if isinstance(alcohol, str):
+            alcohol_map = {
+                'none': 0, 'light': 3, 'moderate': 7, 'heavy': 12
+            }
+            features['AlcoholConsumption'] = alcohol_map.get(alcohol.lower(), 0)
+        else:
+            features['AlcoholConsumption'] = int(alcohol)
+
+    # Family History - one-hot encoding
+    if 'family_history' in input_data:
+        has_family_history = input_data['family_history']
+        if isinstance(has_family_history, str):
+            has_family_history = has_family_history.lower() in ['yes', 'true', '1']
+        else:
+            has_family_history = bool(int(has_family_history))
+
+        features['FamilyHistory_Yes'] = 1 if has_family_history else 0
+        features['FamilyHistory_No'] = 0 if has_family_history else 1
+
+    # Smoking Status - one-hot encoding
+    if 'smoking' in input_data:
+        is_smoker = input_data['smoking']
+        if isinstance(is_smoker, str):
+            is_smoker = is_smoker.lower() in ['smoker', 'yes', 'true', '1', 'current']
+        else:
+            is_smoker = bool(int(is_smoker))
+
+        features['SmokingStatus_Smoker'] = 1 if is_smoker else 0
+        features['SmokingStatus_Non-Smoker'] = 0 if is_smoker else 1
+
+    return [features[feat] for feat in predictor.expected_features]
+
+
+def diabetes_frame(predictor: Any, input_data: Dict[str, Any]) -> pd.DataFrame:
+    """Model input for one diabetes request, built with pandas"""
+    return pd.DataFrame([diabetes_features(predictor, input_data)], columns=predictor.expected_features)
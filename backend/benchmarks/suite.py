@@ -0,0 +1,478 @@
+"""
+Benchmark suite: predictor micro-benchmarks and HTTP load tests
+
+Writes JSON results that can be compared across commits:
+
+- micro: the predictor classes in-process. Reports per-call latency
+  percentiles and rows/sec for ``predict`` and for ``predict_batch`` at
+  several batch sizes.
+- load: the FastAPI app (in-process through ASGI, or a localhost uvicorn) and
+  both Flask services (localhost), driven by an async client with pooled
+  keep-alive connections. It runs either:
+    - closed loop: ``--concurrency`` clients send back to back
+    - open loop: requests arrive at ``--rate`` per second (Poisson or
+      constant), whether or not earlier ones have finished. Latency counts
+      from the scheduled send time, so queueing in the client pool or the
+      server is not hidden (no coordinated omission).
+- compare: p50/p99 latency, throughput and error rate of two result files
+  side by side.
+
+Each run records the git commit, interpreter, CPU count and the serving
+environment (FOREST_ENGINE, cache, batching, ...) with its results. Workloads
+are seeded, and by default fitted to the bundled datasets
+(``benchmarks.workload``). Servers the suite starts get ``PREDICTION_CACHE_SIZE=0`` unless it
+is set, so repeated records measure the model rather than the cache.
+
+Run from the backend directory:
+    python -m benchmarks.suite micro --output micro.json
+    python -m benchmarks.suite load --targets fastapi flask-heart --concurrency 16 --duration 10
+    python -m benchmarks.suite load --targets fastapi --rate 200 --duration 10 --output open.json
+    python -m benchmarks.suite all --output results.json
+    python -m benchmarks.suite compare before.json after.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import warnings
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from benchmarks.batch_throughput import make_diabetes_records, make_heart_records
+from benchmarks.workload import WorkloadGenerator
+
+warnings.filterwarnings("ignore")
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ML_DIR = os.path.abspath(os.path.join(BACKEND_DIR, '..', 'ML_prediction'))
+
+RECORD_FACTORIES = {"heart": make_heart_records, "diabetes": make_diabetes_records}
+WORKLOADS = ("fitted", "uniform")
+
+# Services the load test can drive; "command" servers are started on a free localhost port
+TARGETS: Dict[str, Dict[str, Any]] = {
+    "fastapi": {
+        "cwd": BACKEND_DIR,
+        "command": lambda port: [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app",
+                                 "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        "port_env": None,
+        "routes": {"heart": "/predict/heart", "diabetes": "/predict/diabetes"},
+    },
+    "flask-heart": {
+        "cwd": os.path.join(ML_DIR, "flask-heart"),
+        "command": lambda port: [sys.executable, "-W", "ignore", "app.py"],
+        "port_env": "FLASK_HEART_PORT",
+        "routes": {"heart": "/predict"},
+    },
+    "flask-diabetes": {
+        "cwd": os.path.join(ML_DIR, "flask-diabetes"),
+        "command": lambda port: [sys.executable, "-W", "ignore", "app.py"],
+        "port_env": "FLASK_DIABETES_PORT",
+        "routes": {"diabetes": "/predict"},
+    },
+}
+
+# Environment that changes serving performance, recorded with every run
+RECORDED_ENV_PREFIXES = ("FOREST_", "PREDICTION_CACHE_", "MICROBATCH_", "INFERENCE_", "HEART_", "DIABETES_",
+                         "SERVE_", "LOG_", "PROFILE_", "MEMORY_")
+
+
+# ---------------------------------------------------------------- results
+
+def summarize(latencies: List[float], statuses: List[Optional[int]], elapsed: float) -> Dict[str, Any]:
+    """Latency percentiles, throughput and error rate of one run (latencies in seconds)"""
+    ok = [latency for latency, status in zip(latencies, statuses) if status is not None and status < 400]
+    status_counts: Dict[str, int] = {}
+    for status in statuses:
+        key = str(status) if status is not None else "exception"
+        status_counts[key] = status_counts.get(key, 0) + 1
+    ms = np.array(ok) * 1000 if ok else np.zeros(0)
+    return {
+        "requests": len(statuses),
+        "ok": len(ok),
+        "errors": len(statuses) - len(ok),
+        "error_rate": (len(statuses) - len(ok)) / len(statuses) if statuses else 0.0,
+        "status_counts": status_counts,
+        "elapsed_seconds": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": float(ms.mean()) if len(ms) else None,
+            "p50": float(np.percentile(ms, 50)) if len(ms) else None,
+            "p95": float(np.percentile(ms, 95)) if len(ms) else None,
+            "p99": float(np.percentile(ms, 99)) if len(ms) else None,
+            "max": float(ms.max()) if len(ms) else None,
+        },
+    }
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git("rev-parse", "HEAD"),
+        "git_dirty": bool(status) if status is not None else None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "env": {key: value for key, value in sorted(os.environ.items()) if key.startswith(RECORDED_ENV_PREFIXES)},
+        "args": vars(args),
+    }
+
+
+def make_records(model_name: str, n: int, seed: int, workload: str) -> List[Dict[str, Any]]:
+    """Records fitted to the bundled dataset, or drawn uniformly within the schema bounds"""
+    if workload == "fitted":
+        return WorkloadGenerator.fit(model_name, seed=seed).records(n)
+    return RECORD_FACTORIES[model_name](n, seed=seed)
+
+
+# ---------------------------------------------------------------- micro-benchmarks
+
+def _time_calls(fn: Callable[[], Any], repeats: int) -> List[float]:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_micro(models: List[str], single_calls: int, batch_sizes: List[int], repeats: int,
+              seed: int, workload: str) -> List[Dict[str, Any]]:
+    """Per-call latency of the predictor classes, without HTTP"""
+    from models.diabetes_model import DiabetesPredictor
+    from models.heart_model import HeartDiseasePredictor
+
+    classes = {"heart": HeartDiseasePredictor, "diabetes": DiabetesPredictor}
+    results = []
+    for model_name in models:
+        predictor = classes[model_name]()
+        records = make_records(model_name, max([single_calls] + batch_sizes), seed, workload)
+        # Warm up both paths so one-off allocations are not measured
+        predictor.predict(records[0])
+        predictor.predict_batch(records[:10])
+
+        calls = iter(records[:single_calls])
+        latencies = _time_calls(lambda: predictor.predict(next(calls)), single_calls)
+        result = summarize(latencies, [200] * len(latencies), sum(latencies))
+        result.update(name=f"micro/{model_name}/predict", rows_per_call=1)
+        results.append(result)
+        print(_format_line(result), flush=True)
+
+        for size in batch_sizes:
+            batch = records[:size]
+            latencies = _time_calls(lambda: predictor.predict_batch(batch), repeats)
+            result = summarize(latencies, [200] * len(latencies), sum(latencies))
+            result.update(name=f"micro/{model_name}/predict_batch/{size}", rows_per_call=size,
+                          rows_per_second=size * len(latencies) / sum(latencies))
+            results.append(result)
+            print(_format_line(result), flush=True)
+    return results
+
+
+# ---------------------------------------------------------------- load tests
+
+async def _send(client: httpx.AsyncClient, path: str, record: Dict[str, Any]) -> Optional[int]:
+    try:
+        response = await client.post(path, json=record)
+        await response.aread()
+        return response.status_code
+    except httpx.HTTPError:
+        return None
+
+
+async def closed_loop(client: httpx.AsyncClient, path: str, records: List[Dict[str, Any]],
+                      concurrency: int, duration: float) -> Dict[str, Any]:
+    """``concurrency`` clients sending back to back for ``duration`` seconds"""
+    latencies: List[float] = []
+    statuses: List[Optional[int]] = []
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset: int) -> None:
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = await _send(client, path, records[i % len(records)])
+            latencies.append(time.perf_counter() - start)
+            statuses.append(status)
+            i += concurrency
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - start)
+
+
+async def open_loop(client: httpx.AsyncClient, path: str, records: List[Dict[str, Any]],
+                    rate: float, duration: float, arrival: str, seed: int) -> Dict[str, Any]:
+    """Requests arriving at ``rate`` per second regardless of completions"""
+    rng = np.random.default_rng(seed)
+    count = max(1, int(rate * duration))
+    if arrival == "poisson":
+        offsets = np.cumsum(rng.exponential(1.0 / rate, count))
+    else:
+        offsets = np.arange(count) / rate
+    latencies: List[float] = [0.0] * count
+    statuses: List[Optional[int]] = [None] * count
+
+    async def request(i: int, scheduled: float) -> None:
+        status = await _send(client, path, records[i % len(records)])
+        # From the scheduled send time, so time spent waiting for a connection counts
+        latencies[i] = time.perf_counter() - scheduled
+        statuses[i] = status
+
+    start = time.perf_counter()
+    tasks = []
+    for i, offset in enumerate(offsets):
+        scheduled = start + float(offset)
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(request(i, scheduled)))
+    await asyncio.gather(*tasks)
+    result = summarize(latencies, statuses, time.perf_counter() - start)
+    result["offered_rps"] = rate
+    return result
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def localhost_server(target: str, timeout: float = 120.0) -> Iterator[str]:
+    """Start a target on a free localhost port and yield its base URL once /health answers"""
+    spec = TARGETS[target]
+    port = _free_port()
+    env = dict(os.environ)
+    if spec["port_env"]:
+        env[spec["port_env"]] = str(port)
+    server = subprocess.Popen(spec["command"](port), cwd=spec["cwd"], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if server.poll() is not None:
+                raise SystemExit(f"❌ {target} exited with status {server.returncode} during startup")
+            try:
+                if httpx.get(f"{url}/health", timeout=2.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit(f"❌ {target} did not become healthy within {timeout:.0f}s")
+            time.sleep(0.2)
+        yield url
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+async def _drive_inprocess(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """The FastAPI app behind an ASGI transport, started and stopped on the client's event loop"""
+    import main
+
+    await main.startup_event()
+    try:
+        return await _drive("http://fastapi", httpx.ASGITransport(app=main.app), "fastapi", args)
+    finally:
+        await main.shutdown_event()
+
+
+async def _drive(base_url: str, transport: Optional[httpx.AsyncBaseTransport], target: str,
+                 args: argparse.Namespace) -> List[Dict[str, Any]]:
+    pool = args.concurrency if args.rate is None else args.max_connections
+    limits = httpx.Limits(max_connections=pool, max_keepalive_connections=pool)
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits,
+                                 timeout=args.request_timeout) as client:
+        for model_name, path in TARGETS[target]["routes"].items():
+            if model_name not in args.models:
+                continue
+            records = make_records(model_name, args.records, args.seed, args.workload)
+            for record in records[:args.warmup]:
+                await _send(client, path, record)
+            if args.rate is None:
+                result = await closed_loop(client, path, records, args.concurrency, args.duration)
+                result["name"] = f"load/{target}/{model_name}/closed-c{args.concurrency}"
+                result["concurrency"] = args.concurrency
+            else:
+                result = await open_loop(client, path, records, args.rate, args.duration, args.arrival, args.seed)
+                result["name"] = f"load/{target}/{model_name}/open-{args.arrival}-r{args.rate:g}"
+                result["max_connections"] = pool
+            result["url"] = base_url + path
+            results.append(result)
+            print(_format_line(result), flush=True)
+    return results
+
+
+def run_load(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    urls = dict(item.split("=", 1) for item in args.url)
+    results = []
+    for target in args.targets:
+        if target in urls:
+            results += asyncio.run(_drive(urls[target].rstrip("/"), None, target, args))
+        elif target == "fastapi" and args.fastapi_mode == "inprocess":
+            results += asyncio.run(_drive_inprocess(args))
+        else:
+            with localhost_server(target) as url:
+                results += asyncio.run(_drive(url, None, target, args))
+    return results
+
+
+# ---------------------------------------------------------------- reporting
+
+def _format_line(result: Dict[str, Any]) -> str:
+    latency = result["latency_ms"]
+
+    def ms(value: Optional[float]) -> str:
+        return f"{value:9.3f}" if value is not None else f"{'n/a':>9}"
+
+    return (f"{result['name']:<44} {result['requests']:>7} req {result['throughput_rps']:>9.1f}/s "
+            f"p50 {ms(latency['p50'])} p95 {ms(latency['p95'])} p99 {ms(latency['p99'])} ms "
+            f"errors {result['error_rate']:6.1%}")
+
+
+def write_results(results: Dict[str, Any], output: Optional[str]) -> None:
+    if output:
+        directory = os.path.dirname(output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {output}")
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """Print the change in latency, throughput and errors for every run present in both files"""
+    def load(path: str) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        with open(path) as f:
+            data = json.load(f)
+        return data["meta"], {result["name"]: result for result in data["results"]}
+
+    before_meta, before = load(before_path)
+    after_meta, after = load(after_path)
+    print(f"before: {before_path} ({(before_meta.get('git_commit') or '?')[:10]}"
+          f"{'+dirty' if before_meta.get('git_dirty') else ''})")
+    print(f"after:  {after_path} ({(after_meta.get('git_commit') or '?')[:10]}"
+          f"{'+dirty' if after_meta.get('git_dirty') else ''})")
+    if before_meta.get("env") != after_meta.get("env") or before_meta.get("cpu_count") != after_meta.get("cpu_count"):
+        print("⚠️  The runs used different serving environments or CPU counts")
+
+    def change(old: Optional[float], new: Optional[float]) -> str:
+        if old is None or new is None or old == 0:
+            return f"{'n/a':>8}"
+        return f"{(new - old) / old:+8.1%}"
+
+    print(f"{'run':<44} {'p50 ms':>17} {'':>8} {'p99 ms':>17} {'':>8} {'req/s':>17} {'':>8} {'errors':>13}")
+    for name in [name for name in before if name in after]:
+        old, new = before[name], after[name]
+        cells = []
+        for getter in (lambda r: r["latency_ms"]["p50"], lambda r: r["latency_ms"]["p99"],
+                       lambda r: r["throughput_rps"]):
+            a, b = getter(old), getter(new)
+            cells.append(f"{a if a is not None else float('nan'):>8.2f} {b if b is not None else float('nan'):>8.2f} "
+                         f"{change(a, b)}")
+        print(f"{name:<44} {' '.join(cells)} {old['error_rate']:>6.1%} {new['error_rate']:>6.1%}")
+    missing = sorted(set(before) ^ set(after))
+    if missing:
+        print(f"Runs in only one file: {', '.join(missing)}")
+
+
+# ---------------------------------------------------------------- command line
+
+def _micro(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    return run_micro(args.models, args.single_calls, args.batch_sizes, args.repeats, args.seed, args.workload)
+
+
+def _add_micro_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--single-calls", type=int, default=500, help="predict() calls timed per model")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 256, 4096])
+    parser.add_argument("--repeats", type=int, default=20, help="predict_batch() calls timed per batch size")
+
+
+def _add_load_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--fastapi-mode", choices=["localhost", "inprocess"], default="localhost",
+                        help="Serve FastAPI from a uvicorn process or in-process through ASGI")
+    parser.add_argument("--url", action="append", default=[], metavar="TARGET=URL",
+                        help="Use an already running server for a target instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=16, help="Closed-loop clients")
+    parser.add_argument("--rate", type=float, help="Open-loop arrival rate in requests/sec (instead of closed loop)")
+    parser.add_argument("--arrival", choices=["poisson", "constant"], default="poisson")
+    parser.add_argument("--max-connections", type=int, default=64, help="Connection pool size in open-loop mode")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per route")
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests per route")
+    parser.add_argument("--records", type=int, default=5000, help="Distinct records cycled through")
+    parser.add_argument("--request-timeout", type=float, default=30.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproducible predictor micro-benchmarks and HTTP load tests")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name: str, help_text: str) -> argparse.ArgumentParser:
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--models", nargs="+", choices=list(RECORD_FACTORIES), default=list(RECORD_FACTORIES))
+        command.add_argument("--seed", type=int, default=42)
+        command.add_argument("--workload", choices=WORKLOADS, default="fitted",
+                             help="Records fitted to the bundled datasets or uniform within the schema bounds")
+        command.add_argument("--output", help="Write the JSON results to this file")
+        return command
+
+    _add_micro_arguments(add_command("micro", "Time the predictor classes in-process"))
+    _add_load_arguments(add_command("load", "Drive the FastAPI and Flask services over HTTP"))
+    everything = add_command("all", "micro, then load")
+    _add_micro_arguments(everything)
+    _add_load_arguments(everything)
+    comparison = commands.add_parser("compare", help="Compare two result files")
+    comparison.add_argument("before")
+    comparison.add_argument("after")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        compare(args.before, args.after)
+        return
+
+    # Measure the models rather than the prediction cache, in-process and in the servers started here
+    os.environ.setdefault("PREDICTION_CACHE_SIZE", "0")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    meta = run_metadata(args)
+    results: List[Dict[str, Any]] = []
+    if args.command in ("micro", "all"):
+        results += _micro(args)
+    if args.command in ("load", "all"):
+        results += run_load(args)
+
+    output = {"meta": meta, "results": results}
+    write_results(output, args.output)
+    if not args.output:
+        print(json.dumps(output, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark: serve.py throughput and memory by worker count
+
+Starts the production launcher with each worker count, drives /predict/heart
+with concurrent keep-alive clients for a fixed time and reports requests/sec,
+latency percentiles and per-worker memory (RSS, PSS and the part shared with
+the master).
+
+Run from the backend directory:
+    python -m benchmarks.worker_throughput --workers 1 2 4 8
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+import numpy as np
+
+from benchmarks.batch_throughput import make_heart_records
+from inference.process_stats import format_bytes, memory_usage
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+
+def child_pids(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+async def wait_until_ready(url: str, workers: int, timeout: float) -> None:
+    """Wait until every worker has answered /stats/worker"""
+    deadline = time.monotonic() + timeout
+    seen = set()
+    while time.monotonic() < deadline:
+        try:
+            # A new connection each time, so the kernel can hand it to any worker
+            async with httpx.AsyncClient() as client:
+                response = await client.get(f"{url}/stats/worker", headers={"Connection": "close"})
+            seen.add(response.json()["pid"])
+            if len(seen) >= workers:
+                return
+        except httpx.HTTPError:
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"❌ Launcher did not start {workers} workers within {timeout:.0f}s")
+
+
+async def drive(url: str, records: List[Dict[str, Any]], clients: int, duration: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+        deadline = time.monotonic() + duration
+
+        async def worker(offset: int):
+            nonlocal errors
+            i = offset
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/predict/heart", json=records[i % len(records)])
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                except httpx.HTTPError:
+                    errors += 1
+                i += clients
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(offset) for offset in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "errors": errors
+    }
+
+
+def run_one(workers: int, port: int, clients: int, duration: float, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    env = dict(os.environ, PREDICTION_CACHE_SIZE="0")
+    launcher = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "serve.py", "--workers", str(workers), "--port", str(port),
+         "--host", "127.0.0.1", "--report-interval", "0", "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_until_ready(url, workers, timeout=120))
+        result = asyncio.run(drive(url, records, clients, duration))
+        usages = [memory_usage(pid) for pid in child_pids(launcher.pid)]
+        result["workers"] = workers
+        result["master_rss_bytes"] = memory_usage(launcher.pid)["rss_bytes"]
+        result["worker_rss_bytes"] = max((u["rss_bytes"] or 0) for u in usages) if usages else None
+        result["worker_pss_bytes"] = max((u["pss_bytes"] or 0) for u in usages) if usages else None
+        result["total_pss_bytes"] = sum((u["pss_bytes"] or 0) for u in usages) + \
+            (memory_usage(launcher.pid)["pss_bytes"] or 0)
+        return result
+    finally:
+        launcher.send_signal(signal.SIGTERM)
+        launcher.wait(timeout=60)
+
+
+def run(worker_counts: List[int], port: int, clients: int, duration: float) -> None:
+    records = make_heart_records(5000)
+    print(f"CPUs available: {os.cpu_count()}, {clients} clients, {duration:.0f}s per run, cache disabled")
+    print(f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6} "
+          f"{'worker rss':>11} {'worker pss':>11} {'total pss':>11}")
+    for workers in worker_counts:
+        r = run_one(workers, port, clients, duration, records)
+        print(f"{workers:>7} {r['requests_per_second']:>8.1f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+              f"{r['errors']:>6} {format_bytes(r['worker_rss_bytes']):>11} "
+              f"{format_bytes(r['worker_pss_bytes']):>11} {format_bytes(r['total_pss_bytes']):>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure serve.py throughput for several worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent keep-alive clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per worker count")
+    args = parser.parse_args()
+
+    run(args.workers, args.port, args.clients, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Synthetic patient workloads fitted to the bundled datasets
+
+``WorkloadGenerator`` learns each field's marginal distribution (empirical
+quantiles) and the dependence between fields (a Gaussian copula: the
+correlation of the fields' normal scores) from ``ML_prediction/heart.xlsx`` or
+``enhanced_diabetes_dataset.xlsx``. It then samples records in the request
+schema's field names, clipped to the ``HeartPredictionRequest`` /
+``DiabetesPredictionRequest`` bounds and rounded to the dataset's resolution.
+
+Sampling is seeded and done in fixed blocks of ``BLOCK_ROWS`` rows, each
+with its own generator derived from ``(seed, block)``. Row ``i`` is therefore
+the same whatever chunk size is used or where the stream starts, and memory
+stays constant with the chunk size.
+
+Run from the backend directory:
+    python -m benchmarks.workload heart --rows 1000000 --format csv --output heart.csv
+    python -m benchmarks.workload diabetes --rows 5000000 --format parquet --output diabetes.parquet
+    python -m benchmarks.workload heart --rows 10 --format ndjson        # to stdout
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+from schemas.prediction_schemas import DiabetesPredictionRequest, HeartPredictionRequest, field_bounds
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction'))
+from ml_runtime.dataset import load_dataset
+
+warnings.filterwarnings("ignore")
+
+# Rows sampled per generator; fixes which random numbers row i gets
+BLOCK_ROWS = 8192
+
+# Fields with at most this many distinct values are sampled as categories
+MAX_DISCRETE_VALUES = 20
+
+DATASETS: Dict[str, Dict[str, Any]] = {
+    "heart": {
+        "schema": HeartPredictionRequest,
+        # dataset column -> request field
+        "columns": {name: name for name in HeartPredictionRequest.model_fields},
+        "values": {},
+    },
+    "diabetes": {
+        "schema": DiabetesPredictionRequest,
+        "columns": {
+            "Pregnancies": "pregnancies",
+            "Glucose": "glucose",
+            "BloodPressure": "blood_pressure",
+            "SkinThickness": "skin_thickness",
+            "Insulin": "insulin",
+            "BMI": "bmi",
+            "DiabetesPedigreeFunction": "diabetes_pedigree",
+            "Age": "age",
+            "FamilyHistory": "family_history",
+            "PhysicalActivity": "physical_activity",
+            "SmokingStatus": "smoking",
+            "AlcoholConsumption": "alcohol",
+        },
+        # Text categories -> the request's 0/1 encoding
+        "values": {
+            "family_history": {"Yes": 1, "No": 0},
+            "smoking": {"Smoker": 1, "Non-Smoker": 0},
+        },
+    },
+}
+
+FORMATS = ("csv", "ndjson", "parquet")
+
+
+def _decimals(values: np.ndarray) -> int:
+    """Decimal places the dataset records a field with (0-3)"""
+    for decimals in range(4):
+        if np.allclose(values, np.round(values, decimals)):
+            return decimals
+    return 3
+
+
+class WorkloadGenerator:
+    """Seeded sampler of schema-valid records for one disease"""
+
+    def __init__(self, disease: str, frame: pd.DataFrame, seed: int = 42):
+        spec = DATASETS[disease]
+        self.disease = disease
+        self.seed = seed
+        self.schema = spec["schema"]
+        self.fields: List[str] = list(spec["columns"].values())
+
+        data = frame[list(spec["columns"])].rename(columns=spec["columns"])
+        for field, mapping in spec["values"].items():
+            data[field] = data[field].map(mapping)
+        data = data.dropna().astype(float)
+        values = data.to_numpy()
+
+        self.sorted_values = np.sort(values, axis=0)
+        self.discrete = np.array([len(np.unique(column)) <= MAX_DISCRETE_VALUES for column in values.T])
+        self.decimals = [_decimals(column) for column in values.T]
+        self.integer = [self.schema.model_fields[field].annotation is int for field in self.fields]
+        bounds = [field_bounds(self.schema)[field] for field in self.fields]
+        self.low = np.array([low for low, _ in bounds])
+        self.high = np.array([high for _, high in bounds])
+
+        # Gaussian copula: correlation of the normal scores of each field's ranks
+        ranks = data.rank(method="average").to_numpy()
+        scores = ndtri(ranks / (len(data) + 1))
+        correlation = np.corrcoef(scores, rowvar=False)
+        # Tiny ridge keeps the Cholesky factor defined for (near) collinear fields
+        self.cholesky = np.linalg.cholesky(correlation + np.eye(len(self.fields)) * 1e-9)
+
+    @classmethod
+    def fit(cls, disease: str, seed: int = 42) -> "WorkloadGenerator":
+        """Fit to the bundled dataset for ``disease``"""
+        return cls(disease, load_dataset(disease), seed=seed)
+
+    def _block(self, index: int) -> np.ndarray:
+        rng = np.random.default_rng([self.seed, index])
+        normal = rng.standard_normal((BLOCK_ROWS, len(self.fields))) @ self.cholesky.T
+        uniform = ndtr(normal)
+        n = len(self.sorted_values)
+        out = np.empty_like(uniform)
+        for j in range(len(self.fields)):
+            column = self.sorted_values[:, j]
+            if self.discrete[j]:
+                # Inverse empirical CDF: observed values with their observed frequencies
+                out[:, j] = column[np.minimum((uniform[:, j] * n).astype(np.int64), n - 1)]
+            else:
+                # Interpolated quantiles, so values between observed ones occur too
+                out[:, j] = np.interp(uniform[:, j] * (n - 1), np.arange(n), column)
+                out[:, j] = np.round(out[:, j], self.decimals[j])
+        return np.clip(out, self.low, self.high)
+
+    def _frame(self, values: np.ndarray) -> pd.DataFrame:
+        columns = {}
+        for j, field in enumerate(self.fields):
+            column = values[:, j]
+            columns[field] = np.round(column).astype(np.int64) if self.integer[j] else column
+        return pd.DataFrame(columns)
+
+    def chunks(self, rows: int, chunk_size: int = 100_000, start: int = 0) -> Iterator[pd.DataFrame]:
+        """Rows ``start`` to ``start + rows`` as DataFrames of up to ``chunk_size`` rows"""
+        position, end = start, start + rows
+        block_index, block = -1, None
+        while position < end:
+            stop = min(position + chunk_size, end)
+            parts = []
+            while position < stop:
+                if position // BLOCK_ROWS != block_index:
+                    block_index = position // BLOCK_ROWS
+                    block = self._block(block_index)
+                offset = position - block_index * BLOCK_ROWS
+                take = min(stop - position, BLOCK_ROWS - offset)
+                parts.append(block[offset:offset + take])
+                position += take
+            yield self._frame(np.concatenate(parts))
+
+    def records(self, rows: int, start: int = 0) -> List[Dict[str, Any]]:
+        """Rows as request dicts (JSON-ready Python ints and floats)"""
+        records = []
+        for chunk in self.chunks(rows, start=start):
+            records.extend(chunk.to_dict(orient="records"))
+        return records
+
+
+def write(chunks: Iterator[pd.DataFrame], fmt: str, output: Optional[str]) -> int:
+    """Stream chunks to ``output`` (stdout when None, except for Parquet); returns rows written"""
+    if fmt == "parquet":
+        if not output:
+            raise SystemExit("❌ Parquet needs --output")
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("❌ Parquet output needs pyarrow (pip install pyarrow)")
+        rows, writer = 0, None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output, table.schema)
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    stream = open(output, "w", newline="") if output else sys.stdout
+    rows = 0
+    try:
+        for chunk in chunks:
+            if fmt == "csv":
+                chunk.to_csv(stream, header=rows == 0, index=False)
+            else:
+                stream.write(chunk.to_json(orient="records", lines=True).rstrip("\n") + "\n")
+            rows += len(chunk)
+    finally:
+        if output:
+            stream.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic patient records fitted to the bundled datasets")
+    parser.add_argument("disease", choices=list(DATASETS))
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--start", type=int, default=0, help="First row index (to continue an earlier stream)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows held in memory at a time")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--output", help="Output file (default: stdout for CSV and NDJSON)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generator = WorkloadGenerator.fit(args.disease, seed=args.seed)
+    rows = write(generator.chunks(args.rows, args.chunk_size, args.start), args.format, args.output)
+    if args.output:
+        elapsed = time.perf_counter() - start
+        print(f"✅ {rows} {args.disease} records written to {args.output} in {elapsed:.1f}s "
+              f"({rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
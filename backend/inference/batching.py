@@ -0,0 +1,156 @@
+"""
+Adaptive Micro-Batching
+
+Concurrent single-patient requests for the same model are held for a short
+window and scored together with one ``predict_batch`` call on the inference
+executor; each caller receives its own result. A batch is flushed when the
+window expires or when it reaches ``max_batch_size``. A request that arrives
+while nothing is pending or being scored has nothing to wait for and is
+flushed at once, so light or serial traffic pays no window at all.
+
+The window adapts to traffic: it grows while the observed p99 latency is well
+under the target (more requests share one predict_proba call) and is halved
+as soon as p99 exceeds the target.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from inference.executor import InferenceExecutor
+from inference.histogram import Histogram
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+WAIT_MS_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50, 100]
+
+
+class MicroBatcher:
+    """Groups concurrent single predictions for one model into vectorized batches"""
+
+    def __init__(self, executor: InferenceExecutor, model_name: str,
+                 max_batch_size: int = 64, initial_wait_ms: float = 2.0,
+                 min_wait_ms: float = 0.1, max_wait_ms: float = 20.0,
+                 target_p99_ms: float = 100.0, latency_window: int = 256):
+        self.executor = executor
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.min_wait_ms = min_wait_ms
+        self.max_wait_ms = max_wait_ms
+        self.target_p99_ms = target_p99_ms
+        self.wait_ms = min(max(initial_wait_ms, min_wait_ms), max_wait_ms)
+
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        # Batches handed to the executor whose results are not back yet
+        self._in_flight = 0
+        self._latencies_ms = deque(maxlen=latency_window)
+
+        self.batch_size_histogram = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_ms_histogram = Histogram(WAIT_MS_BUCKETS)
+        self.batches = 0
+        self.failed_batches = 0
+
+    @classmethod
+    def from_env(cls, executor: InferenceExecutor, model_name: str) -> "MicroBatcher":
+        """Build a batcher from MICROBATCH_* environment variables"""
+        return cls(
+            executor,
+            model_name,
+            max_batch_size=int(os.environ.get("MICROBATCH_MAX_BATCH_SIZE", 64)),
+            initial_wait_ms=float(os.environ.get("MICROBATCH_WAIT_MS", 2.0)),
+            max_wait_ms=float(os.environ.get("MICROBATCH_MAX_WAIT_MS", 20.0)),
+            target_p99_ms=float(os.environ.get("MICROBATCH_TARGET_P99_MS", 100.0))
+        )
+
+    async def submit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue one record and wait for its prediction"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((payload, future, time.perf_counter()))
+
+        # Alone and idle: no other request could join the batch
+        if len(self._pending) >= self.max_batch_size or (len(self._pending) == 1 and not self._in_flight):
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.wait_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Hand the pending records to the executor as one batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        self._in_flight += 1
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future, float]]) -> None:
+        flushed_at = time.perf_counter()
+        self.batches += 1
+        self.batch_size_histogram.observe(len(batch))
+        for _, _, enqueued_at in batch:
+            self.wait_ms_histogram.observe((flushed_at - enqueued_at) * 1000)
+
+        try:
+            results = await self.executor.run(
+                self.model_name, "predict_batch", [payload for payload, _, _ in batch]
+            )
+        except Exception as e:
+            self.failed_batches += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            # Before the callers resume, so their next request sees the executor idle
+            self._in_flight -= 1
+
+        finished_at = time.perf_counter()
+        for (_, future, enqueued_at), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+            self._latencies_ms.append((finished_at - enqueued_at) * 1000)
+
+        self._adapt_window()
+
+    def p99_ms(self) -> float:
+        """p99 end-to-end latency over the recent latency window"""
+        if not self._latencies_ms:
+            return 0.0
+        ordered = sorted(self._latencies_ms)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+    def _adapt_window(self) -> None:
+        """Shrink the window quickly when over target, grow it slowly when well under"""
+        p99 = self.p99_ms()
+        if p99 > self.target_p99_ms:
+            self.wait_ms = max(self.min_wait_ms, self.wait_ms * 0.5)
+        elif p99 < self.target_p99_ms * 0.5:
+            self.wait_ms = min(self.max_wait_ms, self.wait_ms * 1.1)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "wait_ms": self.wait_ms,
+            "target_p99_ms": self.target_p99_ms,
+            "p99_ms": self.p99_ms(),
+            "pending": len(self._pending),
+            "in_flight": self._in_flight,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "batch_size": self.batch_size_histogram.snapshot(),
+            "wait_time_ms": self.wait_ms_histogram.snapshot()
+        }
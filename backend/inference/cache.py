@@ -0,0 +1,105 @@
+"""
+Prediction Cache
+
+In-process LRU cache of model output (the ``predict_proba`` row) keyed on the
+encoded, ordered feature vector. Keying on the encoded vector rather than the
+raw request means equivalent inputs (for example ``smoking='yes'`` and
+``smoking=1``) share an entry. Recommendations and risk factors are still
+derived from each request's own input, so only the model call is skipped.
+
+Entries are evicted least-recently-used once ``max_size`` is reached and,
+when ``ttl_seconds`` is set, expire after that many seconds. Predictors clear
+their cache whenever the model is (re)loaded.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import numpy as np
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with optional TTL for per-record model output"""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> "PredictionCache":
+        """Build a cache from PREDICTION_CACHE_* environment variables"""
+        return cls(
+            max_size=int(os.environ.get("PREDICTION_CACHE_SIZE", 10000)),
+            ttl_seconds=float(os.environ.get("PREDICTION_CACHE_TTL_SECONDS", 0))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        """Return the cached value for ``key`` or None on a miss"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: np.ndarray) -> None:
+        """Store a copy of ``value`` (so batch arrays are not kept alive)"""
+        if not self.enabled:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else 0
+        with self._lock:
+            self._entries[key] = (np.array(value, copy=True), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry, e.g. after the model has been reloaded"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,206 @@
+"""
+Inference Executor
+
+Runs blocking model inference (pandas preprocessing and sklearn predict_proba)
+outside the asyncio event loop so that slow predictions do not stall other
+requests. Work is dispatched to a bounded thread pool by default, or to a
+process pool whose workers load their own copy of each model.
+
+Each registered model gets its own concurrency limit and an optional cap on
+the number of requests waiting for a slot; queue depth and throughput counters
+are exposed through ``metrics()``.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from observability.profiling import profiled_call
+
+logger = logging.getLogger(__name__)
+
+# Predictors instantiated inside each process-pool worker
+_worker_predictors: Dict[str, Any] = {}
+
+
+def _init_worker(factories: Dict[str, Callable[[], Any]]) -> None:
+    """Load every registered model once per worker process"""
+    for model_name, factory in factories.items():
+        _worker_predictors[model_name] = factory()
+
+
+def _call_in_worker(model_name: str, method: str, *args: Any) -> Any:
+    """Invoke a predictor method inside a process-pool worker"""
+    return getattr(_worker_predictors[model_name], method)(*args)
+
+
+class InferenceQueueFull(Exception):
+    """Raised when a model already has the maximum number of queued requests"""
+
+
+class _ModelLane:
+    """Concurrency limit and counters for a single model"""
+
+    def __init__(self, predictor: Any, factory: Optional[Callable[[], Any]],
+                 max_concurrency: int, max_queue: int):
+        self.predictor = predictor
+        self.factory = factory
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.queued = 0
+        self.running = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queued": self.queued,
+            "running": self.running,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_inference_ms": (self.total_seconds / finished * 1000) if finished else 0.0
+        }
+
+
+class InferenceExecutor:
+    """Dispatches blocking predictor calls to a worker pool with per-model limits"""
+
+    def __init__(self, max_workers: Optional[int] = None, use_processes: bool = False):
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.use_processes = use_processes
+        self._lanes: Dict[str, _ModelLane] = {}
+        self._pool: Optional[Executor] = None
+
+    @classmethod
+    def from_env(cls) -> "InferenceExecutor":
+        """Build an executor from INFERENCE_* environment variables"""
+        max_workers = int(os.environ.get("INFERENCE_MAX_WORKERS", 0)) or None
+        use_processes = os.environ.get("INFERENCE_EXECUTOR", "thread").lower() == "process"
+        return cls(max_workers=max_workers, use_processes=use_processes)
+
+    def register_model(self, model_name: str, predictor: Any,
+                       factory: Optional[Callable[[], Any]] = None,
+                       max_concurrency: Optional[int] = None,
+                       max_queue: Optional[int] = None) -> None:
+        """
+        Register a predictor with the executor.
+
+        ``factory`` is required in process mode so that each worker can load its
+        own copy of the model. Limits default to the ``<MODEL>_MAX_CONCURRENCY``
+        and ``<MODEL>_MAX_QUEUE`` environment variables; a queue limit of 0
+        means unbounded.
+        """
+        if self._pool is not None:
+            raise RuntimeError("Models must be registered before the executor is started")
+        if self.use_processes and factory is None:
+            raise ValueError(f"A factory is required to run '{model_name}' in a process pool")
+
+        prefix = model_name.upper()
+        if max_concurrency is None:
+            max_concurrency = int(os.environ.get(f"{prefix}_MAX_CONCURRENCY", 0)) or self.max_workers
+        if max_queue is None:
+            max_queue = int(os.environ.get(f"{prefix}_MAX_QUEUE", 0))
+
+        self._lanes[model_name] = _ModelLane(
+            predictor, factory, min(max_concurrency, self.max_workers), max_queue
+        )
+
+    def start(self) -> None:
+        """Create the worker pool"""
+        if self.use_processes:
+            factories = {name: lane.factory for name, lane in self._lanes.items()}
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(factories,)
+            )
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference"
+            )
+        logger.info(
+            f"Inference executor started: {'process' if self.use_processes else 'thread'} pool, "
+            f"{self.max_workers} workers"
+        )
+
+    def replace_predictor(self, model_name: str, predictor: Any) -> None:
+        """
+        Serve ``predictor`` for calls made from now on; calls already
+        dispatched keep the predictor they were given. A process pool is
+        replaced, because its workers load their own copy of the model: new
+        workers load the model on disk, old ones exit once their calls finish.
+        Call from the event loop thread.
+        """
+        self._lanes[model_name].predictor = predictor
+        if self.use_processes and self._pool is not None:
+            previous = self._pool
+            self.start()
+            previous.shutdown(wait=False)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+    async def run(self, model_name: str, method: str, *args: Any) -> Any:
+        """Run ``predictor.<method>(*args)`` on the pool, respecting the model's limits"""
+        if self._pool is None:
+            raise RuntimeError("Inference executor has not been started")
+
+        lane = self._lanes[model_name]
+        if lane.max_queue and lane.queued >= lane.max_queue:
+            lane.rejected += 1
+            raise InferenceQueueFull(f"Too many pending '{model_name}' predictions, try again later")
+
+        if self.use_processes:
+            call = functools.partial(_call_in_worker, model_name, method, *args)
+        else:
+            # A profiled request's profile follows it onto the worker thread
+            call = profiled_call(functools.partial(getattr(lane.predictor, method), *args))
+
+        lane.queued += 1
+        lane.max_queued = max(lane.max_queued, lane.queued)
+        waiting = True
+        try:
+            async with lane.semaphore:
+                lane.queued -= 1
+                waiting = False
+                lane.running += 1
+                start = time.perf_counter()
+                try:
+                    result = await asyncio.get_running_loop().run_in_executor(self._pool, call)
+                    lane.completed += 1
+                    return result
+                except Exception:
+                    lane.failed += 1
+                    raise
+                finally:
+                    lane.running -= 1
+                    lane.total_seconds += time.perf_counter() - start
+        finally:
+            if waiting:
+                lane.queued -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Pool configuration and per-model queue depth counters"""
+        return {
+            "executor": "process" if self.use_processes else "thread",
+            "max_workers": self.max_workers,
+            "running": self._pool is not None,
+            "models": {name: lane.snapshot() for name, lane in self._lanes.items()}
+        }
@@ -0,0 +1,118 @@
+"""
+Global Explanations
+
+Serves the permutation importance and partial dependence that
+``ml_runtime.global_explain`` stores next to each ``model.pkl`` as
+``global_explanations.json``. The file is read once per model hash and then
+served from memory, so a request does no computation.
+
+When a model is registered or swapped in, its file is read on a background
+thread. If the file is missing or was computed for another ``model.pkl`` (the
+SHA-256 in the manifest differs), it is computed again there, on the bundled
+dataset named in the manifest, and written next to the model. A model's hash
+only changes when a different ``model.pkl`` is served, so the explanations
+are recomputed only then. Until they are ready the endpoint answers 503. A
+failure is logged and not retried for the same model.
+
+The computation runs on ``GLOBAL_EXPLANATIONS_JOBS`` worker processes
+(default 1, so a retrained model does not take every core from serving; -1
+uses all cores). Training computes them across all cores before the model is
+ever served.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# ml_runtime is on the path once the predictors are imported
+from ml_runtime.global_explain import ensure_global_explanations, load_global_explanations
+
+logger = logging.getLogger(__name__)
+
+
+class GlobalExplanations:
+    """Global explanations of the served models, loaded or computed in the background once per model hash"""
+
+    def __init__(self, n_jobs: int = 1):
+        self.n_jobs = n_jobs
+        # Model name -> (model SHA-256, explanations)
+        self._ready: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        # Model name -> SHA-256 being loaded or computed
+        self._pending: Dict[str, str] = {}
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "GlobalExplanations":
+        """Build from GLOBAL_EXPLANATIONS_JOBS"""
+        return cls(n_jobs=int(os.environ.get("GLOBAL_EXPLANATIONS_JOBS", 1)))
+
+    def prepare(self, model_name: str, predictor: Any) -> bool:
+        """
+        Load or compute the explanations of ``predictor`` on a thread; False
+        if they are ready, running or already failed for this model
+        """
+        sha256 = predictor.model_sha256
+        with self._lock:
+            ready = self._ready.get(model_name)
+            status = self._status.get(model_name, {})
+            if ((ready is not None and ready[0] == sha256) or self._pending.get(model_name) == sha256
+                    or (status.get("state") == "failed" and status.get("sha256") == sha256)):
+                return False
+            self._pending[model_name] = sha256
+        threading.Thread(target=self._prepare, args=(model_name, predictor.model_path, sha256),
+                         name=f"global-explanations-{model_name}", daemon=True).start()
+        return True
+
+    def _prepare(self, model_name: str, model_path: str, sha256: str) -> None:
+        started = time.perf_counter()
+        self._set_status(model_name, state="loading", sha256=sha256)
+        try:
+            explanations = load_global_explanations(model_path, sha256)
+            computed = explanations is None
+            if computed:
+                self._set_status(model_name, state="computing", sha256=sha256)
+                logger.info(f"Computing global explanations for {model_name} ({sha256[:12]})")
+                explanations = ensure_global_explanations(model_path, self.n_jobs)
+            if explanations is None or explanations["model"]["sha256"] != sha256:
+                raise ValueError("model.pkl changed while its global explanations were computed")
+        except Exception as e:
+            logger.error(f"Global explanations for {model_name} failed: {e}")
+            self._set_status(model_name, state="failed", sha256=sha256, error=str(e))
+            with self._lock:
+                if self._pending.get(model_name) == sha256:
+                    del self._pending[model_name]
+            return
+
+        seconds = time.perf_counter() - started
+        with self._lock:
+            # A newer model may have been swapped in meanwhile
+            if self._pending.get(model_name) == sha256:
+                del self._pending[model_name]
+                self._ready[model_name] = (sha256, explanations)
+        self._set_status(model_name, state="ready", sha256=sha256, computed=computed, seconds=round(seconds, 3))
+        if computed:
+            logger.info(f"Global explanations for {model_name} computed in {seconds:.1f}s")
+
+    def _set_status(self, model_name: str, **status: Any) -> None:
+        with self._lock:
+            self._status[model_name] = status
+
+    def get(self, model_name: str, predictor: Any) -> Optional[Dict[str, Any]]:
+        """Explanations of the model ``predictor`` serves, or None while they are being prepared"""
+        with self._lock:
+            ready = self._ready.get(model_name)
+        if ready is not None and ready[0] == predictor.model_sha256:
+            return ready[1]
+        self.prepare(model_name, predictor)
+        return None
+
+    def status(self, model_name: str) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._status.get(model_name, {}))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {name: dict(status) for name, status in self._status.items()}
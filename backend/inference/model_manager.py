@@ -0,0 +1,265 @@
+"""
+Hot Model Reload
+
+Each predictor served by the inference executor is held in an
+``ml_runtime.reload.ModelSlot``. A reload runs on a background thread, while
+the serving version keeps answering requests. It builds a new predictor,
+which loads ``model.pkl`` and its manifest, and warms it with canary records
+at the low end, middle and high end of the request schema's bounds. It then
+makes it the primary of the model's router. Calls that are already running
+keep the predictor they started with, so they finish on the old version. Every
+prediction carries ``model_version``, the ID of the version that scored it.
+
+The version that was swapped out stays loaded so ``rollback`` is instant.
+With ``INFERENCE_EXECUTOR=process`` the workers load the model from disk
+themselves. A swap there restarts the pool, and a rollback is refused
+because the previous version is no longer on disk.
+
+Reloads are triggered by ``POST /admin/models/{model}/reload`` or, with
+``MODEL_WATCH_INTERVAL_SECONDS`` set, by a watcher that polls each model's
+``model.pkl`` and ``model_manifest.json``.
+
+The executor calls each model through an ``inference.registry.ModelRouter``,
+which can canary or shadow a named registry version next to the serving one
+(``POST /admin/models/{model}/routing``). ``promote`` makes that candidate the
+serving version through the slot, so a rollback undoes it. Routing needs the
+predictors in this process and is refused with ``INFERENCE_EXECUTOR=process``.
+
+The global explanations of every serving version
+(``inference.global_explanations``) are loaded when it is registered or
+swapped in, and computed again when none on disk match its ``model.pkl``.
+"""
+
+import asyncio
+import logging
+import math
+import os
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+from inference.executor import InferenceExecutor
+from inference.global_explanations import GlobalExplanations
+from inference.registry import ROUTING_MODES, ModelRouter, ShadowScorer, list_versions
+from schemas.prediction_schemas import field_bounds, integer_fields
+# ml_runtime is on the path once the predictors are imported
+from ml_runtime.manifest import manifest_path_for
+from ml_runtime.reload import ModelFileWatcher, ModelSlot, ModelVersion
+
+logger = logging.getLogger(__name__)
+
+
+def schema_canary_records(schema: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """
+    API requests with every field at its lower bound, midpoint and upper bound
+    of the request schema (unlike ``ml_runtime.manifest.canary_records``, which
+    spans the training ranges of the model's raw features)
+    """
+    integers = integer_fields(schema)
+    records = []
+    for position in (0.0, 0.5, 1.0):
+        record = {}
+        for field, (low, high) in field_bounds(schema).items():
+            value = low + position * (high - low)
+            record[field] = round(value) if field in integers else value
+        records.append(record)
+    return records
+
+
+def _warm(predictor: Any, records: List[Dict[str, Any]]) -> None:
+    """Score the canaries once; raises if the new predictor cannot serve them"""
+    results = predictor.predict_batch(records)
+    for result in results:
+        if not (math.isfinite(result["probability"]) and 0.0 <= result["probability"] <= 1.0):
+            raise ValueError(f"Canary prediction returned probability {result['probability']}")
+    # Canary results must not be served from the cache
+    predictor.cache.clear()
+
+
+class ModelManager:
+    """Reloads, swaps and rolls back the predictors served by an inference executor"""
+
+    def __init__(self, executor: InferenceExecutor, loop: asyncio.AbstractEventLoop,
+                 on_swap: Optional[Callable[[str, Any], None]] = None):
+        self.executor = executor
+        self.loop = loop
+        self.on_swap = on_swap
+        self.slots: Dict[str, ModelSlot] = {}
+        self.watchers: Dict[str, ModelFileWatcher] = {}
+        self.routers: Dict[str, ModelRouter] = {}
+        self._factories: Dict[str, Callable[..., Any]] = {}
+        self._canaries: Dict[str, List[Dict[str, Any]]] = {}
+        self.explanations = GlobalExplanations.from_env()
+
+    def register(self, model_name: str, predictor: Any, factory: Callable[..., Any],
+                 schema: Type[BaseModel]) -> ModelRouter:
+        """
+        Manage ``predictor``; ``factory`` loads a new one (``factory(model_path=...)``
+        a registry version). Returns the router to register with the executor.
+        """
+        canaries = schema_canary_records(schema)
+        self._factories[model_name] = factory
+        self._canaries[model_name] = canaries
+        slot = ModelSlot(
+            model_name,
+            loader=lambda: self._load(factory),
+            warmup=lambda candidate: _warm(candidate, canaries),
+            on_swap=lambda version: self._serve(model_name, version),
+            log=logger
+        )
+        slot.current = ModelVersion(predictor.version, predictor)
+        self.slots[model_name] = slot
+        self.watchers[model_name] = ModelFileWatcher.from_env(
+            [predictor.model_path, manifest_path_for(predictor.model_path)],
+            lambda: slot.reload(),
+            log=logger
+        )
+        router = ModelRouter(model_name, predictor, ShadowScorer.from_env(model_name))
+        self.routers[model_name] = router
+
+        prefix = model_name.upper()
+        mode = os.environ.get(f"{prefix}_ROUTING_MODE", "primary").lower()
+        if mode != "primary":
+            try:
+                self.set_routing(model_name, mode, os.environ.get(f"{prefix}_CANDIDATE"),
+                                 float(os.environ.get(f"{prefix}_CANARY_PERCENT", "0")))
+            except Exception as e:
+                logger.error(f"Not routing {model_name} in {mode} mode: {e}")
+        return router
+
+    @staticmethod
+    def _load(factory: Callable[[], Any]) -> Any:
+        predictor = factory()
+        return predictor, predictor.version
+
+    def _serve(self, model_name: str, version: ModelVersion) -> None:
+        """Hand a swapped-in predictor to the executor, on the event loop thread"""
+        def apply():
+            router = self.routers[model_name]
+            router.primary = version.model
+            self.executor.replace_predictor(model_name, router)
+            self.explanations.prepare(model_name, version.model)
+            if self.on_swap is not None:
+                self.on_swap(model_name, version.model)
+
+        async def apply_on_loop():
+            apply()
+
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            apply()
+        else:
+            asyncio.run_coroutine_threadsafe(apply_on_loop(), self.loop).result()
+
+    def slot(self, model_name: str) -> ModelSlot:
+        if model_name not in self.slots:
+            raise KeyError(model_name)
+        return self.slots[model_name]
+
+    def reload(self, model_name: str, force: bool = False) -> Dict[str, Any]:
+        """Blocking reload; run it off the event loop"""
+        return self.slot(model_name).reload(force)
+
+    def reload_in_background(self, model_name: str, force: bool = False) -> bool:
+        return self.slot(model_name).reload_in_background(force)
+
+    def rollback(self, model_name: str) -> Dict[str, Any]:
+        """Blocking rollback; run it off the event loop"""
+        slot = self.slot(model_name)
+        if self.executor.use_processes:
+            raise RuntimeError("Rollback is not available with INFERENCE_EXECUTOR=process: "
+                               "workers load the model from disk")
+        return slot.rollback()
+
+    def versions(self, model_name: str) -> Dict[str, str]:
+        """Registry version name -> model.pkl path"""
+        return list_versions(self.slot(model_name).current.model.model_path)
+
+    def load_version(self, model_name: str, name: str) -> Any:
+        """Load and warm a registry version; blocking"""
+        versions = self.versions(model_name)
+        if name not in versions:
+            raise LookupError(f"No {model_name} model version {name!r}; available: {sorted(versions)}")
+        predictor = self._factories[model_name](model_path=versions[name])
+        _warm(predictor, self._canaries[model_name])
+        return predictor
+
+    def set_routing(self, model_name: str, mode: str, candidate: Optional[str] = None,
+                    percent: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Route ``model_name`` in ``mode``. ``candidate`` names the registry
+        version to canary or shadow; it defaults to the current candidate.
+        Blocking when a version has to be loaded; run it off the event loop.
+        """
+        self.slot(model_name)
+        router = self.routers[model_name]
+        if mode not in ROUTING_MODES:
+            raise ValueError(f"Routing mode must be one of {list(ROUTING_MODES)}, got {mode!r}")
+        if mode == "primary":
+            router.route("primary")
+            logger.info(f"Routing {model_name} to the primary only")
+            return router.stats()
+        if self.executor.use_processes:
+            raise RuntimeError("Canary and shadow routing are not available with INFERENCE_EXECUTOR=process: "
+                               "workers load the model from disk")
+        percent = percent or 0.0
+        if mode == "canary" and not 0.0 < percent <= 100.0:
+            raise ValueError(f"Canary percent must be in (0, 100], got {percent}")
+
+        _, candidate_name, predictor, _ = router.routing
+        if candidate is None and predictor is None:
+            raise ValueError(f"A candidate version is required for {mode} routing")
+        if candidate is not None and candidate != candidate_name:
+            candidate_name, predictor = candidate, self.load_version(model_name, candidate)
+        router.route(mode, candidate_name, predictor, percent)
+        logger.info(f"Routing {model_name} in {mode} mode with candidate {candidate_name} "
+                    f"({predictor.version})" + (f", {percent:g}% canary" if mode == "canary" else ""))
+        return router.stats()
+
+    def promote(self, model_name: str) -> Dict[str, Any]:
+        """Serve the candidate as the primary (undone by ``rollback``); blocking"""
+        slot = self.slot(model_name)
+        router = self.routers[model_name]
+        _, candidate_name, predictor, _ = router.routing
+        if predictor is None:
+            raise LookupError(f"No {model_name} candidate version to promote")
+        if self.executor.use_processes:
+            raise RuntimeError("Promotion is not available with INFERENCE_EXECUTOR=process: "
+                               "workers load the model from disk")
+        result = slot.promote(ModelVersion(predictor.version, predictor))
+        router.route("primary")
+        return dict(result, candidate=candidate_name)
+
+    def global_explanations(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """Global explanations of the serving version, or None while they are being prepared"""
+        self.slot(model_name)
+        predictor = self.routers[model_name].primary
+        explanations = self.explanations.get(model_name, predictor)
+        if explanations is None:
+            return None
+        return dict(explanations, model_version=predictor.version, request_fields=predictor.feature_fields)
+
+    def start(self) -> None:
+        for name, router in self.routers.items():
+            self.explanations.prepare(name, router.primary)
+        for watcher in self.watchers.values():
+            watcher.ensure_started()
+        if any(watcher.enabled for watcher in self.watchers.values()):
+            logger.info("Watching model files for changes")
+
+    def stop(self) -> None:
+        for watcher in self.watchers.values():
+            watcher.stop()
+        for router in self.routers.values():
+            router.shadow.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: dict(slot.stats(), watcher=self.watchers[name].stats(),
+                       versions=sorted(self.versions(name)), routing=self.routers[name].stats(),
+                       global_explanations=self.explanations.status(name))
+            for name, slot in self.slots.items()
+        }
@@ -0,0 +1,74 @@
+"""
+Process memory and CPU placement
+
+Reads resident memory from /proc so forked workers can report how much of
+their footprint is shared with the master (model pages inherited before the
+fork) and how much is private. Fields are None where /proc is unavailable.
+"""
+
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+# RSS without smaps_rollup comes from the shared runtime in ML_prediction/ml_runtime
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction'))
+from ml_runtime.memory import current_rss
+
+# /proc/<pid>/smaps_rollup fields, in kB
+_ROLLUP_FIELDS = {
+    "Rss": "rss_bytes",
+    "Pss": "pss_bytes",
+    "Shared_Clean": "shared_clean_bytes",
+    "Shared_Dirty": "shared_dirty_bytes",
+    "Private_Clean": "private_clean_bytes",
+    "Private_Dirty": "private_dirty_bytes",
+}
+
+
+def _read_kb_fields(path: str, fields: Dict[str, str]) -> Dict[str, int]:
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in fields:
+                    values[fields[name]] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return values
+
+
+def memory_usage(pid: Optional[int] = None) -> Dict[str, Optional[int]]:
+    """RSS, PSS and shared/private breakdown of a process in bytes"""
+    pid = pid or os.getpid()
+    usage = {field: None for field in _ROLLUP_FIELDS.values()}
+    usage.update(_read_kb_fields(f"/proc/{pid}/smaps_rollup", _ROLLUP_FIELDS))
+    if usage["rss_bytes"] is None:
+        usage["rss_bytes"] = current_rss(pid)
+    return usage
+
+
+def cpu_affinity(pid: int = 0) -> Optional[List[int]]:
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    try:
+        return sorted(os.sched_getaffinity(pid))
+    except OSError:
+        return None
+
+
+def worker_info() -> Dict[str, Any]:
+    """Identity and memory of the current server process"""
+    worker_index = os.environ.get("SERVE_WORKER_INDEX")
+    return {
+        "pid": os.getpid(),
+        "worker_index": int(worker_index) if worker_index is not None else None,
+        "cpu_affinity": cpu_affinity(),
+        "memory": memory_usage()
+    }
+
+
+def format_bytes(value: Optional[int]) -> str:
+    if value is None:
+        return "n/a"
+    return f"{value / (1024 * 1024):.1f} MiB"
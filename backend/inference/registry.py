@@ -0,0 +1,266 @@
+"""
+Model Registry and Canary / Shadow Routing
+
+Besides the ``model.pkl`` it serves, each model directory can hold named
+versions under ``versions/<name>/`` (a ``model.pkl`` with its manifest, and
+optionally its own ``scaler.pkl``). A ``ModelRouter`` is what the inference
+executor calls for a model. It sends every call to the primary predictor and,
+depending on its routing mode, also involves a candidate version:
+
+    primary   only the primary scores requests
+    canary    each record goes to the candidate with probability ``percent``
+              and to the primary otherwise; callers get the candidate's result
+    shadow    the primary answers every request; the candidate scores the
+              same encoded rows afterwards on a separate worker, and the
+              agreement of the predicted classes and the probability deltas
+              are recorded
+
+Shadow scoring never delays the caller. The rows are handed to a
+``ShadowScorer``, a small thread pool with a bound on pending batches, after
+the primary's results are ready. When the bound is reached, new batches are
+dropped (and counted) instead of queued, so a slow candidate cannot build up
+a backlog or take memory. If the candidate's manifest lists the same input
+columns as the primary's, it reuses the primary's encoded rows; otherwise it
+encodes the records itself, on the shadow worker.
+
+Configuration (environment), per model (``HEART_``, ``DIABETES_``):
+    <MODEL>_ROUTING_MODE      primary, canary or shadow at startup (default primary)
+    <MODEL>_CANDIDATE         registry version to canary or shadow
+    <MODEL>_CANARY_PERCENT    share of records sent to the candidate in canary mode
+    SHADOW_MAX_PENDING        shadow batches that may wait per model before new ones are dropped (default 64)
+    SHADOW_WORKERS            shadow scoring threads per model (default 1)
+"""
+
+import logging
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from inference.histogram import Histogram
+
+logger = logging.getLogger(__name__)
+
+ROUTING_MODES = ("primary", "canary", "shadow")
+VERSIONS_DIR = "versions"
+DELTA_BUCKETS = [0.001, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0]
+
+
+def list_versions(model_path: str) -> Dict[str, str]:
+    """Registry version name -> ``model.pkl`` path, for the model served from ``model_path``"""
+    root = os.path.join(os.path.dirname(os.path.abspath(model_path)), VERSIONS_DIR)
+    if not os.path.isdir(root):
+        return {}
+    versions = {}
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name, os.path.basename(model_path))
+        if os.path.isfile(path):
+            versions[name] = path
+    return versions
+
+
+class ShadowScorer:
+    """Bounded background worker for shadow scoring; drops work instead of queueing it"""
+
+    def __init__(self, name: str, max_pending: int = 64, workers: int = 1):
+        self.name = name
+        self.max_pending = max_pending
+        self.workers = workers
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"shadow-{name}")
+
+    @classmethod
+    def from_env(cls, name: str, **overrides: Any) -> "ShadowScorer":
+        settings = dict(
+            max_pending=int(os.environ.get("SHADOW_MAX_PENDING", "64")),
+            workers=int(os.environ.get("SHADOW_WORKERS", "1"))
+        )
+        settings.update(overrides)
+        return cls(name, **settings)
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> bool:
+        """Run ``fn(*args)`` in the background; False (and dropped) when the worker is saturated"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self.pending += 1
+            self.submitted += 1
+        try:
+            self._pool.submit(self._run, fn, args)
+        except RuntimeError:
+            # Shut down
+            with self._lock:
+                self.pending -= 1
+                self.dropped += 1
+            return False
+        return True
+
+    def _run(self, fn: Callable[..., Any], args: tuple) -> None:
+        try:
+            fn(*args)
+            outcome = "completed"
+        except Exception as e:
+            logger.warning(f"Shadow scoring for {self.name} failed: {e}")
+            outcome = "failed"
+        with self._lock:
+            self.pending -= 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped
+        }
+
+
+class ShadowComparison:
+    """Agreement and probability deltas between the primary and a shadowed candidate"""
+
+    def __init__(self):
+        self.rows = 0
+        self.agreements = 0
+        self.delta_sum = 0.0
+        self.max_delta = 0.0
+        self.deltas = Histogram(DELTA_BUCKETS)
+        self._lock = threading.Lock()
+
+    def record(self, primary_predictions: np.ndarray, primary_probabilities: np.ndarray,
+               candidate_predictions: np.ndarray, candidate_probabilities: np.ndarray) -> None:
+        deltas = np.abs(candidate_probabilities - primary_probabilities)
+        with self._lock:
+            self.rows += len(deltas)
+            self.agreements += int(np.count_nonzero(candidate_predictions == primary_predictions))
+            self.delta_sum += float(deltas.sum())
+            self.max_delta = max(self.max_delta, float(deltas.max(initial=0.0)))
+            for delta in deltas:
+                self.deltas.observe(float(delta))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rows": self.rows,
+                "agreement": self.agreements / self.rows if self.rows else None,
+                "mean_abs_delta": self.delta_sum / self.rows if self.rows else None,
+                "max_abs_delta": self.max_delta,
+                "abs_delta": self.deltas.snapshot()
+            }
+
+
+class ModelRouter:
+    """The predictor the executor calls for one model: routes to the primary and a candidate version"""
+
+    def __init__(self, model_name: str, primary: Any, shadow: ShadowScorer, seed: Optional[int] = None):
+        self.model_name = model_name
+        # Rebound by the model manager on every swap; each call reads it once
+        self.primary = primary
+        self.shadow = shadow
+        # (mode, candidate name, candidate predictor, percent), replaced as a whole
+        self.routing = ("primary", None, None, 0.0)
+        self.comparison = ShadowComparison()
+        self.routed = {"primary": 0, "candidate": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def mode(self) -> str:
+        return self.routing[0]
+
+    @property
+    def candidate(self) -> Optional[Any]:
+        return self.routing[2]
+
+    def route(self, mode: str, candidate_name: Optional[str] = None, candidate: Optional[Any] = None,
+              percent: float = 0.0) -> None:
+        """Switch routing; calls already running finish with the routing they started with"""
+        if candidate is not self.routing[2]:
+            self.comparison = ShadowComparison()
+        self.routing = (mode, candidate_name, candidate, percent)
+
+    def _count(self, primary: int, candidate: int) -> None:
+        with self._lock:
+            self.routed["primary"] += primary
+            self.routed["candidate"] += candidate
+
+    def predict(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        primary = self.primary
+        mode, _, candidate, percent = self.routing
+        if mode == "shadow":
+            return self._predict_with_shadow(primary, candidate, [input_data])[0]
+        if mode == "canary" and self._random.random() * 100 < percent:
+            self._count(0, 1)
+            return candidate.predict(input_data)
+        self._count(1, 0)
+        return primary.predict(input_data)
+
+    def predict_batch(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        primary = self.primary
+        mode, _, candidate, percent = self.routing
+        if not records:
+            return []
+        if mode == "shadow":
+            return self._predict_with_shadow(primary, candidate, records)
+        if mode != "canary":
+            self._count(len(records), 0)
+            return primary.predict_batch(records)
+
+        # Canary: each record is drawn separately, so batching does not skew the split
+        to_candidate = [self._random.random() * 100 < percent for _ in records]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(records)
+        for predictor, chosen in ((primary, False), (candidate, True)):
+            indexes = [i for i, routed in enumerate(to_candidate) if routed is chosen]
+            if indexes:
+                for i, result in zip(indexes, predictor.predict_batch([records[i] for i in indexes])):
+                    results[i] = result
+        self._count(to_candidate.count(False), to_candidate.count(True))
+        return results
+
+    def explain(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Attribution from the primary, whatever the routing mode"""
+        return self.primary.explain(input_data)
+
+    def _predict_with_shadow(self, primary: Any, candidate: Any, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        features = primary.encode_batch(records)
+        results = primary.predict_encoded(records, features)
+        self._count(len(records), 0)
+        self.shadow.submit(self._score_shadow, primary, candidate, self.comparison, records, features, results)
+        return results
+
+    @staticmethod
+    def _score_shadow(primary: Any, candidate: Any, comparison: ShadowComparison, records: List[Dict[str, Any]],
+                      features: np.ndarray, results: List[Dict[str, Any]]) -> None:
+        if candidate.input_layout != primary.input_layout:
+            features = candidate.encoder.encode_batch(records)
+        probabilities = candidate.predict_proba_encoded(features)
+        comparison.record(
+            np.array([result["prediction"] for result in results]),
+            np.array([result["probability"] for result in results]),
+            candidate.model.classes_[np.argmax(probabilities, axis=1)],
+            probabilities[:, 1]
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        mode, candidate_name, candidate, percent = self.routing
+        return {
+            "mode": mode,
+            "candidate": {"name": candidate_name, "version": candidate.version} if candidate else None,
+            "canary_percent": percent if mode == "canary" else None,
+            "routed": dict(self.routed),
+            "shadow": dict(self.comparison.snapshot(), worker=self.shadow.stats())
+        }
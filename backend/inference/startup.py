@@ -0,0 +1,97 @@
+"""
+Startup timeline
+
+Records how long a server process spent importing modules, loading each
+model and starting the inference runtime, and when it answered its first
+prediction. Times are seconds since the process started (taken from /proc
+where available, otherwise from when this module was imported).
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def process_start_time() -> Optional[float]:
+    """Wall-clock start time of the current process, from /proc on Linux"""
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces; fields resume after its ')'
+            fields = f.read().rsplit(")", 1)[1].split()
+        started_after_boot = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        # /proc/uptime has 10 ms resolution (the btime in /proc/stat only whole seconds)
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - started_after_boot)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupTimeline:
+    """Durations of startup phases and time to first prediction"""
+
+    def __init__(self):
+        self.started_at = process_start_time() or time.time()
+        self.phases: Dict[str, float] = {}
+        self.ready_at: Optional[float] = None
+        self.first_prediction_at: Optional[float] = None
+        self.first_prediction_model: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def since_start(self, at: Optional[float] = None) -> float:
+        return (at if at is not None else time.time()) - self.started_at
+
+    def record(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[phase] = seconds
+
+    def phase(self, name: str) -> "_Phase":
+        """Context manager timing one phase"""
+        return _Phase(self, name)
+
+    def mark_ready(self) -> None:
+        self.ready_at = time.time()
+        logger.info(
+            f"Startup complete in {self.since_start(self.ready_at):.3f}s "
+            + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.phases.items())
+        )
+
+    def mark_prediction(self, model_name: str) -> None:
+        """Record the first answered prediction; later calls are a cheap no-op"""
+        if self.first_prediction_at is not None:
+            return
+        with self._lock:
+            if self.first_prediction_at is not None:
+                return
+            self.first_prediction_at = time.time()
+            self.first_prediction_model = model_name
+        logger.info(f"Time to first prediction: {self.since_start(self.first_prediction_at):.3f}s ({model_name})")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "phases_seconds": dict(self.phases),
+            "ready_seconds": self.since_start(self.ready_at) if self.ready_at else None,
+            "first_prediction_seconds": (
+                self.since_start(self.first_prediction_at) if self.first_prediction_at else None
+            ),
+            "first_prediction_model": self.first_prediction_model
+        }
+
+
+class _Phase:
+    def __init__(self, timeline: StartupTimeline, name: str):
+        self.timeline = timeline
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timeline.record(self.name, time.perf_counter() - self.start)
+        return False
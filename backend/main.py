@@ -2,33 +2,59 @@
 FastAPI Backend for AI-Driven Disease Risk Prediction System
 """
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+import time
+
+# Startup instrumentation: everything imported below counts as import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from pydantic import BaseModel, ValidationError
 import uvicorn
+import atexit
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple, Type
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the parent directory to the path to import ML models
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from models.heart_model import HeartDiseasePredictor
 from models.diabetes_model import DiabetesPredictor
-from schemas.prediction_schemas import HeartPredictionRequest, DiabetesPredictionRequest, PredictionResponse
-
-# Configure logging with UTF-8 encoding
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/app.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+# ml_runtime is on the path once the predictors are imported
+from ml_runtime.memory import MemoryWatchdog, TracemallocSession, admin_authorized, memory_report
+from inference.executor import InferenceExecutor, InferenceQueueFull
+from inference.model_manager import ModelManager
+from inference.batching import MicroBatcher
+from inference.process_stats import memory_usage, worker_info
+from inference.startup import StartupTimeline
+from observability.log_pipeline import LogPipeline, PayloadSampler
+from observability.metrics import (
+    PredictionTimingMiddleware, mark_handler_started, mark_inference_finished, metrics
+)
+from observability.profiling import ProfilingMiddleware, RequestProfiler, profiling_active
+from schemas.prediction_schemas import (
+    HeartPredictionRequest, DiabetesPredictionRequest, PredictionResponse,
+    HeartBatchPredictionRequest, DiabetesBatchPredictionRequest,
+    BatchPredictionItem, BatchRecordError, BatchPredictionResponse, ModelRoutingRequest,
+    ExplanationResponse, GlobalExplanationResponse
 )
+
+# Configure logging: JSON records written in batches by a background thread
+log_pipeline = LogPipeline.from_env().start()
+atexit.register(log_pipeline.stop)
 logger = logging.getLogger(__name__)
 
+# Share of prediction requests logged with their full payload, per route
+payload_sampler = PayloadSampler.from_env()
+
+startup_timeline = StartupTimeline()
+startup_timeline.record("import", time.perf_counter() - _import_started)
+
 # Create FastAPI app
 app = FastAPI(
     title="AI-Driven Disease Risk Prediction API",
@@ -45,24 +71,125 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-stage latency and outcome metrics for the prediction routes (see /metrics)
+app.add_middleware(
+    PredictionTimingMiddleware,
+    routes={
+        "/predict/heart": "heart",
+        "/predict/diabetes": "diabetes",
+        "/predict/heart/batch": "heart",
+        "/predict/diabetes/batch": "diabetes"
+    }
+)
+
+# Opt-in request profiling (X-Profile header or PROFILE_SAMPLE_RATE); the
+# middleware is only installed when one of them is enabled
+request_profiler = RequestProfiler.from_env()
+if request_profiler.enabled:
+    app.add_middleware(ProfilingMiddleware, profiler=request_profiler, path_prefix="/predict")
+    logger.info(f"Request profiling enabled, profiles written to {request_profiler.profile_dir}")
+
 # Initialize ML models
 heart_predictor = None
 diabetes_predictor = None
 
+# Runs blocking inference off the event loop
+inference_executor = None
+
+# Reloads, swaps and rolls back the served predictors
+model_manager = None
+
+# Groups concurrent single predictions per model (empty when disabled)
+micro_batchers: Dict[str, MicroBatcher] = {}
+
+# RSS watchdog (started per worker when MEMORY_RECYCLE_RSS_MB is set) and
+# on-demand tracemalloc for the admin endpoints
+memory_watchdog = None
+tracemalloc_session = TracemallocSession()
+
+def load_models():
+    """
+    Load both predictors into the module globals. The production launcher
+    (serve.py) calls this in the master process before forking workers, so
+    the startup event only loads models that were not preloaded.
+    """
+    global heart_predictor, diabetes_predictor
+    
+    def load(name, predictor_class):
+        with startup_timeline.phase(f"load_{name}"):
+            return predictor_class()
+    
+    logger.info("Initializing ML models...")
+    # Load both models concurrently: most of the time is file I/O, numpy
+    # array reads and imports, so a restart costs the slower load, not the sum.
+    # The loaders import sklearn under a shared lock before unpickling
+    # (ml_runtime.artifact.import_pickle_modules), so the two threads never
+    # race on its first import
+    with startup_timeline.phase("load_models"), ThreadPoolExecutor(max_workers=2) as pool:
+        heart_future = pool.submit(load, "heart", HeartDiseasePredictor)
+        diabetes_future = pool.submit(load, "diabetes", DiabetesPredictor)
+        heart_predictor = heart_future.result()
+        diabetes_predictor = diabetes_future.result()
+    logger.info("✅ All ML models initialized successfully")
+
+def _serve_predictor(model_name: str, predictor: Any) -> None:
+    """Point the module globals at a predictor swapped in by the model manager"""
+    global heart_predictor, diabetes_predictor
+    if model_name == "heart":
+        heart_predictor = predictor
+    else:
+        diabetes_predictor = predictor
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize ML models on startup"""
-    global heart_predictor, diabetes_predictor
+    global inference_executor, memory_watchdog, model_manager
     
     try:
-        logger.info("Initializing ML models...")
-        heart_predictor = HeartDiseasePredictor()
-        diabetes_predictor = DiabetesPredictor()
-        logger.info("✅ All ML models initialized successfully")
+        if heart_predictor is None or diabetes_predictor is None:
+            load_models()
+        else:
+            logger.info(f"Using preloaded ML models in worker {os.getpid()}")
+        
+        with startup_timeline.phase("start_runtime"):
+            inference_executor = InferenceExecutor.from_env()
+            model_manager = ModelManager(inference_executor, asyncio.get_running_loop(), on_swap=_serve_predictor)
+            # The executor calls each model through its router (primary, canary or shadow)
+            heart_router = model_manager.register("heart", heart_predictor, HeartDiseasePredictor, HeartPredictionRequest)
+            diabetes_router = model_manager.register("diabetes", diabetes_predictor, DiabetesPredictor, DiabetesPredictionRequest)
+            inference_executor.register_model("heart", heart_router, factory=HeartDiseasePredictor)
+            inference_executor.register_model("diabetes", diabetes_router, factory=DiabetesPredictor)
+            inference_executor.start()
+            # Threads do not survive fork either, so watchers start per worker
+            model_manager.start()
+            
+            if os.environ.get("MICROBATCH_ENABLED", "true").lower() == "true":
+                for model_name in ("heart", "diabetes"):
+                    micro_batchers[model_name] = MicroBatcher.from_env(inference_executor, model_name)
+                logger.info("Micro-batching enabled for single predictions")
+        
+        # Threads do not survive fork, so each serve.py worker starts its own
+        memory_watchdog = MemoryWatchdog.from_env(log=logger)
+        if memory_watchdog.enabled:
+            memory_watchdog.ensure_started()
+            logger.info(f"Memory watchdog: recycling above {memory_watchdog.max_rss_bytes / 2**20:.0f} MiB RSS")
+        
+        startup_timeline.mark_ready()
     except Exception as e:
         logger.error(f"❌ Failed to initialize ML models: {str(e)}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release inference workers on shutdown"""
+    if memory_watchdog:
+        memory_watchdog.stop()
+    if model_manager:
+        model_manager.stop()
+    if inference_executor:
+        inference_executor.shutdown()
+    log_pipeline.stop()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -73,7 +200,28 @@ async def root():
         "endpoints": {
             "heart_prediction": "/predict/heart",
             "diabetes_prediction": "/predict/diabetes",
-            "health_check": "/health"
+            "heart_batch_prediction": "/predict/heart/batch",
+            "diabetes_batch_prediction": "/predict/diabetes/batch",
+            "heart_explanation": "/explain/heart",
+            "diabetes_explanation": "/explain/diabetes",
+            "global_explanation": "/explain/global/{disease}",
+            "health_check": "/health",
+            "executor_stats": "/stats/executor",
+            "batching_stats": "/stats/batching",
+            "cache_stats": "/stats/cache",
+            "worker_stats": "/stats/worker",
+            "startup_stats": "/stats/startup",
+            "logging_stats": "/stats/logging",
+            "metrics": "/metrics",
+            "profiling_stats": "/stats/profiling",
+            "memory_stats": "/stats/memory",
+            "model_stats": "/stats/models",
+            "model_reload": "/admin/models/{model}/reload",
+            "model_rollback": "/admin/models/{model}/rollback",
+            "model_routing": "/admin/models/{model}/routing",
+            "model_promote": "/admin/models/{model}/promote",
+            "tracemalloc": "/admin/tracemalloc/{start,snapshot,stop}",
+            "profiles": "/profiles/{name}"
         }
     }
 
@@ -88,26 +236,240 @@ async def health_check():
         }
     }
 
+@app.get("/stats/executor")
+async def executor_stats():
+    """Inference executor queue depth and throughput counters"""
+    if not inference_executor:
+        raise HTTPException(status_code=500, detail="Inference executor not started")
+    
+    return inference_executor.metrics()
+
+@app.get("/stats/batching")
+async def batching_stats():
+    """Micro-batching window, batch-size and wait-time histograms per model"""
+    return {
+        "enabled": bool(micro_batchers),
+        "models": {name: batcher.metrics() for name, batcher in micro_batchers.items()}
+    }
+
+@app.get("/stats/cache")
+async def cache_stats():
+    """Prediction cache hit, miss and eviction counters per model"""
+    return {
+        "heart": heart_predictor.cache.stats() if heart_predictor else None,
+        "diabetes": diabetes_predictor.cache.stats() if diabetes_predictor else None
+    }
+
+@app.get("/stats/worker")
+async def worker_stats():
+    """Process id, CPU affinity and memory (RSS/PSS/shared) of the worker serving this request"""
+    return worker_info()
+
+@app.get("/stats/startup")
+async def startup_stats():
+    """Import time, per-model load time, readiness and time to first prediction of this process"""
+    return startup_timeline.snapshot()
+
+@app.get("/stats/logging")
+async def logging_stats():
+    """Log queue depth, dropped records and batched writes"""
+    return {
+        **log_pipeline.stats(),
+        "payload_sample_rate": payload_sampler.default_rate,
+        "payload_sample_rates": payload_sampler.route_rates
+    }
+
+@app.get("/stats/memory")
+async def memory_stats():
+    """RSS breakdown, tree node bytes per model, watchdog and tracemalloc state"""
+    models = {"heart": getattr(heart_predictor, "model", None), "diabetes": getattr(diabetes_predictor, "model", None)}
+    return {
+        **memory_report(models, memory_watchdog),
+        "process": memory_usage()
+    }
+
+def _require_admin(token: Optional[str]) -> None:
+    if not admin_authorized(token):
+        raise HTTPException(status_code=403, detail="Admin endpoints need ADMIN_TOKEN set and sent as X-Admin-Token")
+
+@app.post("/admin/tracemalloc/start")
+async def tracemalloc_start(frames: int = 1, x_admin_token: Optional[str] = Header(None)):
+    """Start tracing allocations (``frames`` stack frames per allocation) and take a baseline"""
+    _require_admin(x_admin_token)
+    # The baseline snapshot walks every traced allocation: keep it off the event loop
+    return await asyncio.to_thread(tracemalloc_session.start, frames)
+
+@app.post("/admin/tracemalloc/snapshot")
+async def tracemalloc_snapshot(limit: int = 25, key_type: str = "lineno",
+                               x_admin_token: Optional[str] = Header(None)):
+    """Top allocation sites and their growth since the previous snapshot"""
+    _require_admin(x_admin_token)
+    try:
+        # Taking and diffing snapshots is slow, blocking work: keep it off the event loop
+        return await asyncio.to_thread(tracemalloc_session.snapshot, limit, key_type)
+    except (RuntimeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/admin/tracemalloc/stop")
+async def tracemalloc_stop(x_admin_token: Optional[str] = Header(None)):
+    """Stop tracing allocations"""
+    _require_admin(x_admin_token)
+    return await asyncio.to_thread(tracemalloc_session.stop)
+
+@app.get("/stats/models")
+async def model_stats():
+    """Serving and previous version of each model, reload counters, file watchers, registry versions and routing"""
+    return model_manager.stats() if model_manager else {}
+
+def _require_model(model_name: str) -> None:
+    if not model_manager or model_name not in model_manager.slots:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {model_name}")
+
+@app.post("/admin/models/{model_name}/reload")
+async def reload_model(model_name: str, wait: bool = False, force: bool = False,
+                       x_admin_token: Optional[str] = Header(None)):
+    """Load model.pkl again, warm it with canaries and swap it in (in the background unless ``wait``)"""
+    _require_admin(x_admin_token)
+    _require_model(model_name)
+    if wait:
+        result = await asyncio.to_thread(model_manager.reload, model_name, force)
+        return JSONResponse(status_code=500 if result["status"] == "failed" else 200, content=result)
+    started = model_manager.reload_in_background(model_name, force)
+    return JSONResponse(status_code=202, content={"model": model_name, "status": "started" if started else "in_progress"})
+
+@app.post("/admin/models/{model_name}/rollback")
+async def rollback_model(model_name: str, x_admin_token: Optional[str] = Header(None)):
+    """Serve the previous version of a model again"""
+    _require_admin(x_admin_token)
+    _require_model(model_name)
+    try:
+        return await asyncio.to_thread(model_manager.rollback, model_name)
+    except (LookupError, RuntimeError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/admin/models/{model_name}/routing")
+async def route_model(model_name: str, routing: ModelRoutingRequest, x_admin_token: Optional[str] = Header(None)):
+    """Serve the primary only, canary a registry version or shadow it"""
+    _require_admin(x_admin_token)
+    _require_model(model_name)
+    try:
+        return await asyncio.to_thread(model_manager.set_routing, model_name, routing.mode,
+                                       routing.candidate, routing.percent)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/admin/models/{model_name}/promote")
+async def promote_model(model_name: str, x_admin_token: Optional[str] = Header(None)):
+    """Serve the canary or shadow candidate as the primary (undone by rollback)"""
+    _require_admin(x_admin_token)
+    _require_model(model_name)
+    try:
+        return await asyncio.to_thread(model_manager.promote, model_name)
+    except (LookupError, RuntimeError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/stats/profiling")
+async def profiling_stats():
+    """Request profiling triggers and the number of profiles written"""
+    return request_profiler.stats()
+
+@app.get("/profiles/{name}")
+async def get_profile(name: str, x_profile_token: Optional[str] = Header(None)):
+    """Download a stored profile (.pstats or .collapsed), as linked from a profiled response"""
+    if not request_profiler.authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+    path = request_profiler.path_for(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile '{name}' not found")
+    media_type = "text/plain" if name.endswith(".collapsed") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=name)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Stage latency histograms and outcome counters in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def _log_prediction(route: str, model_name: str, payload: Dict[str, Any], result: Dict[str, Any]) -> None:
+    """One structured record per prediction; full payloads only for sampled requests"""
+    fields = {
+        "route": route,
+        "model": model_name,
+        "prediction": result.get("prediction"),
+        "probability": result.get("probability"),
+        "risk_level": result.get("risk_level"),
+        "model_version": result.get("model_version")
+    }
+    if payload_sampler.sample(route):
+        fields["request"] = payload
+        fields["result"] = result
+    logger.info("Prediction served", extra={"fields": fields})
+
+def _log_batch(route: str, model_name: str, records: List[Dict[str, Any]], response: BatchPredictionResponse) -> None:
+    """One structured record per batch; full payloads only for sampled requests"""
+    risk_levels: Dict[str, int] = {}
+    for item in response.results:
+        risk_levels[item.risk_level] = risk_levels.get(item.risk_level, 0) + 1
+    fields = {
+        "route": route,
+        "model": model_name,
+        "total": response.total,
+        "succeeded": response.succeeded,
+        "failed": response.failed,
+        "risk_levels": risk_levels,
+        # Canary routing can score records of one batch with different versions
+        "model_versions": sorted({item.model_version for item in response.results if item.model_version})
+    }
+    if payload_sampler.sample(route):
+        fields["request"] = records
+        fields["result"] = response.dict()
+    logger.info("Batch prediction served", extra={"fields": fields})
+
+async def _predict_single(model_name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Score one record through the micro-batcher when enabled, otherwise directly"""
+    batcher = micro_batchers.get(model_name)
+    # A profiled request is scored on its own so the model call is in its profile
+    if batcher and not profiling_active():
+        result = await batcher.submit(payload)
+    else:
+        result = await inference_executor.run(model_name, "predict", payload)
+    startup_timeline.mark_prediction(model_name)
+    metrics.inc("prediction_risk_level_total", model=model_name, risk_level=result["risk_level"])
+    return result
+
 @app.post("/predict/heart", response_model=PredictionResponse)
 async def predict_heart_disease(request: HeartPredictionRequest):
     """
     Predict heart disease risk based on user input
     """
+    timing = mark_handler_started()
     try:
-        logger.info(f"Received heart disease prediction request: {request.dict()}")
+        payload = request.dict()
         
         if not heart_predictor:
             raise HTTPException(status_code=500, detail="Heart disease model not loaded")
         
         # Make prediction
-        prediction_result = heart_predictor.predict(request.dict())
+        prediction_result = await _predict_single("heart", payload)
+        mark_inference_finished(timing)
         
-        logger.info(f"Heart disease prediction result: {prediction_result}")
+        _log_prediction("/predict/heart", "heart", payload, prediction_result)
         
         return PredictionResponse(**prediction_result)
         
+    except HTTPException:
+        raise
+    except InferenceQueueFull as e:
+        logger.warning(f"Heart disease prediction rejected: {str(e)}", extra={"fields": {"route": "/predict/heart"}})
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        logger.error(f"Error in heart disease prediction: {str(e)}")
+        logger.error(
+            f"Error in heart disease prediction: {str(e)}",
+            extra={"fields": {"route": "/predict/heart", "request": request.dict()}}
+        )
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
 @app.post("/predict/diabetes", response_model=PredictionResponse)
@@ -115,23 +477,180 @@ async def predict_diabetes_risk(request: DiabetesPredictionRequest):
     """
     Predict diabetes risk based on user input
     """
+    timing = mark_handler_started()
     try:
-        logger.info(f"Received diabetes prediction request: {request.dict()}")
+        payload = request.dict()
         
         if not diabetes_predictor:
             raise HTTPException(status_code=500, detail="Diabetes model not loaded")
         
         # Make prediction
-        prediction_result = diabetes_predictor.predict(request.dict())
+        prediction_result = await _predict_single("diabetes", payload)
+        mark_inference_finished(timing)
         
-        logger.info(f"Diabetes prediction result: {prediction_result}")
+        _log_prediction("/predict/diabetes", "diabetes", payload, prediction_result)
         
         return PredictionResponse(**prediction_result)
         
+    except HTTPException:
+        raise
+    except InferenceQueueFull as e:
+        logger.warning(f"Diabetes prediction rejected: {str(e)}", extra={"fields": {"route": "/predict/diabetes"}})
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        logger.error(f"Error in diabetes prediction: {str(e)}")
+        logger.error(
+            f"Error in diabetes prediction: {str(e)}",
+            extra={"fields": {"route": "/predict/diabetes", "request": request.dict()}}
+        )
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+async def _explain(model_name: str, route: str, payload: Dict[str, Any]) -> ExplanationResponse:
+    """Attribute one record's predicted probability to its fields on the inference executor"""
+    try:
+        result = await inference_executor.run(model_name, "explain", payload)
+        logger.info("Explanation served", extra={"fields": {
+            "route": route, "model": model_name, "model_version": result.get("model_version")
+        }})
+        return ExplanationResponse(**result)
+    except InferenceQueueFull as e:
+        logger.warning(f"Explanation rejected: {str(e)}", extra={"fields": {"route": route}})
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in {model_name} explanation: {str(e)}", extra={"fields": {"route": route, "request": payload}})
+        raise HTTPException(status_code=500, detail=f"Explanation failed: {str(e)}")
+
+@app.post("/explain/heart", response_model=ExplanationResponse)
+async def explain_heart_disease(request: HeartPredictionRequest):
+    """
+    Contribution of every field to the predicted heart disease probability
+    """
+    if not heart_predictor:
+        raise HTTPException(status_code=500, detail="Heart disease model not loaded")
+    return await _explain("heart", "/explain/heart", request.dict())
+
+@app.post("/explain/diabetes", response_model=ExplanationResponse)
+async def explain_diabetes_risk(request: DiabetesPredictionRequest):
+    """
+    Contribution of every field to the predicted diabetes probability
+    """
+    if not diabetes_predictor:
+        raise HTTPException(status_code=500, detail="Diabetes model not loaded")
+    return await _explain("diabetes", "/explain/diabetes", request.dict())
+
+@app.get("/explain/global/{disease}", response_model=GlobalExplanationResponse)
+async def explain_global(disease: str):
+    """
+    Permutation importance and partial dependence of a model, precomputed for its model.pkl
+    """
+    _require_model(disease)
+    explanations = model_manager.global_explanations(disease)
+    if explanations is None:
+        status = model_manager.explanations.status(disease)
+        if status.get("state") == "failed":
+            raise HTTPException(status_code=500, detail=f"Global explanations failed: {status.get('error')}")
+        raise HTTPException(status_code=503, detail=f"Global explanations for {disease} are being prepared")
+    return explanations
+
+def _validate_batch(records: List[Dict[str, Any]], schema: Type[BaseModel]) -> Tuple[List[int], List[Dict[str, Any]], List[BatchRecordError]]:
+    """Validate each batch record individually so one bad record does not reject the batch"""
+    valid_indices = []
+    valid_records = []
+    errors = []
+    
+    for index, record in enumerate(records):
+        try:
+            valid_records.append(schema(**record).dict())
+            valid_indices.append(index)
+        except ValidationError as e:
+            message = "; ".join(
+                f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+            errors.append(BatchRecordError(index=index, message=message))
+    
+    return valid_indices, valid_records, errors
+
+async def _run_batch(model_name: str, records: List[Dict[str, Any]], schema: Type[BaseModel]) -> BatchPredictionResponse:
+    """Validate, score and assemble a batch prediction response"""
+    # Validating up to MAX_BATCH_SIZE records takes tens of ms: keep it off the event loop
+    valid_indices, valid_records, errors = await asyncio.to_thread(_validate_batch, records, schema)
+    # Per-record validation belongs to the validation stage, so it ends here
+    timing = mark_handler_started()
+    
+    prediction_results = await inference_executor.run(model_name, "predict_batch", valid_records)
+    if prediction_results:
+        startup_timeline.mark_prediction(model_name)
+        metrics.count_values("prediction_risk_level_total", (r["risk_level"] for r in prediction_results),
+                             "risk_level", model=model_name)
+    mark_inference_finished(timing)
+    results = [
+        BatchPredictionItem(index=index, **result)
+        for index, result in zip(valid_indices, prediction_results)
+    ]
+    
+    return BatchPredictionResponse(
+        total=len(records),
+        succeeded=len(results),
+        failed=len(errors),
+        results=results,
+        errors=errors
+    )
+
+@app.post("/predict/heart/batch", response_model=BatchPredictionResponse)
+async def predict_heart_disease_batch(request: HeartBatchPredictionRequest):
+    """
+    Predict heart disease risk for many patients in a single vectorized call
+    """
+    try:
+        if not heart_predictor:
+            raise HTTPException(status_code=500, detail="Heart disease model not loaded")
+        
+        response = await _run_batch("heart", request.records, HeartPredictionRequest)
+        
+        _log_batch("/predict/heart/batch", "heart", request.records, response)
+        
+        return response
+        
+    except HTTPException:
+        raise
+    except InferenceQueueFull as e:
+        logger.warning(f"Heart disease batch prediction rejected: {str(e)}",
+                       extra={"fields": {"route": "/predict/heart/batch", "records": len(request.records)}})
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(
+            f"Error in heart disease batch prediction: {str(e)}",
+            extra={"fields": {"route": "/predict/heart/batch", "request": request.records}}
+        )
+        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
+
+@app.post("/predict/diabetes/batch", response_model=BatchPredictionResponse)
+async def predict_diabetes_risk_batch(request: DiabetesBatchPredictionRequest):
+    """
+    Predict diabetes risk for many patients in a single vectorized call
+    """
+    try:
+        if not diabetes_predictor:
+            raise HTTPException(status_code=500, detail="Diabetes model not loaded")
+        
+        response = await _run_batch("diabetes", request.records, DiabetesPredictionRequest)
+        
+        _log_batch("/predict/diabetes/batch", "diabetes", request.records, response)
+        
+        return response
+        
+    except HTTPException:
+        raise
+    except InferenceQueueFull as e:
+        logger.warning(f"Diabetes batch prediction rejected: {str(e)}",
+                       extra={"fields": {"route": "/predict/diabetes/batch", "records": len(request.records)}})
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(
+            f"Error in diabetes batch prediction: {str(e)}",
+            extra={"fields": {"route": "/predict/diabetes/batch", "request": request.records}}
+        )
+        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Custom HTTP exception handler"""
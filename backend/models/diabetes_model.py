@@ -2,272 +2,400 @@
 Diabetes Risk Prediction Model
 """
 
-import pandas as pd
 import numpy as np
-import joblib
 import logging
 import os
+import sys
+import time
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, TYPE_CHECKING
+
+from inference.cache import PredictionCache
+from observability.metrics import metrics
+from models.encoders import DiabetesFeatureEncoder
+from models.risk import risk_level
+from models.rules import PREDICTION, SCALAR_MAX_ROWS, Rule, RuleTable, always, record_matrix, rule_fields
+
+# Shared inference runtime (compiled forests) lives next to the trained models
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction'))
+from ml_runtime.artifact import load_scaler, load_serving_model
+from ml_runtime.explain import PathExplainer
+from ml_runtime.forest import CompiledForest
+from ml_runtime.manifest import check_model, load_manifest, model_version
+
+# pandas is only needed for the named-column input of the sklearn forest; it is
+# imported on first use to keep startup fast
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+
+def _recommendations(input_data: Dict[str, Any], prediction: int) -> List[str]:
+    """RECOMMENDATION_RULES for one request, as plain comparisons (its direct path)"""
+    recommendations = []
+
+    if prediction == 1:  # High risk
+        recommendations.append("🏥 Consult an endocrinologist for comprehensive diabetes screening")
+        recommendations.append("🩸 Schedule regular blood glucose monitoring")
+
+    # Glucose level recommendations
+    glucose = input_data.get('glucose', 0)
+    if glucose > 140:
+        recommendations.append("⚠️ Your glucose levels are elevated - seek immediate medical attention")
+    elif glucose > 100:
+        recommendations.append("📊 Monitor blood glucose levels regularly")
+
+    # BMI recommendations
+    bmi = input_data.get('bmi', 0)
+    if bmi > 30:
+        recommendations.append("⚖️ Work on weight reduction with a structured diet plan")
+    elif bmi > 25:
+        recommendations.append("🥗 Maintain a healthy weight through balanced nutrition")
+
+    # Age-based recommendations
+    if input_data.get('age', 0) > 45:
+        recommendations.append("📅 Schedule annual diabetes screening tests")
+
+    # Blood pressure recommendations
+    if input_data.get('blood_pressure', 0) > 130:
+        recommendations.append("🩺 Monitor and manage blood pressure regularly")
+
+    # Pregnancy-related recommendations
+    if input_data.get('pregnancies', 0) > 0 and glucose > 140:
+        recommendations.append("🤰 Monitor for gestational diabetes in future pregnancies")
+
+    # General recommendations
+    recommendations.extend([
+        "🥬 Follow a low-glycemic diet rich in fiber",
+        "🏃‍♀️ Engage in regular physical activity (150 minutes per week)",
+        "💧 Stay well-hydrated and limit sugary beverages",
+        "😴 Maintain regular sleep patterns (7-8 hours per night)",
+        "🧘‍♀️ Practice stress management techniques",
+        "📱 Use diabetes tracking apps to monitor progress"
+    ])
+
+    return recommendations[:8]  # Return top 8 recommendations
+
+
+def _risk_factors(input_data: Dict[str, Any]) -> List[str]:
+    """RISK_FACTOR_RULES for one request, as plain comparisons (its direct path)"""
+    risk_factors = []
+
+    if input_data.get('age', 0) > 45:
+        risk_factors.append("Advanced age (>45 years)")
+
+    if input_data.get('bmi', 0) > 25:
+        risk_factors.append("Overweight/Obesity")
+
+    if input_data.get('glucose', 0) > 100:
+        risk_factors.append("Elevated glucose levels")
+
+    if input_data.get('blood_pressure', 0) > 130:
+        risk_factors.append("High blood pressure")
+
+    if input_data.get('family_history', 0) == 1:
+        risk_factors.append("Family history of diabetes")
+
+    if input_data.get('pregnancies', 0) > 0 and input_data.get('glucose', 0) > 140:
+        risk_factors.append("History of gestational diabetes")
+
+    if input_data.get('physical_activity', 0) < 3:
+        risk_factors.append("Sedentary lifestyle")
+
+    if input_data.get('smoking', 0) == 1:
+        risk_factors.append("Smoking")
+
+    if input_data.get('alcohol', 0) > 14:
+        risk_factors.append("Excessive alcohol consumption")
+
+    if input_data.get('diabetes_pedigree', 0) > 0.5:
+        risk_factors.append("Strong genetic predisposition")
+
+    if input_data.get('insulin', 0) == 0 and input_data.get('glucose', 0) > 140:
+        risk_factors.append("Insulin resistance indicators")
+
+    return risk_factors
+
+
+# Recommendations, in priority order; the response lists the first 8 that apply
+RECOMMENDATION_RULES = RuleTable([
+    Rule(PREDICTION, "==", 1, "🏥 Consult an endocrinologist for comprehensive diabetes screening", 10),
+    Rule(PREDICTION, "==", 1, "🩸 Schedule regular blood glucose monitoring", 11),
+    Rule("glucose", ">", 140, "⚠️ Your glucose levels are elevated - seek immediate medical attention", 20),
+    Rule("glucose", ">", 100, "📊 Monitor blood glucose levels regularly", 21, also=(("glucose", "<=", 140),)),
+    Rule("bmi", ">", 30, "⚖️ Work on weight reduction with a structured diet plan", 30),
+    Rule("bmi", ">", 25, "🥗 Maintain a healthy weight through balanced nutrition", 31, also=(("bmi", "<=", 30),)),
+    Rule("age", ">", 45, "📅 Schedule annual diabetes screening tests", 40),
+    Rule("blood_pressure", ">", 130, "🩺 Monitor and manage blood pressure regularly", 50),
+    Rule("pregnancies", ">", 0, "🤰 Monitor for gestational diabetes in future pregnancies", 60,
+         also=(("glucose", ">", 140),)),
+    # General recommendations
+    always("🥬 Follow a low-glycemic diet rich in fiber", 90),
+    always("🏃‍♀️ Engage in regular physical activity (150 minutes per week)", 91),
+    always("💧 Stay well-hydrated and limit sugary beverages", 92),
+    always("😴 Maintain regular sleep patterns (7-8 hours per night)", 93),
+    always("🧘‍♀️ Practice stress management techniques", 94),
+    always("📱 Use diabetes tracking apps to monitor progress", 95),
+], limit=8, direct=_recommendations)
+
+RISK_FACTOR_RULES = RuleTable([
+    Rule("age", ">", 45, "Advanced age (>45 years)", 10),
+    Rule("bmi", ">", 25, "Overweight/Obesity", 20),
+    Rule("glucose", ">", 100, "Elevated glucose levels", 30),
+    Rule("blood_pressure", ">", 130, "High blood pressure", 40),
+    Rule("family_history", "==", 1, "Family history of diabetes", 50),
+    Rule("pregnancies", ">", 0, "History of gestational diabetes", 60, also=(("glucose", ">", 140),)),
+    Rule("physical_activity", "<", 3, "Sedentary lifestyle", 70),
+    Rule("smoking", "==", 1, "Smoking", 80),
+    Rule("alcohol", ">", 14, "Excessive alcohol consumption", 90),
+    Rule("diabetes_pedigree", ">", 0.5, "Strong genetic predisposition", 100),
+    Rule("insulin", "==", 0, "Insulin resistance indicators", 110, also=(("glucose", ">", 140),)),
+], direct=_risk_factors)
+
+# Request fields either table tests, read from the records once for both
+RULE_FIELDS = rule_fields(RECOMMENDATION_RULES, RISK_FACTOR_RULES)
+
 class DiabetesPredictor:
     """Diabetes Risk Prediction Model"""
     
-    def __init__(self):
+    # Trained model files (read again by every reload)
+    model_path = os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction', 'flask-diabetes', 'model.pkl')
+    scaler_path = os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction', 'flask-diabetes', 'scaler.pkl')
+    
+    def __init__(self, model_path: Optional[str] = None):
+        """
+        ``model_path`` loads another version of the model, such as a registry
+        version (``versions/<name>/model.pkl``); its directory's scaler.pkl is
+        used when there is one.
+        """
+        if model_path is not None:
+            self.model_path = model_path
+            scaler_path = os.path.join(os.path.dirname(model_path), 'scaler.pkl')
+            if os.path.exists(scaler_path):
+                self.scaler_path = scaler_path
         self.model = None
         self.scaler = None
-        # These are the exact features the model expects (in order)
-        self.expected_features = [
-            'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 
-            'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age',
-            'PhysicalActivity', 'AlcoholConsumption',  # Numerical categorical
-            'FamilyHistory_No', 'FamilyHistory_Yes',    # One-hot encoded
-            'SmokingStatus_Non-Smoker', 'SmokingStatus_Smoker'  # One-hot encoded
-        ]
+        self.encoder = None
+        self._explainer = None
+        # Version ID of the loaded model.pkl (SHA-256 prefix), returned with every prediction
+        self.version = None
+        # The exact features the model expects (in order), from the model manifest
+        self.expected_features = None
+        self.cache = PredictionCache.from_env()
+        # Latency histograms per pipeline stage, served by /metrics
+        self.stage_seconds = {
+            stage: metrics.histogram("prediction_model_stage_seconds", model="diabetes", stage=stage)
+            for stage in ("encode", "predict_proba", "postprocess")
+        }
         self.load_model()
     
     def load_model(self):
         """Load the trained diabetes model and scaler"""
         try:
-            model_path = os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction', 'flask-diabetes', 'model.pkl')
-            scaler_path = os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction', 'flask-diabetes', 'scaler.pkl')
+            model_path = self.model_path
+            scaler_path = self.scaler_path
             
-            self.model = joblib.load(model_path)
+            manifest = load_manifest(model_path)
+            self.version = model_version(manifest)
+            self.model_sha256 = manifest['model']['sha256']
+            model = load_serving_model(model_path, name='diabetes')
+            self.cache.clear()
+            self._explainer = None
             logger.info("Diabetes model loaded successfully")
             
             try:
-                self.scaler = joblib.load(scaler_path)
+                self.scaler = load_scaler(scaler_path)
                 logger.info("Diabetes scaler loaded successfully")
             except FileNotFoundError:
                 logger.warning("Scaler not found, proceeding without scaling")
                 self.scaler = None
+            
+            check_model(manifest, model)
+            self.model = model
+            self.expected_features = list(manifest['input_columns'])
+            # An sklearn forest fitted on named columns warns on bare NumPy rows
+            self._named_input = not isinstance(model, CompiledForest) and hasattr(model, 'feature_names_in_')
+            self.encoder = DiabetesFeatureEncoder.from_manifest(manifest)
+            # Raw feature -> request field (for global explanations)
+            self.feature_fields = {
+                feature['name']: DiabetesFeatureEncoder.REQUEST_FIELDS.get(feature['name'], feature['name'])
+                for feature in manifest['raw_features']
+            }
                 
         except Exception as e:
             logger.error(f"Failed to load diabetes model: {str(e)}")
             raise
     
-    def _prepare_input_data(self, input_data: Dict[str, Any]) -> pd.DataFrame:
-        """Prepare input data to match the exact format expected by the trained model"""
+    def _model_input(self, features: np.ndarray) -> Any:
+        """Encoded rows, labelled with the training column names when the model checks them"""
+        if not self._named_input:
+            return features
+        
+        import pandas as pd
+        
+        return pd.DataFrame(features, columns=self.expected_features)
+    
+    def predict(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Make diabetes risk prediction"""
         try:
-            # Initialize feature vector with default values
-            features = {
-                'Pregnancies': 0,
-                'Glucose': 100,
-                'BloodPressure': 80,
-                'SkinThickness': 20,
-                'Insulin': 0,
-                'BMI': 25.0,
-                'DiabetesPedigreeFunction': 0.5,
-                'Age': 25,
-                'PhysicalActivity': 5,  # Default moderate activity
-                'AlcoholConsumption': 0,  # Default no alcohol
-                'FamilyHistory_No': 1,
-                'FamilyHistory_Yes': 0,
-                'SmokingStatus_Non-Smoker': 1,
-                'SmokingStatus_Smoker': 0
-            }
-            
-            # Map input field names to model feature names
-            field_mapping = {
-                'pregnancies': 'Pregnancies',
-                'glucose': 'Glucose', 
-                'blood_pressure': 'BloodPressure',
-                'skin_thickness': 'SkinThickness',
-                'insulin': 'Insulin',
-                'bmi': 'BMI',
-                'diabetes_pedigree': 'DiabetesPedigreeFunction',
-                'age': 'Age'
-            }
-            
-            # Update numerical features
-            for input_key, model_key in field_mapping.items():
-                if input_key in input_data:
-                    features[model_key] = float(input_data[input_key])
-            
-            # Handle categorical features
-            # Physical Activity - convert text to number if needed
-            if 'physical_activity' in input_data:
-                activity = input_data['physical_activity']
-                if isinstance(activity, str):
-                    activity_map = {
-                        'sedentary': 0, 'low': 2, 'light': 2,
-                        'moderate': 5, 'active': 7, 'high': 9
-                    }
-                    features['PhysicalActivity'] = activity_map.get(activity.lower(), 5)
-                else:
-                    features['PhysicalActivity'] = int(activity)
+            # Encode straight into a NumPy row in model column order. Its bytes
+            # are the cache key, so equivalent inputs (e.g. smoking='yes' and
+            # smoking=1) share an entry
+            started = time.perf_counter()
+            features = self.encoder.encode(input_data)
+            encoded = time.perf_counter()
+            self.stage_seconds["encode"].observe(encoded - started)
+            cache_key = features.tobytes()
+            prediction_proba = self.cache.get(cache_key)
             
-            # Alcohol Consumption - convert text to number if needed  
-            if 'alcohol' in input_data:
-                alcohol = input_data['alcohol']
-                if isinstance(alcohol, str):
-                    alcohol_map = {
-                        'none': 0, 'light': 3, 'moderate': 7, 'heavy': 12
-                    }
-                    features['AlcoholConsumption'] = alcohol_map.get(alcohol.lower(), 0)
-                else:
-                    features['AlcoholConsumption'] = int(alcohol)
-            
-            # Family History - one-hot encoding
-            if 'family_history' in input_data:
-                has_family_history = input_data['family_history']
-                if isinstance(has_family_history, str):
-                    has_family_history = has_family_history.lower() in ['yes', 'true', '1']
-                else:
-                    has_family_history = bool(int(has_family_history))
-                
-                features['FamilyHistory_Yes'] = 1 if has_family_history else 0
-                features['FamilyHistory_No'] = 0 if has_family_history else 1
-            
-            # Smoking Status - one-hot encoding
-            if 'smoking' in input_data:
-                is_smoker = input_data['smoking']
-                if isinstance(is_smoker, str):
-                    is_smoker = is_smoker.lower() in ['smoker', 'yes', 'true', '1', 'current']
-                else:
-                    is_smoker = bool(int(is_smoker))
+            if prediction_proba is None:
+                logger.debug("Feature values: %s", features)
                 
-                features['SmokingStatus_Smoker'] = 1 if is_smoker else 0
-                features['SmokingStatus_Non-Smoker'] = 0 if is_smoker else 1
+                # Make prediction (no additional scaling needed as model expects raw features).
+                # The class is derived from the probabilities, exactly as
+                # RandomForestClassifier.predict does.
+                prediction_proba = self.model.predict_proba(self._model_input(features.reshape(1, -1)))[0]
+                self.stage_seconds["predict_proba"].observe(time.perf_counter() - encoded)
+                self.cache.put(cache_key, prediction_proba)
             
-            # Create DataFrame with features in the exact order expected by the model
-            feature_values = [features[feat] for feat in self.expected_features]
-            df = pd.DataFrame([feature_values], columns=self.expected_features)
+            prediction = self.model.classes_[np.argmax(prediction_proba)]
             
-            logger.info(f"Prepared input data shape: {df.shape}")
-            logger.info(f"Feature values: {df.iloc[0].to_dict()}")
-            
-            return df
+            postprocess_started = time.perf_counter()
+            result = self._build_result(
+                prediction, prediction_proba,
+                _recommendations(input_data, prediction),
+                _risk_factors(input_data),
+                datetime.now().isoformat()
+            )
+            self.stage_seconds["postprocess"].observe(time.perf_counter() - postprocess_started)
+            return result
             
         except Exception as e:
-            logger.error(f"Error in preparing input data: {str(e)}")
+            logger.error(f"Error in diabetes prediction: {str(e)}")
             raise
     
-    def predict(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Make diabetes risk prediction"""
+    def encode_batch(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        """Encode request records into NumPy rows, the input of ``predict_encoded``"""
+        started = time.perf_counter()
+        features = self.encoder.encode_batch(records)
+        self.stage_seconds["encode"].observe(time.perf_counter() - started)
+        return features
+    
+    def predict_batch(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Make diabetes risk predictions for many records with one predict_proba call"""
         try:
-            # Prepare input data to match model expectations
-            processed_data = self._prepare_input_data(input_data)
-            
-            # Make prediction (no additional scaling needed as model expects raw features)
-            prediction = self.model.predict(processed_data)[0]
-            prediction_proba = self.model.predict_proba(processed_data)[0]
-            
-            # Calculate probability and confidence
-            probability = float(prediction_proba[1])  # Probability of positive class
-            confidence = float(max(prediction_proba))
-            
-            # Determine risk level
-            if probability < 0.3:
-                risk_level = "Low Risk"
-            elif probability < 0.7:
-                risk_level = "Moderate Risk"
-            else:
-                risk_level = "High Risk"
-            
-            # Generate recommendations
-            recommendations = self._generate_recommendations(input_data, prediction)
-            
-            # Identify risk factors
-            risk_factors = self._identify_risk_factors(input_data)
+            if not records:
+                return []
             
-            return {
-                "prediction": int(prediction),
-                "probability": probability,
-                "risk_level": risk_level,
-                "confidence": confidence,
-                "recommendations": recommendations,
-                "risk_factors": risk_factors,
-                "timestamp": datetime.now().isoformat()
-            }
+            return self.predict_encoded(records, self.encode_batch(records))
             
         except Exception as e:
-            logger.error(f"Error in diabetes prediction: {str(e)}")
+            logger.error(f"Error in diabetes batch prediction: {str(e)}")
             raise
     
-    def _generate_recommendations(self, input_data: Dict[str, Any], prediction: int) -> List[str]:
-        """Generate health recommendations based on input data and prediction"""
-        recommendations = []
-        
-        if prediction == 1:  # High risk
-            recommendations.append("🏥 Consult an endocrinologist for comprehensive diabetes screening")
-            recommendations.append("🩸 Schedule regular blood glucose monitoring")
-        
-        # Glucose level recommendations
-        glucose = input_data.get('glucose', 0)
-        if glucose > 140:
-            recommendations.append("⚠️ Your glucose levels are elevated - seek immediate medical attention")
-        elif glucose > 100:
-            recommendations.append("📊 Monitor blood glucose levels regularly")
-        
-        # BMI recommendations
-        bmi = input_data.get('bmi', 0)
-        if bmi > 30:
-            recommendations.append("⚖️ Work on weight reduction with a structured diet plan")
-        elif bmi > 25:
-            recommendations.append("🥗 Maintain a healthy weight through balanced nutrition")
-        
-        # Age-based recommendations
-        if input_data.get('age', 0) > 45:
-            recommendations.append("📅 Schedule annual diabetes screening tests")
-        
-        # Blood pressure recommendations
-        if input_data.get('blood_pressure', 0) > 130:
-            recommendations.append("🩺 Monitor and manage blood pressure regularly")
+    def predict_encoded(self, records: List[Dict[str, Any]], features: np.ndarray) -> List[Dict[str, Any]]:
+        """Predictions for records already encoded by ``encode_batch``"""
+        # Only records missing from the cache are sent to the model
+        cache_keys = [row.tobytes() for row in features]
+        probabilities = np.empty((len(records), len(self.model.classes_)))
+        missing = []
+        for i, cache_key in enumerate(cache_keys):
+            cached = self.cache.get(cache_key)
+            if cached is None:
+                missing.append(i)
+            else:
+                probabilities[i] = cached
         
-        # Pregnancy-related recommendations
-        if input_data.get('pregnancies', 0) > 0 and glucose > 140:
-            recommendations.append("🤰 Monitor for gestational diabetes in future pregnancies")
+        if missing:
+            model_started = time.perf_counter()
+            fresh = self.model.predict_proba(self._model_input(features[missing]))
+            self.stage_seconds["predict_proba"].observe(time.perf_counter() - model_started)
+            probabilities[missing] = fresh
+            for i, row in zip(missing, fresh):
+                self.cache.put(cache_keys[i], row)
         
-        # General recommendations
-        recommendations.extend([
-            "🥬 Follow a low-glycemic diet rich in fiber",
-            "🏃‍♀️ Engage in regular physical activity (150 minutes per week)",
-            "💧 Stay well-hydrated and limit sugary beverages",
-            "😴 Maintain regular sleep patterns (7-8 hours per night)",
-            "🧘‍♀️ Practice stress management techniques",
-            "📱 Use diabetes tracking apps to monitor progress"
-        ])
+        predictions = self.model.classes_[np.argmax(probabilities, axis=1)]
         
-        return recommendations[:8]  # Return top 8 recommendations
+        postprocess_started = time.perf_counter()
+        timestamp = datetime.now().isoformat()
+        # Recommendations and risk factors for the whole batch at once; large
+        # batches read the fields both tables test once
+        rule_values = record_matrix(records, RULE_FIELDS) if len(records) > SCALAR_MAX_ROWS else None
+        recommendations = RECOMMENDATION_RULES.apply(records, predictions, rule_values, RULE_FIELDS)
+        risk_factors = RISK_FACTOR_RULES.apply(records, None, rule_values, RULE_FIELDS)
+        results = [
+            self._build_result(prediction, prediction_proba, record_recommendations, record_risk_factors, timestamp)
+            for prediction, prediction_proba, record_recommendations, record_risk_factors
+            in zip(predictions, probabilities, recommendations, risk_factors)
+        ]
+        self.stage_seconds["postprocess"].observe(time.perf_counter() - postprocess_started)
+        return results
     
-    def _identify_risk_factors(self, input_data: Dict[str, Any]) -> List[str]:
-        """Identify contributing risk factors"""
-        risk_factors = []
-        
-        if input_data.get('age', 0) > 45:
-            risk_factors.append("Advanced age (>45 years)")
-        
-        if input_data.get('bmi', 0) > 25:
-            risk_factors.append("Overweight/Obesity")
-        
-        if input_data.get('glucose', 0) > 100:
-            risk_factors.append("Elevated glucose levels")
-        
-        if input_data.get('blood_pressure', 0) > 130:
-            risk_factors.append("High blood pressure")
-        
-        if input_data.get('family_history', 0) == 1:
-            risk_factors.append("Family history of diabetes")
-        
-        if input_data.get('pregnancies', 0) > 0 and input_data.get('glucose', 0) > 140:
-            risk_factors.append("History of gestational diabetes")
-        
-        if input_data.get('physical_activity', 0) < 3:
-            risk_factors.append("Sedentary lifestyle")
-        
-        if input_data.get('smoking', 0) == 1:
-            risk_factors.append("Smoking")
-        
-        if input_data.get('alcohol', 0) > 14:
-            risk_factors.append("Excessive alcohol consumption")
-        
-        if input_data.get('diabetes_pedigree', 0) > 0.5:
-            risk_factors.append("Strong genetic predisposition")
-        
-        if input_data.get('insulin', 0) == 0 and input_data.get('glucose', 0) > 140:
-            risk_factors.append("Insulin resistance indicators")
+    def predict_proba_encoded(self, features: np.ndarray) -> np.ndarray:
+        """Class probabilities for rows from ``encode_batch`` (shadow scoring: no cache, no per-record results)"""
+        return self.model.predict_proba(self._model_input(features))
+    
+    @property
+    def input_layout(self) -> tuple:
+        """Columns of the ``encode_batch`` rows; versions with the same layout can score each other's rows"""
+        return tuple(self.expected_features)
+    
+    @property
+    def explainer(self) -> PathExplainer:
+        """Per-feature attribution for the loaded model, built on first use"""
+        if self._explainer is None:
+            self._explainer = PathExplainer.from_model(self.model, self.encoder.request_fields)
+        return self._explainer
+    
+    def explain(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Contribution of every request field to the predicted diabetes probability"""
+        return self.explain_batch([input_data])[0]
+    
+    def explain_batch(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Attributions for many records with one traversal of the forest (see ml_runtime.explain)"""
+        try:
+            explanation = self.explainer.explain(self.encoder.encode_batch(records))
+            groups = self.explainer.groups
+            results = []
+            for record, probabilities, contributions in zip(records, explanation.probabilities,
+                                                            explanation.contributions):
+                # Largest effect first, in either direction
+                order = np.argsort(-np.abs(contributions), kind='stable')
+                results.append({
+                    "prediction": int(self.model.classes_[np.argmax(probabilities)]),
+                    "probability": float(probabilities[1]),
+                    "base_value": explanation.bias,
+                    "contributions": [
+                        {"feature": groups[i], "value": record.get(groups[i]), "contribution": float(contributions[i])}
+                        for i in order
+                    ],
+                    "model_version": self.version
+                })
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error in diabetes explanation: {str(e)}")
+            raise
+    
+    def predict_proba_frame(self, frame: "pd.DataFrame") -> np.ndarray:
+        """Class probabilities for a chunk of numeric request columns (bulk scoring: no cache, no per-record results)"""
+        return self.model.predict_proba(self._model_input(self.encoder.encode_columns(frame, len(frame))))
+    
+    def _build_result(self, prediction: int, prediction_proba: np.ndarray, recommendations: List[str],
+                      risk_factors: List[str], timestamp: str) -> Dict[str, Any]:
+        """Assemble the prediction response for a single record"""
+        # Calculate probability and confidence
+        probability = float(prediction_proba[1])  # Probability of positive class
+        confidence = float(max(prediction_proba))
         
-        return risk_factors
+        return {
+            "prediction": int(prediction),
+            "probability": probability,
+            "risk_level": risk_level(probability),
+            "confidence": confidence,
+            "recommendations": recommendations,
+            "risk_factors": risk_factors,
+            "timestamp": timestamp,
+            "model_version": self.version
+        }
@@ -0,0 +1,240 @@
+"""
+NumPy feature encoders for the backend predictors
+
+The encoders are built once when a model is loaded and write request fields
+straight into a NumPy row (or a batch matrix) in the column order the model
+expects, as recorded in its manifest (``ml_runtime.manifest``). They replace
+the per-request ``pd.DataFrame`` construction, column checks and reindexing,
+and their output is bit-identical to that pandas path, which is kept in
+``benchmarks/reference.py``.
+"""
+
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+
+class HeartFeatureEncoder:
+    """Encodes heart disease requests into raw and scaled feature matrices"""
+
+    def __init__(self, feature_names: Sequence[str], scaler: Optional[Any] = None):
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+
+        # StandardScaler.transform computes (X - mean_) / scale_ in float64;
+        # keep the same vectors so the result is bit-identical
+        self.mean = None
+        self.scale = None
+        if scaler is not None:
+            if getattr(scaler, "with_mean", False):
+                self.mean = np.asarray(scaler.mean_, dtype=np.float64)
+            if getattr(scaler, "with_std", False):
+                self.scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+    def encode(self, input_data: Dict[str, Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Write one request into a 1-D row of raw (unscaled) features"""
+        row = np.empty(self.n_features, dtype=np.float64) if out is None else out
+        try:
+            for i, feature in enumerate(self.feature_names):
+                row[i] = input_data[feature]
+        except KeyError as e:
+            raise ValueError(f"Missing required feature: {e.args[0]}")
+        return row
+
+    def encode_batch(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        """Write many requests into a (n_records, n_features) matrix of raw features"""
+        matrix = np.empty((len(records), self.n_features), dtype=np.float64)
+        for i, record in enumerate(records):
+            self.encode(record, out=matrix[i])
+        return matrix
+
+    def encode_columns(self, columns: Mapping[str, Any]) -> np.ndarray:
+        """Write numeric columns (e.g. a DataFrame chunk) into a matrix of raw features"""
+        try:
+            return np.column_stack([np.asarray(columns[feature], dtype=np.float64) for feature in self.feature_names])
+        except KeyError as e:
+            raise ValueError(f"Missing required feature: {e.args[0]}")
+
+    def scale_matrix(self, matrix: np.ndarray) -> np.ndarray:
+        """Apply the fitted scaler to a raw feature matrix"""
+        scaled = np.array(matrix, dtype=np.float64, ndmin=2)
+        if self.mean is not None:
+            scaled -= self.mean
+        if self.scale is not None:
+            scaled /= self.scale
+        return scaled
+
+
+class DiabetesFeatureEncoder:
+    """Encodes diabetes requests into the one-hot feature layout of the trained model"""
+
+    # Values used when a request omits a field
+    DEFAULTS = {
+        'Pregnancies': 0,
+        'Glucose': 100,
+        'BloodPressure': 80,
+        'SkinThickness': 20,
+        'Insulin': 0,
+        'BMI': 25.0,
+        'DiabetesPedigreeFunction': 0.5,
+        'Age': 25,
+        'PhysicalActivity': 5,  # Default moderate activity
+        'AlcoholConsumption': 0,  # Default no alcohol
+        'FamilyHistory': 'No',
+        'SmokingStatus': 'Non-Smoker'
+    }
+
+    # Request field name -> model feature name for plain numeric features
+    FIELD_MAPPING = {
+        'pregnancies': 'Pregnancies',
+        'glucose': 'Glucose',
+        'blood_pressure': 'BloodPressure',
+        'skin_thickness': 'SkinThickness',
+        'insulin': 'Insulin',
+        'bmi': 'BMI',
+        'diabetes_pedigree': 'DiabetesPedigreeFunction',
+        'age': 'Age'
+    }
+
+    # Model feature -> request field it is written from (for attributions)
+    REQUEST_FIELDS = dict(
+        {feature: field for field, feature in FIELD_MAPPING.items()},
+        PhysicalActivity='physical_activity',
+        AlcoholConsumption='alcohol',
+        FamilyHistory='family_history',
+        SmokingStatus='smoking'
+    )
+
+    ACTIVITY_MAP = {
+        'sedentary': 0, 'low': 2, 'light': 2,
+        'moderate': 5, 'active': 7, 'high': 9
+    }
+    ALCOHOL_MAP = {
+        'none': 0, 'light': 3, 'moderate': 7, 'heavy': 12
+    }
+    FAMILY_HISTORY_TRUE = ('yes', 'true', '1')
+    SMOKER_TRUE = ('smoker', 'yes', 'true', '1', 'current')
+
+    # One-hot columns the request's yes/no fields set: (raw feature, category)
+    ONE_HOT_COLUMNS = (
+        ('FamilyHistory', 'Yes'), ('FamilyHistory', 'No'),
+        ('SmokingStatus', 'Smoker'), ('SmokingStatus', 'Non-Smoker')
+    )
+
+    def __init__(self, expected_features: Sequence[str], one_hot: Mapping[str, Sequence[Any]]):
+        """
+        ``expected_features`` are the model's input columns in order and
+        ``one_hot`` maps its one-hot columns to (raw feature, category), as
+        recorded in the model manifest.
+        """
+        self.expected_features = list(expected_features)
+        self.n_features = len(self.expected_features)
+        index = {feature: i for i, feature in enumerate(self.expected_features)}
+        one_hot = {column: tuple(value) for column, value in one_hot.items()}
+        column_of = {value: column for column, value in one_hot.items()}
+        missing = [f"{feature}={category}" for feature, category in self.ONE_HOT_COLUMNS
+                   if (feature, category) not in column_of]
+        missing += [feature for feature in list(self.FIELD_MAPPING.values()) + ['PhysicalActivity', 'AlcoholConsumption']
+                    if feature not in index]
+        if missing:
+            raise ValueError(f"Model inputs lack the columns the diabetes encoder writes: {missing}")
+
+        self.defaults = np.array([
+            self.DEFAULTS[one_hot[feature][0]] == one_hot[feature][1] if feature in one_hot else self.DEFAULTS[feature]
+            for feature in self.expected_features
+        ], dtype=np.float64)
+        # Request field of every input column (one-hot columns share their field)
+        self.request_fields = [
+            self.REQUEST_FIELDS.get(one_hot[feature][0] if feature in one_hot else feature, feature)
+            for feature in self.expected_features
+        ]
+        self._numeric = [(field, index[feature]) for field, feature in self.FIELD_MAPPING.items()]
+        self._activity = index['PhysicalActivity']
+        self._alcohol = index['AlcoholConsumption']
+        self._family_yes = index[column_of[('FamilyHistory', 'Yes')]]
+        self._family_no = index[column_of[('FamilyHistory', 'No')]]
+        self._smoker = index[column_of[('SmokingStatus', 'Smoker')]]
+        self._non_smoker = index[column_of[('SmokingStatus', 'Non-Smoker')]]
+
+    @classmethod
+    def from_manifest(cls, manifest: Dict[str, Any]) -> "DiabetesFeatureEncoder":
+        """Encoder for the input columns recorded in a model manifest"""
+        return cls(manifest['input_columns'], manifest['one_hot'])
+
+    def encode(self, input_data: Dict[str, Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Write one request into a 1-D feature row"""
+        if out is None:
+            row = self.defaults.copy()
+        else:
+            row = out
+            row[:] = self.defaults
+
+        for field, i in self._numeric:
+            if field in input_data:
+                row[i] = float(input_data[field])
+
+        # Physical Activity - convert text to number if needed
+        if 'physical_activity' in input_data:
+            activity = input_data['physical_activity']
+            if isinstance(activity, str):
+                row[self._activity] = self.ACTIVITY_MAP.get(activity.lower(), 5)
+            else:
+                row[self._activity] = int(activity)
+
+        # Alcohol Consumption - convert text to number if needed
+        if 'alcohol' in input_data:
+            alcohol = input_data['alcohol']
+            if isinstance(alcohol, str):
+                row[self._alcohol] = self.ALCOHOL_MAP.get(alcohol.lower(), 0)
+            else:
+                row[self._alcohol] = int(alcohol)
+
+        # Family History - one-hot encoding
+        if 'family_history' in input_data:
+            has_family_history = input_data['family_history']
+            if isinstance(has_family_history, str):
+                has_family_history = has_family_history.lower() in self.FAMILY_HISTORY_TRUE
+            else:
+                has_family_history = bool(int(has_family_history))
+            row[self._family_yes] = 1 if has_family_history else 0
+            row[self._family_no] = 0 if has_family_history else 1
+
+        # Smoking Status - one-hot encoding
+        if 'smoking' in input_data:
+            is_smoker = input_data['smoking']
+            if isinstance(is_smoker, str):
+                is_smoker = is_smoker.lower() in self.SMOKER_TRUE
+            else:
+                is_smoker = bool(int(is_smoker))
+            row[self._smoker] = 1 if is_smoker else 0
+            row[self._non_smoker] = 0 if is_smoker else 1
+
+        return row
+
+    def encode_batch(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        """Write many requests into a (n_records, n_features) matrix"""
+        matrix = np.empty((len(records), self.n_features), dtype=np.float64)
+        for i, record in enumerate(records):
+            self.encode(record, out=matrix[i])
+        return matrix
+
+    def encode_columns(self, columns: Mapping[str, Any], n_rows: int) -> np.ndarray:
+        """Write numeric request columns (e.g. a DataFrame chunk) into a matrix.
+
+        Vectorized equivalent of ``encode`` for numeric values: absent columns
+        take the defaults and the categorical fields are truncated to int.
+        """
+        matrix = np.tile(self.defaults, (n_rows, 1))
+        for field, i in self._numeric:
+            if field in columns:
+                matrix[:, i] = np.asarray(columns[field], dtype=np.float64)
+        for field, i in (('physical_activity', self._activity), ('alcohol', self._alcohol)):
+            if field in columns:
+                matrix[:, i] = np.trunc(np.asarray(columns[field], dtype=np.float64))
+        for field, yes, no in (('family_history', self._family_yes, self._family_no),
+                               ('smoking', self._smoker, self._non_smoker)):
+            if field in columns:
+                flag = np.trunc(np.asarray(columns[field], dtype=np.float64)) != 0
+                matrix[:, yes] = flag
+                matrix[:, no] = ~flag
+        return matrix
@@ -2,200 +2,398 @@
 Heart Disease Prediction Model
 """
 
-import pandas as pd
 import numpy as np
-import joblib
 import logging
 import os
+import sys
+import time
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, TYPE_CHECKING
+
+from inference.cache import PredictionCache
+from observability.metrics import metrics
+from models.encoders import HeartFeatureEncoder
+from models.risk import risk_level
+from models.rules import PREDICTION, Rule, RuleTable, always
+
+# Shared inference runtime (compiled forests) lives next to the trained models
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction'))
+from ml_runtime.artifact import load_scaler, load_serving_model
+from ml_runtime.explain import PathExplainer
+from ml_runtime.manifest import check_model, load_manifest, model_version
+
+# pandas is only needed for the DataFrame input of the sklearn pipeline; it is
+# imported on first use to keep startup fast
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+
+def _recommendations(input_data: Dict[str, Any], prediction: int) -> List[str]:
+    """RECOMMENDATION_RULES for one request, as plain comparisons (its direct path)"""
+    recommendations = []
+
+    if prediction == 1:  # High risk
+        recommendations.append("🏥 Consult a cardiologist immediately for comprehensive evaluation")
+        recommendations.append("💊 Follow prescribed medications and treatment plan strictly")
+
+    # Age-based recommendations
+    if input_data.get('age', 0) > 50:
+        recommendations.append("📅 Schedule regular cardiac checkups (every 6 months)")
+
+    # Blood pressure recommendations
+    if input_data.get('trestbps', 0) > 140:
+        recommendations.append("🩺 Monitor and manage blood pressure regularly")
+        recommendations.append("🧂 Reduce sodium intake and maintain a low-salt diet")
+
+    # Cholesterol recommendations
+    if input_data.get('chol', 0) > 240:
+        recommendations.append("🥗 Follow a heart-healthy diet low in saturated fats")
+        recommendations.append("💊 Consider cholesterol-lowering medications if prescribed")
+
+    # Heart rate recommendations
+    if input_data.get('thalach', 0) < 100:
+        recommendations.append("🏃‍♂️ Engage in regular cardiovascular exercise")
+
+    # Exercise-induced angina
+    if input_data.get('exang', 0) == 1:
+        recommendations.append("⚠️ Avoid strenuous physical activities without medical supervision")
+
+    # General recommendations
+    recommendations.extend([
+        "🚭 Quit smoking and avoid secondhand smoke",
+        "🥬 Maintain a Mediterranean-style diet rich in fruits and vegetables",
+        "⚖️ Maintain a healthy weight (BMI 18.5-24.9)",
+        "😴 Ensure adequate sleep (7-8 hours per night)",
+        "🧘‍♀️ Practice stress management techniques",
+        "🚫 Limit alcohol consumption"
+    ])
+
+    return recommendations[:8]  # Return top 8 recommendations
+
+
+def _risk_factors(input_data: Dict[str, Any]) -> List[str]:
+    """RISK_FACTOR_RULES for one request, as plain comparisons (its direct path)"""
+    risk_factors = []
+
+    if input_data.get('age', 0) > 55:
+        risk_factors.append("Advanced age (>55 years)")
+
+    if input_data.get('sex', 0) == 1:
+        risk_factors.append("Male gender")
+
+    if input_data.get('cp', 0) in [1, 2]:
+        risk_factors.append("Atypical chest pain")
+    elif input_data.get('cp', 0) == 0:
+        risk_factors.append("Typical angina")
+
+    if input_data.get('trestbps', 0) > 140:
+        risk_factors.append("High blood pressure")
+
+    if input_data.get('chol', 0) > 240:
+        risk_factors.append("High cholesterol")
+
+    if input_data.get('fbs', 0) == 1:
+        risk_factors.append("Elevated fasting blood sugar")
+
+    if input_data.get('restecg', 0) != 0:
+        risk_factors.append("Abnormal resting ECG")
+
+    if input_data.get('thalach', 0) < 100:
+        risk_factors.append("Low maximum heart rate")
+
+    if input_data.get('exang', 0) == 1:
+        risk_factors.append("Exercise-induced angina")
+
+    if input_data.get('oldpeak', 0) > 2.0:
+        risk_factors.append("Significant ST depression")
+
+    if input_data.get('ca', 0) > 0:
+        risk_factors.append("Major vessel blockage")
+
+    if input_data.get('thal', 0) in [2, 3]:
+        risk_factors.append("Thalassemia defect")
+
+    return risk_factors
+
+
+# Recommendations, in priority order; the response lists the first 8 that apply
+RECOMMENDATION_RULES = RuleTable([
+    Rule(PREDICTION, "==", 1, "🏥 Consult a cardiologist immediately for comprehensive evaluation", 10),
+    Rule(PREDICTION, "==", 1, "💊 Follow prescribed medications and treatment plan strictly", 11),
+    Rule("age", ">", 50, "📅 Schedule regular cardiac checkups (every 6 months)", 20),
+    Rule("trestbps", ">", 140, "🩺 Monitor and manage blood pressure regularly", 30),
+    Rule("trestbps", ">", 140, "🧂 Reduce sodium intake and maintain a low-salt diet", 31),
+    Rule("chol", ">", 240, "🥗 Follow a heart-healthy diet low in saturated fats", 40),
+    Rule("chol", ">", 240, "💊 Consider cholesterol-lowering medications if prescribed", 41),
+    Rule("thalach", "<", 100, "🏃‍♂️ Engage in regular cardiovascular exercise", 50),
+    Rule("exang", "==", 1, "⚠️ Avoid strenuous physical activities without medical supervision", 60),
+    # General recommendations
+    always("🚭 Quit smoking and avoid secondhand smoke", 90),
+    always("🥬 Maintain a Mediterranean-style diet rich in fruits and vegetables", 91),
+    always("⚖️ Maintain a healthy weight (BMI 18.5-24.9)", 92),
+    always("😴 Ensure adequate sleep (7-8 hours per night)", 93),
+    always("🧘‍♀️ Practice stress management techniques", 94),
+    always("🚫 Limit alcohol consumption", 95),
+], limit=8, direct=_recommendations)
+
+RISK_FACTOR_RULES = RuleTable([
+    Rule("age", ">", 55, "Advanced age (>55 years)", 10),
+    Rule("sex", "==", 1, "Male gender", 20),
+    Rule("cp", "in", [1, 2], "Atypical chest pain", 30),
+    Rule("cp", "==", 0, "Typical angina", 31),
+    Rule("trestbps", ">", 140, "High blood pressure", 40),
+    Rule("chol", ">", 240, "High cholesterol", 50),
+    Rule("fbs", "==", 1, "Elevated fasting blood sugar", 60),
+    Rule("restecg", "!=", 0, "Abnormal resting ECG", 70),
+    Rule("thalach", "<", 100, "Low maximum heart rate", 80),
+    Rule("exang", "==", 1, "Exercise-induced angina", 90),
+    Rule("oldpeak", ">", 2.0, "Significant ST depression", 100),
+    Rule("ca", ">", 0, "Major vessel blockage", 110),
+    Rule("thal", "in", [2, 3], "Thalassemia defect", 120),
+], direct=_risk_factors)
+
 class HeartDiseasePredictor:
     """Heart Disease Risk Prediction Model"""
     
-    def __init__(self):
+    # Trained model files (read again by every reload)
+    model_path = os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction', 'flask-heart', 'model.pkl')
+    scaler_path = os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction', 'flask-heart', 'scaler.pkl')
+    
+    def __init__(self, model_path: Optional[str] = None):
+        """
+        ``model_path`` loads another version of the model, such as a registry
+        version (``versions/<name>/model.pkl``); its directory's scaler.pkl is
+        used when there is one.
+        """
+        if model_path is not None:
+            self.model_path = model_path
+            scaler_path = os.path.join(os.path.dirname(model_path), 'scaler.pkl')
+            if os.path.exists(scaler_path):
+                self.scaler_path = scaler_path
         self.model = None
         self.scaler = None
-        self.feature_names = [
-            'age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 
-            'thalach', 'exang', 'oldpeak', 'slope', 'ca', 'thal'
-        ]
+        self.encoder = None
+        self._explainer = None
+        # Version ID of the loaded model.pkl (SHA-256 prefix), returned with every prediction
+        self.version = None
+        self._model_columns = None
+        # Raw features in training order, from the model manifest
+        self.feature_names = None
+        self.cache = PredictionCache.from_env()
+        # Latency histograms per pipeline stage, served by /metrics
+        self.stage_seconds = {
+            stage: metrics.histogram("prediction_model_stage_seconds", model="heart", stage=stage)
+            for stage in ("encode", "predict_proba", "postprocess")
+        }
         self.load_model()
     
     def load_model(self):
         """Load the trained heart disease model and scaler"""
         try:
-            model_path = os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction', 'flask-heart', 'model.pkl')
-            scaler_path = os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction', 'flask-heart', 'scaler.pkl')
+            model_path = self.model_path
+            scaler_path = self.scaler_path
             
-            self.model = joblib.load(model_path)
+            manifest = load_manifest(model_path)
+            self.version = model_version(manifest)
+            self.model_sha256 = manifest['model']['sha256']
+            model = load_serving_model(model_path, name='heart')
+            check_model(manifest, model)
+            self.model = model
+            self.feature_names = [feature['name'] for feature in manifest['raw_features']]
+            # Raw feature -> request field (for global explanations); the heart fields are the features
+            self.feature_fields = {feature: feature for feature in self.feature_names}
+            # Large batches are checked against the encoded rows, so every field the rules test must be a model feature
+            for rules in (RECOMMENDATION_RULES, RISK_FACTOR_RULES):
+                rules.bind(self.feature_names)
+            self.cache.clear()
+            self._explainer = None
             logger.info("✅ Heart disease model loaded successfully")
             
             try:
-                self.scaler = joblib.load(scaler_path)
+                self.scaler = load_scaler(scaler_path)
                 logger.info("✅ Heart disease scaler loaded successfully")
             except FileNotFoundError:
                 logger.warning("⚠️ Scaler not found, proceeding without scaling")
                 self.scaler = None
+            
+            self.encoder = HeartFeatureEncoder(self.feature_names, self.scaler)
+            self._model_columns = [self.feature_names.index(feature) for feature in manifest['input_columns']]
                 
         except Exception as e:
             logger.error(f"❌ Failed to load heart disease model: {str(e)}")
             raise
     
-    def preprocess_input(self, input_data: Dict[str, Any]) -> pd.DataFrame:
-        """Preprocess input data for prediction"""
+    def _model_input(self, raw_features: np.ndarray) -> Any:
+        """Scale encoded rows and label them, as the pipeline's ColumnTransformer selects columns by name"""
+        scaled = self.encoder.scale_matrix(raw_features)
+        if getattr(self.model, 'fused', False):
+            # The fused preprocessing kernel reads NumPy rows in training column order
+            return scaled[:, self._model_columns]
+        
+        import pandas as pd
+        
+        return pd.DataFrame(scaled, columns=self.feature_names)
+    
+    def predict(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Make heart disease risk prediction"""
         try:
-            # Create DataFrame with correct feature order
-            df = pd.DataFrame([input_data])
+            # Encode straight into a NumPy row; its bytes are the cache key
+            started = time.perf_counter()
+            raw_features = self.encoder.encode(input_data)
+            encoded = time.perf_counter()
+            self.stage_seconds["encode"].observe(encoded - started)
+            cache_key = raw_features.tobytes()
+            prediction_proba = self.cache.get(cache_key)
             
-            # Ensure all required features are present
-            for feature in self.feature_names:
-                if feature not in df.columns:
-                    raise ValueError(f"Missing required feature: {feature}")
-            
-            # Select only the required features in correct order
-            df = df[self.feature_names]
+            if prediction_proba is None:
+                processed_data = self._model_input(raw_features)
+                
+                # Make prediction (the class is derived from the probabilities,
+                # exactly as RandomForestClassifier.predict does)
+                prediction_proba = self.model.predict_proba(processed_data)[0]
+                self.stage_seconds["predict_proba"].observe(time.perf_counter() - encoded)
+                self.cache.put(cache_key, prediction_proba)
             
-            # Apply scaling if scaler is available
-            if self.scaler:
-                df_scaled = pd.DataFrame(
-                    self.scaler.transform(df),
-                    columns=self.feature_names
-                )
-                return df_scaled
+            prediction = self.model.classes_[np.argmax(prediction_proba)]
             
-            return df
+            postprocess_started = time.perf_counter()
+            result = self._build_result(
+                prediction, prediction_proba,
+                _recommendations(input_data, prediction),
+                _risk_factors(input_data),
+                datetime.now().isoformat()
+            )
+            self.stage_seconds["postprocess"].observe(time.perf_counter() - postprocess_started)
+            return result
             
         except Exception as e:
-            logger.error(f"Error in preprocessing: {str(e)}")
+            logger.error(f"Error in heart disease prediction: {str(e)}")
             raise
     
-    def predict(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Make heart disease risk prediction"""
+    def encode_batch(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        """Encode request records into NumPy rows, the input of ``predict_encoded``"""
+        started = time.perf_counter()
+        raw_features = self.encoder.encode_batch(records)
+        self.stage_seconds["encode"].observe(time.perf_counter() - started)
+        return raw_features
+    
+    def predict_batch(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Make heart disease risk predictions for many records with one predict_proba call"""
         try:
-            # Preprocess input
-            processed_data = self.preprocess_input(input_data)
-            
-            # Make prediction
-            prediction = self.model.predict(processed_data)[0]
-            prediction_proba = self.model.predict_proba(processed_data)[0]
-            
-            # Calculate probability and confidence
-            probability = float(prediction_proba[1])  # Probability of positive class
-            confidence = float(max(prediction_proba))
-            
-            # Determine risk level
-            if probability < 0.3:
-                risk_level = "Low Risk"
-            elif probability < 0.7:
-                risk_level = "Moderate Risk"
-            else:
-                risk_level = "High Risk"
-            
-            # Generate recommendations
-            recommendations = self._generate_recommendations(input_data, prediction)
-            
-            # Identify risk factors
-            risk_factors = self._identify_risk_factors(input_data)
+            if not records:
+                return []
             
-            return {
-                "prediction": int(prediction),
-                "probability": probability,
-                "risk_level": risk_level,
-                "confidence": confidence,
-                "recommendations": recommendations,
-                "risk_factors": risk_factors,
-                "timestamp": datetime.now().isoformat()
-            }
+            return self.predict_encoded(records, self.encode_batch(records))
             
         except Exception as e:
-            logger.error(f"Error in heart disease prediction: {str(e)}")
+            logger.error(f"Error in heart disease batch prediction: {str(e)}")
             raise
     
-    def _generate_recommendations(self, input_data: Dict[str, Any], prediction: int) -> List[str]:
-        """Generate health recommendations based on input data and prediction"""
-        recommendations = []
-        
-        if prediction == 1:  # High risk
-            recommendations.append("🏥 Consult a cardiologist immediately for comprehensive evaluation")
-            recommendations.append("💊 Follow prescribed medications and treatment plan strictly")
-        
-        # Age-based recommendations
-        if input_data.get('age', 0) > 50:
-            recommendations.append("📅 Schedule regular cardiac checkups (every 6 months)")
-        
-        # Blood pressure recommendations
-        if input_data.get('trestbps', 0) > 140:
-            recommendations.append("🩺 Monitor and manage blood pressure regularly")
-            recommendations.append("🧂 Reduce sodium intake and maintain a low-salt diet")
-        
-        # Cholesterol recommendations
-        if input_data.get('chol', 0) > 240:
-            recommendations.append("🥗 Follow a heart-healthy diet low in saturated fats")
-            recommendations.append("💊 Consider cholesterol-lowering medications if prescribed")
-        
-        # Heart rate recommendations
-        if input_data.get('thalach', 0) < 100:
-            recommendations.append("🏃‍♂️ Engage in regular cardiovascular exercise")
+    def predict_encoded(self, records: List[Dict[str, Any]], raw_features: np.ndarray) -> List[Dict[str, Any]]:
+        """Predictions for records already encoded by ``encode_batch``"""
+        # Only records missing from the cache are sent to the model
+        cache_keys = [row.tobytes() for row in raw_features]
+        probabilities = np.empty((len(records), len(self.model.classes_)))
+        missing = []
+        for i, cache_key in enumerate(cache_keys):
+            cached = self.cache.get(cache_key)
+            if cached is None:
+                missing.append(i)
+            else:
+                probabilities[i] = cached
         
-        # Exercise-induced angina
-        if input_data.get('exang', 0) == 1:
-            recommendations.append("⚠️ Avoid strenuous physical activities without medical supervision")
+        if missing:
+            model_started = time.perf_counter()
+            processed_data = self._model_input(raw_features[missing])
+            fresh = self.model.predict_proba(processed_data)
+            self.stage_seconds["predict_proba"].observe(time.perf_counter() - model_started)
+            probabilities[missing] = fresh
+            for i, row in zip(missing, fresh):
+                self.cache.put(cache_keys[i], row)
         
-        # General recommendations
-        recommendations.extend([
-            "🚭 Quit smoking and avoid secondhand smoke",
-            "🥬 Maintain a Mediterranean-style diet rich in fruits and vegetables",
-            "⚖️ Maintain a healthy weight (BMI 18.5-24.9)",
-            "😴 Ensure adequate sleep (7-8 hours per night)",
-            "🧘‍♀️ Practice stress management techniques",
-            "🚫 Limit alcohol consumption"
-        ])
+        predictions = self.model.classes_[np.argmax(probabilities, axis=1)]
         
-        return recommendations[:8]  # Return top 8 recommendations
+        postprocess_started = time.perf_counter()
+        timestamp = datetime.now().isoformat()
+        # Recommendations and risk factors for the whole batch at once; large
+        # batches read the encoded rows (the raw request fields)
+        recommendations = RECOMMENDATION_RULES.apply(records, predictions, raw_features, self.feature_names)
+        risk_factors = RISK_FACTOR_RULES.apply(records, None, raw_features, self.feature_names)
+        results = [
+            self._build_result(prediction, prediction_proba, record_recommendations, record_risk_factors, timestamp)
+            for prediction, prediction_proba, record_recommendations, record_risk_factors
+            in zip(predictions, probabilities, recommendations, risk_factors)
+        ]
+        self.stage_seconds["postprocess"].observe(time.perf_counter() - postprocess_started)
+        return results
     
-    def _identify_risk_factors(self, input_data: Dict[str, Any]) -> List[str]:
-        """Identify contributing risk factors"""
-        risk_factors = []
-        
-        if input_data.get('age', 0) > 55:
-            risk_factors.append("Advanced age (>55 years)")
-        
-        if input_data.get('sex', 0) == 1:
-            risk_factors.append("Male gender")
-        
-        if input_data.get('cp', 0) in [1, 2]:
-            risk_factors.append("Atypical chest pain")
-        elif input_data.get('cp', 0) == 0:
-            risk_factors.append("Typical angina")
-        
-        if input_data.get('trestbps', 0) > 140:
-            risk_factors.append("High blood pressure")
-        
-        if input_data.get('chol', 0) > 240:
-            risk_factors.append("High cholesterol")
-        
-        if input_data.get('fbs', 0) == 1:
-            risk_factors.append("Elevated fasting blood sugar")
-        
-        if input_data.get('restecg', 0) != 0:
-            risk_factors.append("Abnormal resting ECG")
-        
-        if input_data.get('thalach', 0) < 100:
-            risk_factors.append("Low maximum heart rate")
-        
-        if input_data.get('exang', 0) == 1:
-            risk_factors.append("Exercise-induced angina")
-        
-        if input_data.get('oldpeak', 0) > 2.0:
-            risk_factors.append("Significant ST depression")
-        
-        if input_data.get('ca', 0) > 0:
-            risk_factors.append("Major vessel blockage")
-        
-        if input_data.get('thal', 0) in [2, 3]:
-            risk_factors.append("Thalassemia defect")
+    def predict_proba_encoded(self, raw_features: np.ndarray) -> np.ndarray:
+        """Class probabilities for rows from ``encode_batch`` (shadow scoring: no cache, no per-record results)"""
+        return self.model.predict_proba(self._model_input(raw_features))
+    
+    @property
+    def input_layout(self) -> tuple:
+        """Columns of the ``encode_batch`` rows; versions with the same layout can score each other's rows"""
+        return tuple(self.feature_names)
+    
+    @property
+    def explainer(self) -> PathExplainer:
+        """Per-feature attribution for the loaded model, built on first use"""
+        if self._explainer is None:
+            self._explainer = PathExplainer.from_model(self.model, [self.feature_names[i] for i in self._model_columns])
+        return self._explainer
+    
+    def explain(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Contribution of every request field to the predicted heart disease probability"""
+        return self.explain_batch([input_data])[0]
+    
+    def explain_batch(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Attributions for many records with one traversal of the forest (see ml_runtime.explain)"""
+        try:
+            raw_features = self.encoder.encode_batch(records)
+            explanation = self.explainer.explain(self.encoder.scale_matrix(raw_features)[:, self._model_columns])
+            groups = self.explainer.groups
+            results = []
+            for record, probabilities, contributions in zip(records, explanation.probabilities,
+                                                            explanation.contributions):
+                # Largest effect first, in either direction
+                order = np.argsort(-np.abs(contributions), kind='stable')
+                results.append({
+                    "prediction": int(self.model.classes_[np.argmax(probabilities)]),
+                    "probability": float(probabilities[1]),
+                    "base_value": explanation.bias,
+                    "contributions": [
+                        {"feature": groups[i], "value": record.get(groups[i]), "contribution": float(contributions[i])}
+                        for i in order
+                    ],
+                    "model_version": self.version
+                })
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error in heart disease explanation: {str(e)}")
+            raise
+    
+    def predict_proba_frame(self, frame: "pd.DataFrame") -> np.ndarray:
+        """Class probabilities for a chunk of numeric request columns (bulk scoring: no cache, no per-record results)"""
+        return self.model.predict_proba(self._model_input(self.encoder.encode_columns(frame)))
+    
+    def _build_result(self, prediction: int, prediction_proba: np.ndarray, recommendations: List[str],
+                      risk_factors: List[str], timestamp: str) -> Dict[str, Any]:
+        """Assemble the prediction response for a single record"""
+        # Calculate probability and confidence
+        probability = float(prediction_proba[1])  # Probability of positive class
+        confidence = float(max(prediction_proba))
         
-        return risk_factors
+        return {
+            "prediction": int(prediction),
+            "probability": probability,
+            "risk_level": risk_level(probability),
+            "confidence": confidence,
+            "recommendations": recommendations,
+            "risk_factors": risk_factors,
+            "timestamp": timestamp,
+            "model_version": self.version
+        }
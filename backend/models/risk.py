@@ -0,0 +1,18 @@
+"""
+Risk levels
+
+Bands of the positive-class probability shared by the predictors' responses
+and the offline scorer (``score.py``): below 0.3 is low risk, below 0.7
+moderate, and high from 0.7 up.
+"""
+
+import bisect
+
+RISK_LEVELS = ("Low Risk", "Moderate Risk", "High Risk")
+# Lower bounds of every level after the first
+RISK_THRESHOLDS = (0.3, 0.7)
+
+
+def risk_level(probability: float) -> str:
+    """Risk level of one positive-class probability"""
+    return RISK_LEVELS[bisect.bisect_right(RISK_THRESHOLDS, probability)]
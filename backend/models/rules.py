@@ -0,0 +1,232 @@
+"""
+Table-driven recommendation and risk-factor rules
+
+Each predictor declares its recommendations and risk factors as a table of
+``Rule(field, operator, threshold, message, priority)`` rows instead of a
+chain of ``if input_data.get(...)`` statements. A ``RuleTable`` compiles the
+rows once, at import, into NumPy comparisons: one vectorized call per
+operator over every condition that uses it, and one product with a
+condition-by-rule matrix to find the rules whose conditions all hold. A
+batch of requests is evaluated in one pass. Each record gets a bit mask of
+the rules that fired, its *code*.
+
+The vectorized path has a fixed cost of a dozen NumPy calls, more than the
+hand-written rules spend on a few records, and no data-driven loop over the
+conditions in Python comes close to an inline ``if`` chain (a few times
+slower per record). A table can therefore be given the same rules as a
+plain function of one record, its ``direct`` path, which scores batches of up
+to ``SCALAR_MAX_ROWS`` records (single requests, micro-batches). The tests
+check that both paths agree on every dataset record.
+
+Messages are listed in priority order (ties keep table order) and cut to the
+table's ``limit``. The rendered list for a code is built once and then
+reused by every record with the same code. These lists are shared, so
+callers must not modify them.
+
+As in the hand-written rules these tables replace, a missing field counts as
+0. The pseudo-field ``prediction`` tests the predicted class. The vectorized
+path reads the fields into a float64 matrix, which represents every value the
+request schemas admit exactly. Callers that already hold such a matrix pass
+it in: the heart encoder's rows, or the fields that the tables of a model
+test, read once for both tables with ``record_matrix`` (diabetes).
+"""
+
+import operator
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Pseudo-field holding the predicted class
+PREDICTION = "prediction"
+
+OPERATORS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+# Membership: ``threshold`` is a list of values
+MEMBERSHIP = "in"
+
+# Codes are uint64 bit masks
+MAX_RULES = 64
+
+# Up to this many records, a table's direct path beats the fixed cost of the
+# vectorized one (python -m benchmarks.rule_engine)
+SCALAR_MAX_ROWS = 64
+
+
+class Rule(NamedTuple):
+    """One row of a rule table; ``field=None`` applies to every record"""
+    field: Optional[str]
+    op: str
+    threshold: Any
+    message: str
+    priority: int
+    # Further (field, operator, threshold) conditions that must hold as well
+    also: Tuple[Tuple[str, str, Any], ...] = ()
+
+
+def always(message: str, priority: int) -> Rule:
+    """A rule that applies to every record"""
+    return Rule(None, "", None, message, priority)
+
+
+def record_matrix(records: Sequence[Mapping[str, Any]], fields: Sequence[str]) -> np.ndarray:
+    """(n_records, n_fields) float64 matrix of request fields; a missing field counts as 0"""
+    n = len(records)
+    matrix = np.empty((n, len(fields)), dtype=np.float64)
+    for j, field in enumerate(fields):
+        try:
+            matrix[:, j] = np.fromiter(map(operator.itemgetter(field), records), dtype=np.float64, count=n)
+        except KeyError:
+            matrix[:, j] = np.fromiter((record.get(field, 0) for record in records), dtype=np.float64, count=n)
+    return matrix
+
+
+def rule_fields(*tables: "RuleTable") -> List[str]:
+    """Request fields that any of ``tables`` tests"""
+    return list(dict.fromkeys(field for table in tables for field in table.fields))
+
+
+class _Memo(dict):
+    """Dict that computes a missing value once, so lookups are a single subscript"""
+
+    def __init__(self, compute: Callable[[Any], Any]):
+        super().__init__()
+        self.compute = compute
+
+    def __missing__(self, key: Any) -> Any:
+        value = self[key] = self.compute(key)
+        return value
+
+
+class RuleTable:
+    """
+    Rules compiled into NumPy masks, evaluated for a whole batch of records at
+    once. ``direct``, when given, computes one record's messages from the same
+    rules: ``direct(record, prediction)`` for a table that tests the
+    prediction, ``direct(record)`` otherwise.
+    """
+
+    def __init__(self, rules: Sequence[Rule], limit: Optional[int] = None,
+                 direct: Optional[Callable[..., List[str]]] = None):
+        if len(rules) > MAX_RULES:
+            raise ValueError(f"A rule table holds at most {MAX_RULES} rules, got {len(rules)}")
+        self.rules = sorted(rules, key=lambda rule: rule.priority)
+        self.messages = [rule.message for rule in self.rules]
+        self.limit = limit
+        self.direct = direct
+
+        # Distinct conditions, and the ones each rule needs
+        conditions: List[Tuple[str, str, Any]] = []
+        positions: Dict[Tuple[str, str, Any], int] = {}
+        needs: List[List[int]] = []
+        for rule in self.rules:
+            own = [(rule.field, rule.op, rule.threshold)] if rule.field is not None else []
+            needed = []
+            for field, op, threshold in own + list(rule.also):
+                if op != MEMBERSHIP and op not in OPERATORS:
+                    raise ValueError(f"Unknown rule operator {op!r}")
+                key = (field, op, tuple(threshold) if op == MEMBERSHIP else threshold)
+                if key not in positions:
+                    positions[key] = len(conditions)
+                    conditions.append(key)
+                needed.append(positions[key])
+            needs.append(needed)
+        self._n_conditions = len(conditions)
+
+        # Fields the conditions test; the predicted class is the last column
+        tested = list(dict.fromkeys(field for field, _, _ in conditions))
+        self.uses_prediction = PREDICTION in tested
+        self.fields: List[str] = [field for field in tested if field != PREDICTION]
+        column = {field: i for i, field in enumerate(self.fields + [PREDICTION])}
+
+        # One vectorized comparison per operator over all of its conditions
+        self._comparisons = []
+        for op, compare in OPERATORS.items():
+            used = [i for i, (_, condition_op, _) in enumerate(conditions) if condition_op == op]
+            if used:
+                self._comparisons.append((
+                    compare,
+                    np.array([column[conditions[i][0]] for i in used]),
+                    np.array([conditions[i][2] for i in used], dtype=np.float64),
+                    np.array(used)
+                ))
+        self._memberships = [
+            (column[field], np.array(values, dtype=np.float64), i)
+            for i, (field, op, values) in enumerate(conditions) if op == MEMBERSHIP
+        ]
+
+        # A rule fires when the number of its conditions that hold is all of
+        # them (float32, so the product runs in BLAS; the counts are exact)
+        self._requires = np.zeros((len(conditions), len(self.rules)), dtype=np.float32)
+        for rule_index, needed in enumerate(needs):
+            self._requires[needed, rule_index] = 1
+        self._needed = self._requires.sum(axis=0)
+        self._bits = np.left_shift(np.uint64(1), np.arange(len(self.rules), dtype=np.uint64))
+
+        # Matrix columns -> positions of the tested fields in them
+        self._layouts: Dict[Tuple[str, ...], np.ndarray] = {}
+        # Code -> rendered message list, shared by every record with that code
+        self._rendered = _Memo(lambda code: [self.messages[i] for i in self.indexes(code)])
+
+    def bind(self, fields: Sequence[str]) -> np.ndarray:
+        """Positions of the tested fields in a matrix with columns ``fields``; raises if some are missing"""
+        layout = tuple(fields)
+        positions = self._layouts.get(layout)
+        if positions is None:
+            index = {field: i for i, field in enumerate(layout)}
+            missing = [field for field in self.fields if field not in index]
+            if missing:
+                raise ValueError(f"Rules test fields that are not in the matrix: {missing}")
+            positions = self._layouts[layout] = np.array([index[field] for field in self.fields], dtype=np.intp)
+        return positions
+
+    def fire(self, records: Sequence[Mapping[str, Any]], predictions: Optional[Sequence[Any]] = None,
+             values: Optional[np.ndarray] = None, fields: Optional[Sequence[str]] = None) -> List[int]:
+        """
+        Code (bit mask of the rules that fired, bit i = ``self.rules[i]``) of
+        every record, vectorized. Reads ``values``, a float64 matrix of the
+        records with columns ``fields``, when one is given, and otherwise
+        builds it.
+        """
+        if values is None:
+            tested = record_matrix(records, self.fields)
+        else:
+            tested = np.asarray(values, dtype=np.float64)[:, self.bind(fields)]
+        if self.uses_prediction:
+            tested = np.column_stack([tested, np.asarray(predictions, dtype=np.float64)])
+        met = np.empty((len(tested), self._n_conditions), dtype=bool)
+        for compare, columns, thresholds, used in self._comparisons:
+            met[:, used] = compare(tested[:, columns], thresholds)
+        for column, members, position in self._memberships:
+            met[:, position] = np.isin(tested[:, column], members)
+        fired = (met.astype(np.float32) @ self._requires) == self._needed
+        return (fired.astype(np.uint64) @ self._bits).tolist()
+
+    def indexes(self, code: int) -> List[int]:
+        """Rules that a code fired, in priority order and cut to the limit"""
+        fired = [i for i in range(len(self.rules)) if code >> i & 1]
+        return fired[:self.limit] if self.limit is not None else fired
+
+    def render(self, code: int) -> List[str]:
+        """Messages for a code (a shared list: do not modify it)"""
+        return self._rendered[code]
+
+    def apply(self, records: Sequence[Mapping[str, Any]], predictions: Optional[Sequence[Any]] = None,
+              values: Optional[np.ndarray] = None, fields: Optional[Sequence[str]] = None) -> List[List[str]]:
+        """
+        Messages for every record (``fire`` describes the arguments). Batches
+        of up to ``SCALAR_MAX_ROWS`` records take the direct path when the
+        table has one, which does not read ``values``.
+        """
+        direct = self.direct
+        if direct is not None and len(records) <= SCALAR_MAX_ROWS:
+            if self.uses_prediction:
+                return list(map(direct, records, predictions))
+            return list(map(direct, records))
+        rendered = self._rendered
+        return [rendered[code] for code in self.fire(records, predictions, values, fields)]
@@ -0,0 +1,324 @@
+"""
+Non-blocking structured logging
+
+Request threads only put records on a bounded queue (``DroppingQueueHandler``);
+a background ``BatchingLogWriter`` drains it, formats the records and writes
+each batch to the log file and console with a single write and flush per
+sink. When the queue is full records are dropped and counted rather than
+blocking a request.
+
+Records are written as JSON lines (``LOG_FORMAT=json``, the default) or in
+the previous text format (``LOG_FORMAT=text``). Structured fields are passed
+with ``extra={"fields": {...}}``.
+
+Full request/response payloads are sampled per route (``PayloadSampler``);
+errors always carry their payload.
+
+Configuration (environment):
+    LOG_LEVEL                   root level (default INFO)
+    LOG_FILE                    log file (default logs/app.log)
+    LOG_FORMAT                  json (default) or text
+    LOG_MODE                    async (default) or sync (handlers on the calling thread)
+    LOG_QUEUE_SIZE              records buffered before dropping (default 10000)
+    LOG_BATCH_SIZE              records per write (default 256)
+    LOG_FLUSH_INTERVAL_MS       longest a record waits for its batch (default 200)
+    LOG_PAYLOAD_SAMPLE_RATE     share of requests logged with full payloads (default 0.01)
+    LOG_PAYLOAD_SAMPLE_RATES    per-route overrides, e.g. "/predict/heart=0.05,/predict/diabetes=0"
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+from typing import Any, Dict, List, Optional, TextIO
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message and structured fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process,
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key != "fields":
+                entry.setdefault(key, value)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """The original text format, with structured fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Enqueues records without blocking; counts records dropped on a full queue"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback now (arguments may change and
+        # tracebacks pin frames) but leave formatting to the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Sink:
+    """A stream the writer thread owns, with its own formatter and level"""
+
+    def __init__(self, stream: TextIO, formatter: logging.Formatter, level: int = logging.NOTSET,
+                 close: bool = False):
+        self.stream = stream
+        self.formatter = formatter
+        self.level = level
+        self.close_stream = close
+
+    def write_batch(self, records: List[logging.LogRecord]) -> None:
+        lines = [self.formatter.format(r) for r in records if r.levelno >= self.level]
+        if lines:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+
+    def close(self) -> None:
+        if self.close_stream:
+            self.stream.close()
+
+
+class BatchingLogWriter(threading.Thread):
+    """Background thread writing queued records in batches"""
+
+    _STOP = object()
+
+    def __init__(self, log_queue: queue.Queue, sinks: List[_Sink], batch_size: int = 256,
+                 flush_interval: float = 0.2):
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = log_queue
+        self.sinks = sinks
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.batches = 0
+        self.records = 0
+
+    def run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self.queue.get()
+            if first is self._STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    record = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if record is self._STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+            self._write(batch)
+        # Drain whatever was queued before the stop marker
+        remaining = []
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is not self._STOP:
+                remaining.append(record)
+        if remaining:
+            self._write(remaining)
+
+    def _write(self, batch: List[logging.LogRecord]) -> None:
+        for sink in self.sinks:
+            try:
+                sink.write_batch(batch)
+            except Exception:
+                # Never let a broken stream kill the writer
+                pass
+        self.batches += 1
+        self.records += len(batch)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        try:
+            self.queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self.join(timeout)
+
+
+class PayloadSampler:
+    """Decides per route whether a request is logged with its full payload"""
+
+    def __init__(self, default_rate: float = 0.01, route_rates: Optional[Dict[str, float]] = None):
+        self.default_rate = default_rate
+        self.route_rates = route_rates or {}
+
+    @classmethod
+    def from_env(cls) -> "PayloadSampler":
+        route_rates = {}
+        for item in os.environ.get("LOG_PAYLOAD_SAMPLE_RATES", "").split(","):
+            route, _, rate = item.strip().partition("=")
+            if route and rate:
+                route_rates[route.strip()] = float(rate)
+        return cls(float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", "0.01")), route_rates)
+
+    def rate(self, route: str) -> float:
+        return self.route_rates.get(route, self.default_rate)
+
+    def sample(self, route: str) -> bool:
+        rate = self.rate(route)
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+class LogPipeline:
+    """Root logger configuration: queue handler in async mode, direct handlers in sync mode"""
+
+    def __init__(self, log_file: str = "logs/app.log", level: str = "INFO", fmt: str = "json",
+                 mode: str = "async", queue_size: int = 10000, batch_size: int = 256,
+                 flush_interval: float = 0.2, console: bool = True):
+        self.log_file = log_file
+        self.level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+        self.format = fmt
+        self.mode = mode
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.console = console
+        self.handler: Optional[DroppingQueueHandler] = None
+        self.writer: Optional[BatchingLogWriter] = None
+        self._sync_handlers: List[logging.Handler] = []
+        self._fork_hook_registered = False
+
+    @classmethod
+    def from_env(cls, **overrides: Any) -> "LogPipeline":
+        settings = dict(
+            log_file=os.environ.get("LOG_FILE", "logs/app.log"),
+            level=os.environ.get("LOG_LEVEL", "INFO"),
+            fmt=os.environ.get("LOG_FORMAT", "json").lower(),
+            mode=os.environ.get("LOG_MODE", "async").lower(),
+            queue_size=int(os.environ.get("LOG_QUEUE_SIZE", "10000")),
+            batch_size=int(os.environ.get("LOG_BATCH_SIZE", "256")),
+            flush_interval=float(os.environ.get("LOG_FLUSH_INTERVAL_MS", "200")) / 1000,
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    def _formatter(self) -> logging.Formatter:
+        return JsonFormatter() if self.format == "json" else TextFormatter()
+
+    def _sinks(self) -> List[_Sink]:
+        log_dir = os.path.dirname(self.log_file)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        sinks = [_Sink(open(self.log_file, "a", encoding="utf-8", buffering=1 << 16), self._formatter(), close=True)]
+        if self.console:
+            sinks.append(_Sink(sys.stderr, TextFormatter()))
+        return sinks
+
+    def start(self) -> "LogPipeline":
+        root = logging.getLogger()
+        root.setLevel(self.level)
+
+        if self.mode == "sync":
+            file_handler = logging.FileHandler(self.log_file, encoding="utf-8")
+            file_handler.setFormatter(self._formatter())
+            self._sync_handlers = [file_handler]
+            if self.console:
+                console_handler = logging.StreamHandler()
+                console_handler.setFormatter(TextFormatter())
+                self._sync_handlers.append(console_handler)
+            for handler in self._sync_handlers:
+                root.addHandler(handler)
+            return self
+
+        log_queue = queue.Queue(maxsize=self.queue_size)
+        self.handler = DroppingQueueHandler(log_queue)
+        self.writer = BatchingLogWriter(log_queue, self._sinks(), self.batch_size, self.flush_interval)
+        self.writer.start()
+        root.addHandler(self.handler)
+
+        # Threads do not survive fork (serve.py workers): give each child its own writer
+        if hasattr(os, "register_at_fork") and not self._fork_hook_registered:
+            os.register_at_fork(after_in_child=self._restart_in_child)
+            self._fork_hook_registered = True
+        return self
+
+    def _restart_in_child(self) -> None:
+        if self.handler is None:
+            return
+        logging.getLogger().removeHandler(self.handler)
+        self.handler = None
+        self.writer = None
+        self.start()
+
+    def stop(self) -> None:
+        """Flush queued records and release the sinks"""
+        root = logging.getLogger()
+        if self.handler is not None:
+            root.removeHandler(self.handler)
+            self.writer.stop()
+            for sink in self.writer.sinks:
+                sink.close()
+            self.handler = None
+            self.writer = None
+        for handler in self._sync_handlers:
+            root.removeHandler(handler)
+            handler.close()
+        self._sync_handlers = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "format": self.format,
+            "queued": self.handler.queue.qsize() if self.handler else 0,
+            "dropped": self.handler.dropped if self.handler else 0,
+            "records_written": self.writer.records if self.writer else None,
+            "batches_written": self.writer.batches if self.writer else None
+        }
@@ -0,0 +1,245 @@
+"""
+Prediction pipeline metrics in Prometheus text format
+
+Stage latencies feed fixed-bucket histograms (``inference.histogram``) and
+outcomes feed counters, all keyed by label values:
+
+    prediction_request_seconds{route,outcome}          whole request, first byte in to response start
+    prediction_request_stage_seconds{route,stage}      validation, inference, serialization
+    prediction_model_stage_seconds{model,stage}        encode, predict_proba, postprocess
+    prediction_requests_total{model,outcome}           success, invalid, rejected, error
+    prediction_risk_level_total{model,risk_level}      scored records per risk level
+
+Request-level stages come from ``PredictionTimingMiddleware`` (a plain ASGI
+middleware, so it adds no extra task or response buffering) plus two marks
+set by the endpoint:
+
+- validation: request start until the endpoint body runs, i.e. reading the
+  body, JSON parsing and pydantic validation (for batches it also covers the
+  per-record validation in the endpoint)
+- inference: waiting for and running the model, including micro-batching
+- serialization: from the model results until the response starts, i.e.
+  the prediction log record, building ``PredictionResponse`` and FastAPI's
+  response model validation and JSON encoding
+
+Model stages are timed inside the predictors, once per ``predict`` or
+``predict_batch`` call (a micro-batch is one observation): encoding the
+request into feature rows, predict_proba (for heart including the scaling of
+the encoded rows) and postprocess (risk level, recommendations and risk
+factors). Cache hits skip the predict_proba stage. With ``INFERENCE_EXECUTOR=process`` the predictors run in
+child processes, so only the request-level series are filled.
+
+All timers are ``time.perf_counter`` reads; an observation is a bisect and
+three additions under a lock.
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from inference.histogram import Histogram
+
+# Seconds; covers a cached single prediction up to a large batch
+LATENCY_BUCKETS = [0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+
+METRIC_HELP = {
+    "prediction_request_seconds": ("histogram", "Prediction request latency in seconds"),
+    "prediction_request_stage_seconds": ("histogram", "Prediction request latency per stage in seconds"),
+    "prediction_model_stage_seconds": ("histogram", "Predictor latency per stage and call in seconds"),
+    "prediction_requests_total": ("counter", "Prediction requests by outcome"),
+    "prediction_risk_level_total": ("counter", "Scored records by risk level"),
+}
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class HistogramSeries:
+    """One labelled histogram; hot paths resolve it once and keep it"""
+
+    __slots__ = ("histogram", "_lock")
+
+    def __init__(self, histogram: Histogram, lock: threading.Lock):
+        self.histogram = histogram
+        self._lock = lock
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.histogram.observe(seconds)
+
+
+class MetricsRegistry:
+    """Thread-safe labelled histograms and counters rendered in Prometheus text format"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = list(buckets)
+        self._histograms: Dict[_Key, HistogramSeries] = {}
+        self._counters: Dict[_Key, float] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, **labels: str) -> HistogramSeries:
+        """The series for these labels, created on first use"""
+        key = (name, tuple(sorted(labels.items())))
+        series = self._histograms.get(key)
+        if series is None:
+            with self._lock:
+                series = self._histograms.setdefault(key, HistogramSeries(Histogram(self.buckets), self._lock))
+        return series
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        self.histogram(name, **labels).observe(seconds)
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def count_values(self, name: str, values: Iterable[str], label: str, **labels: str) -> None:
+        """Increment one counter series per value, e.g. the risk levels of a batch"""
+        totals: Dict[str, int] = {}
+        for value in values:
+            totals[value] = totals.get(value, 0) + 1
+        for value, amount in totals.items():
+            self.inc(name, amount, **labels, **{label: value})
+
+    def reset(self) -> None:
+        with self._lock:
+            for series in self._histograms.values():
+                series.histogram = Histogram(self.buckets)
+            self._counters.clear()
+
+    def render(self) -> str:
+        """All series in Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            histograms = {key: series.histogram.snapshot() for key, series in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        described = set()
+
+        def describe(name: str) -> None:
+            if name not in described and name in METRIC_HELP:
+                kind, text = METRIC_HELP[name]
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+            described.add(name)
+
+        for (name, labels), snapshot in sorted(histograms.items()):
+            describe(name)
+            for bound, count in snapshot["buckets"].items():
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {snapshot['sum']!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {snapshot['count']}")
+        for (name, labels), value in sorted(counters.items()):
+            describe(name)
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+# Process-wide registry used by the predictors and main.py
+metrics = MetricsRegistry()
+
+
+class RequestTiming:
+    """Marks set while one prediction request is served"""
+
+    __slots__ = ("started", "handler_started", "inference_finished", "response_started")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.handler_started: Optional[float] = None
+        self.inference_finished: Optional[float] = None
+        self.response_started: Optional[float] = None
+
+
+_current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("prediction_request_timing", default=None)
+
+
+def mark_handler_started() -> Optional[RequestTiming]:
+    """Called first thing in a prediction endpoint: validation is over"""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.handler_started = time.perf_counter()
+    return timing
+
+
+def mark_inference_finished(timing: Optional[RequestTiming]) -> None:
+    """Called once the model results are back: serialization starts"""
+    if timing is not None:
+        timing.inference_finished = time.perf_counter()
+
+
+def outcome_for_status(status: int) -> str:
+    if status < 400:
+        return "success"
+    if status == 422:
+        return "invalid"
+    if status == 503:
+        return "rejected"
+    return "error"
+
+
+class PredictionTimingMiddleware:
+    """ASGI middleware timing the prediction routes and counting their outcomes"""
+
+    def __init__(self, app, routes: Dict[str, str], registry: MetricsRegistry = metrics):
+        self.app = app
+        self.routes = routes  # path -> model name; other paths pass straight through
+        self.registry = registry
+        self._stages = {
+            (route, stage): registry.histogram("prediction_request_stage_seconds", route=route, stage=stage)
+            for route in routes for stage in ("validation", "inference", "serialization")
+        }
+        self._totals: Dict[Tuple[str, str], HistogramSeries] = {}
+
+    async def __call__(self, scope, receive, send):
+        model_name = self.routes.get(scope.get("path")) if scope["type"] == "http" else None
+        if model_name is None:
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming(time.perf_counter())
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                timing.response_started = time.perf_counter()
+                status = message["status"]
+            await send(message)
+
+        token = _current_timing.set(timing)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timing.reset(token)
+            self._record(scope["path"], model_name, timing, status)
+
+    def _record(self, route: str, model_name: str, timing: RequestTiming, status: int) -> None:
+        finished = timing.response_started or time.perf_counter()
+        outcome = outcome_for_status(status)
+        total = self._totals.get((route, outcome))
+        if total is None:
+            total = self._totals[(route, outcome)] = self.registry.histogram(
+                "prediction_request_seconds", route=route, outcome=outcome
+            )
+        total.observe(finished - timing.started)
+        self.registry.inc("prediction_requests_total", model=model_name, outcome=outcome)
+        if timing.handler_started is None:
+            return
+        self._stages[(route, "validation")].observe(timing.handler_started - timing.started)
+        if timing.inference_finished is not None:
+            self._stages[(route, "inference")].observe(timing.inference_finished - timing.handler_started)
+            if timing.response_started is not None:
+                self._stages[(route, "serialization")].observe(timing.response_started - timing.inference_finished)
@@ -0,0 +1,68 @@
+"""
+Request profiling for the FastAPI backend
+
+ASGI counterpart of ``ml_runtime.profiling.ProfilingWSGIMiddleware``. It is
+only added to the app when ``RequestProfiler.enabled``, so unprofiled
+deployments pay nothing.
+
+In deterministic mode cProfile runs on the event loop thread from the first
+byte in to the response start, and the inference executor profiles the
+predictor call on its worker thread (``profiled_call``). Other requests the
+loop serves while this one awaits its result show up in the loop thread's
+profile. If another profiled request already holds the loop thread, the
+request is sampled instead. Profiled single predictions skip micro-batching,
+so that the model call belongs to them.
+"""
+
+import asyncio
+import os
+import sys
+
+# Shared runtime (profiler core) lives in ML_prediction/ml_runtime
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction'))
+from ml_runtime.profiling import RequestProfiler, current_session, profiled_call
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling selected requests under a path prefix"""
+
+    def __init__(self, app, profiler: RequestProfiler, path_prefix: str = "/"):
+        self.app = app
+        self.profiler = profiler
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope, receive, send):
+        mode = None
+        if scope["type"] == "http" and scope["path"].startswith(self.path_prefix):
+            headers = dict(scope["headers"])
+            mode = self.profiler.choose(
+                headers.get(b"x-profile", b"").decode("latin-1") or None,
+                headers.get(b"x-profile-token", b"").decode("latin-1") or None
+            )
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        session = self.profiler.start(mode, scope["path"])
+        token = current_session.set(session)
+
+        async def send_with_links(message):
+            if message["type"] == "http.response.start":
+                session.stop()
+                links = [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                         for name, value in self.profiler.response_headers(session)]
+                message = dict(message, headers=list(message.get("headers", [])) + links)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_links)
+        finally:
+            current_session.reset(token)
+            session.stop()
+            # Writing the files is blocking I/O: keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.profiler.save, session)
+
+
+def profiling_active() -> bool:
+    """Whether the request being served is profiled"""
+    return current_session.get() is not None
@@ -3,7 +3,7 @@ Pydantic schemas for request and response models
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Type
 
 class HeartPredictionRequest(BaseModel):
     """Schema for heart disease prediction request"""
@@ -45,9 +45,122 @@ class PredictionResponse(BaseModel):
     recommendations: List[str] = Field(..., description="Health recommendations")
     risk_factors: List[str] = Field(..., description="Contributing risk factors")
     timestamp: str = Field(..., description="Prediction timestamp")
+    model_version: Optional[str] = Field(None, description="Version of the model that scored the request")
+
+class FeatureContribution(BaseModel):
+    """Contribution of one request field to the predicted probability"""
+    feature: str = Field(..., description="Request field")
+    value: Optional[float] = Field(None, description="Value of the field in the request")
+    contribution: float = Field(..., description="Change in the predicted probability credited to the field")
+
+class ExplanationResponse(BaseModel):
+    """Schema for a per-prediction feature attribution"""
+    prediction: int = Field(..., description="Prediction result (0=low risk, 1=high risk)")
+    probability: float = Field(..., description="Probability of positive prediction")
+    base_value: float = Field(..., description="Probability before any feature is considered (training class share)")
+    contributions: List[FeatureContribution] = Field(
+        ..., description="Per-field contributions, largest first; base_value plus their sum is the probability"
+    )
+    model_version: Optional[str] = Field(None, description="Version of the model that was explained")
+
+class FeatureImportance(BaseModel):
+    """Permutation importance of one raw feature"""
+    feature: str = Field(..., description="Raw model feature")
+    mean: float = Field(..., description="Mean drop in ROC AUC when the feature is shuffled")
+    std: float = Field(..., description="Standard deviation of the drop across shuffles")
+    drops: List[float] = Field(..., description="Drop in ROC AUC of every shuffle")
+
+class PermutationImportance(BaseModel):
+    """Permutation importance of every raw feature"""
+    metric: str = Field(..., description="Score whose drop is measured")
+    baseline: float = Field(..., description="Score on the unshuffled data")
+    features: List[FeatureImportance] = Field(..., description="Features, most important first")
+
+class OneWayPartialDependence(BaseModel):
+    """Mean predicted probability with one feature set to each grid value"""
+    feature: str = Field(..., description="Raw model feature")
+    grid: List[Any] = Field(..., description="Feature values")
+    average: List[float] = Field(..., description="Mean predicted probability at each grid value")
+
+class TwoWayPartialDependence(BaseModel):
+    """Mean predicted probability with two features set to each pair of grid values"""
+    features: List[str] = Field(..., description="Raw model features")
+    grids: List[List[Any]] = Field(..., description="Values of each feature")
+    average: List[List[float]] = Field(..., description="Mean predicted probability, indexed [first][second]")
+
+class PartialDependence(BaseModel):
+    """One-way partial dependence of every feature and two-way of every pair"""
+    one_way: List[OneWayPartialDependence]
+    two_way: List[TwoWayPartialDependence]
+
+class GlobalExplanationResponse(BaseModel):
+    """Schema for the precomputed global explanations of a model"""
+    model_version: Optional[str] = Field(None, description="Version of the model that was explained")
+    created_at: str = Field(..., description="When the explanations were computed")
+    data: Dict[str, Any] = Field(..., description="Rows they were computed on (source and count)")
+    explained_class: Any = Field(..., description="Class whose predicted probability is explained")
+    settings: Dict[str, Any] = Field(..., description="Shuffles, grid resolutions and percentiles used")
+    request_fields: Dict[str, str] = Field(..., description="Raw model feature -> request field it is written from")
+    permutation_importance: PermutationImportance
+    partial_dependence: PartialDependence
+
+# Upper bound on records accepted by a single batch request
+MAX_BATCH_SIZE = 5000
+
+class HeartBatchPredictionRequest(BaseModel):
+    """Schema for batch heart disease prediction request"""
+    records: List[Dict[str, Any]] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_SIZE,
+        description=f"Patient records in HeartPredictionRequest format (1-{MAX_BATCH_SIZE})"
+    )
+
+class DiabetesBatchPredictionRequest(BaseModel):
+    """Schema for batch diabetes prediction request"""
+    records: List[Dict[str, Any]] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_SIZE,
+        description=f"Patient records in DiabetesPredictionRequest format (1-{MAX_BATCH_SIZE})"
+    )
+
+class BatchPredictionItem(PredictionResponse):
+    """Schema for a single successful prediction within a batch"""
+    index: int = Field(..., description="Position of the record in the request")
+
+class BatchRecordError(BaseModel):
+    """Schema for a record that could not be scored"""
+    index: int = Field(..., description="Position of the record in the request")
+    message: str = Field(..., description="Reason the record was rejected")
+
+class BatchPredictionResponse(BaseModel):
+    """Schema for batch prediction response"""
+    total: int = Field(..., description="Number of records received")
+    succeeded: int = Field(..., description="Number of records scored")
+    failed: int = Field(..., description="Number of records rejected")
+    results: List[BatchPredictionItem] = Field(..., description="Per-record prediction results")
+    errors: List[BatchRecordError] = Field(..., description="Per-record validation errors")
+
+class ModelRoutingRequest(BaseModel):
+    """Schema for changing how a model's requests are routed between versions"""
+    mode: str = Field(..., pattern="^(primary|canary|shadow)$", description="primary, canary or shadow")
+    candidate: Optional[str] = Field(None, description="Registry version to canary or shadow (default: the current candidate)")
+    percent: Optional[float] = Field(None, gt=0, le=100, description="Share of records sent to the candidate in canary mode")
 
 class ErrorResponse(BaseModel):
     """Schema for error response"""
     error: bool = True
     message: str
     status_code: int
+
+def field_bounds(schema: Type[BaseModel]) -> Dict[str, Tuple[float, float]]:
+    """(ge, le) bounds of every field of a request schema, in declaration order"""
+    bounds = {}
+    for name, field in schema.model_fields.items():
+        low, high = float("-inf"), float("inf")
+        for constraint in field.metadata:
+            low = getattr(constraint, "ge", low)
+            high = getattr(constraint, "le", high)
+        bounds[name] = (low, high)
+    return bounds
+
+def integer_fields(schema: Type[BaseModel]) -> List[str]:
+    """Fields of a request schema annotated ``int``, in declaration order"""
+    return [name for name, field in schema.model_fields.items() if field.annotation is int]
@@ -0,0 +1,401 @@
+"""
+Offline bulk scoring of patient files
+
+Streams a CSV, Parquet or NDJSON file through the heart or diabetes model in
+fixed-size chunks and writes the input rows back, as read, with
+``prediction``, ``probability``, ``risk_level`` and ``error`` columns. Each
+chunk is validated against the request schema (bounds, and whole numbers for
+``int`` fields), then encoded and scored in one vectorized call. Rows that
+fail validation are kept with an ``error`` and no score.
+
+Chunks are scored in a process pool, with a bounded number in flight, and
+written in input order as they finish, so memory depends on the chunk size
+and worker count, not on the file size. After every chunk the output is
+flushed and a checkpoint (``<output>.checkpoint.json``) records the
+chunks, rows and output bytes written. Workers serialize their own chunks, so
+the writer only appends bytes. ``--resume`` truncates the output to
+the checkpoint and continues with the next chunk. Parquet output is a
+directory of one part file per chunk, since a Parquet file cannot be appended
+to.
+
+Usage (from the backend directory):
+    python score.py heart patients.csv --output scored.csv
+    python score.py diabetes extract.parquet --output scored.parquet --workers 4
+    python score.py heart patients.ndjson --output scored.ndjson --resume
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+import warnings
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.risk import RISK_LEVELS, RISK_THRESHOLDS
+from schemas.prediction_schemas import (
+    DiabetesPredictionRequest, HeartPredictionRequest, field_bounds, integer_fields
+)
+
+logger = logging.getLogger("score")
+
+SCHEMAS = {"heart": HeartPredictionRequest, "diabetes": DiabetesPredictionRequest}
+
+FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".json": "ndjson",
+}
+
+# Chunks queued per worker; bounds memory while keeping every worker busy
+IN_FLIGHT_PER_WORKER = 2
+
+_predictor = None
+
+
+def detect_format(path: str, override: Optional[str] = None) -> str:
+    if override:
+        return override
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise SystemExit(f"❌ Cannot tell the format of {path}; pass --input-format/--output-format")
+    return fmt
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("❌ Parquet needs pyarrow (pip install pyarrow)")
+    return pq
+
+
+# ---------------------------------------------------------------- reading
+
+def read_chunks(path: str, fmt: str, chunk_size: int, start_row: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    DataFrames of ``chunk_size`` rows from ``start_row`` on. Values are read
+    as they are stored (CSV as strings, NDJSON as the parsed JSON values,
+    Parquet in its Arrow types), so every chunk has the same column types and
+    is written back unchanged; only the scoring copies are made numeric.
+    """
+    if fmt == "csv":
+        # A callable keeps skipping O(1) in memory, unlike a list of row numbers
+        skip = (lambda i: 0 < i <= start_row) if start_row else None
+        yield from pd.read_csv(path, chunksize=chunk_size, skiprows=skip, dtype=str, keep_default_na=False)
+    elif fmt == "ndjson":
+        yield from _ndjson_chunks(path, chunk_size, start_row)
+    else:
+        yield from _parquet_chunks(path, chunk_size, start_row)
+
+
+def _ndjson_chunks(path: str, chunk_size: int, start_row: int) -> Iterator[pd.DataFrame]:
+    with open(path) as f:
+        lines = (line for line in f if line.strip())
+        for _ in itertools.islice(lines, start_row):
+            pass
+        while True:
+            records = [json.loads(line) for line in itertools.islice(lines, chunk_size)]
+            if not records:
+                return
+            yield pd.DataFrame(records, dtype=object)
+
+
+def _parquet_chunks(path: str, chunk_size: int, start_row: int) -> Iterator[pd.DataFrame]:
+    pq = _require_pyarrow()
+    parquet = pq.ParquetFile(path)
+    # Skip whole row groups from the footer metadata, then the rest row by row
+    row_groups, skip = [], start_row
+    for index in range(parquet.num_row_groups):
+        rows = parquet.metadata.row_group(index).num_rows
+        if skip >= rows and not row_groups:
+            skip -= rows
+        else:
+            row_groups.append(index)
+    buffered, buffered_rows = [], 0
+    for batch in parquet.iter_batches(batch_size=chunk_size, row_groups=row_groups):
+        if skip:
+            dropped = min(skip, batch.num_rows)
+            batch, skip = batch.slice(dropped), skip - dropped
+        buffered.append(batch)
+        buffered_rows += batch.num_rows
+        # Batches stop at row group boundaries: re-cut them into full chunks
+        while buffered_rows >= chunk_size:
+            frame = pd.concat([_to_frame(b) for b in buffered], ignore_index=True)
+            yield frame.iloc[:chunk_size].reset_index(drop=True)
+            rest = frame.iloc[chunk_size:].reset_index(drop=True)
+            buffered = [] if rest.empty else [_to_batch(rest)]
+            buffered_rows = len(rest)
+    if buffered_rows:
+        yield pd.concat([_to_frame(b) for b in buffered], ignore_index=True)
+
+
+def _to_frame(batch: Any) -> pd.DataFrame:
+    # Arrow-backed columns keep the file's types, nulls included, on the way back out
+    return batch.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _to_batch(frame: pd.DataFrame) -> Any:
+    import pyarrow as pa
+
+    return pa.RecordBatch.from_pandas(frame, preserve_index=False)
+
+
+# ---------------------------------------------------------------- scoring
+
+def _init_worker(disease: str, max_jobs: Optional[int]) -> None:
+    """Load the model once per worker process"""
+    global _predictor
+    if max_jobs is not None:
+        # Workers already use the cores; don't let each forest fan out over all of them
+        os.environ.setdefault("FOREST_MAX_JOBS", str(max_jobs))
+    if disease == "heart":
+        from models.heart_model import HeartDiseasePredictor
+
+        _predictor = HeartDiseasePredictor()
+    else:
+        from models.diabetes_model import DiabetesPredictor
+
+        _predictor = DiabetesPredictor()
+
+
+def score_chunk(disease: str, frame: pd.DataFrame) -> pd.DataFrame:
+    """Validate, encode and score one chunk; returns it with the result columns added"""
+    n = len(frame)
+    values = {}
+    errors = np.full(n, None, dtype=object)
+    integers = set(integer_fields(SCHEMAS[disease]))
+    # Reverse order, so a row's error names its first failing field
+    for field, (low, high) in reversed(list(field_bounds(SCHEMAS[disease]).items())):
+        if field in frame:
+            # A numeric copy for scoring; the input column itself is written back as read
+            column = pd.to_numeric(frame[field], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            column = np.full(n, np.nan)
+        values[field] = column
+        missing = np.isnan(column)
+        errors[missing] = f"{field}: missing or not a number"
+        errors[~missing & ((column < low) | (column > high))] = f"{field}: outside [{low:g}, {high:g}]"
+        if field in integers:
+            # Like the API, which rejects 1.5 for an int field before checking its bounds
+            errors[~missing & (column != np.floor(column))] = f"{field}: not an integer"
+    valid = np.array([error is None for error in errors], dtype=bool)
+
+    probability = np.full(n, np.nan)
+    prediction = pd.array([pd.NA] * n, dtype="Int64")
+    if valid.any():
+        chunk = pd.DataFrame({field: column[valid] for field, column in values.items()})
+        probabilities = _predictor.predict_proba_frame(chunk)
+        classes = _predictor.model.classes_
+        probability[valid] = probabilities[:, 1]
+        prediction[valid] = classes[np.argmax(probabilities, axis=1)].astype(np.int64)
+    risk_level = np.where(
+        valid, np.array(RISK_LEVELS, dtype=object)[np.searchsorted(RISK_THRESHOLDS, probability, side="right")],
+        None
+    )
+
+    scored = frame.copy()
+    scored["prediction"] = prediction
+    scored["probability"] = probability
+    scored["risk_level"] = risk_level
+    scored["error"] = errors
+    return scored
+
+
+# ---------------------------------------------------------------- writing
+
+def serialize_chunk(scored: pd.DataFrame, fmt: str, header: bool) -> bytes:
+    """Scored chunk as the bytes appended to the output (a whole part file for Parquet)"""
+    if fmt == "csv":
+        return scored.to_csv(header=header, index=False).encode()
+    if fmt == "ndjson":
+        return (scored.to_json(orient="records", lines=True).rstrip("\n") + "\n").encode()
+    import pyarrow as pa
+
+    pq = _require_pyarrow()
+    sink = pa.BufferOutputStream()
+    pq.write_table(pa.Table.from_pandas(scored, preserve_index=False), sink)
+    return sink.getvalue().to_pybytes()
+
+
+def process_chunk(disease: str, frame: pd.DataFrame, fmt: str, header: bool) -> Tuple[bytes, int, int]:
+    """Score and serialize one chunk in a worker: (output bytes, rows, rows that failed validation)"""
+    scored = score_chunk(disease, frame)
+    return serialize_chunk(scored, fmt, header), len(scored), int(scored["error"].notna().sum())
+
+
+class OutputWriter:
+    """Appends serialized chunks to a CSV or NDJSON file, or as Parquet part files in a directory"""
+
+    def __init__(self, path: str, fmt: str, position: int = 0):
+        self.path = path
+        self.fmt = fmt
+        # Bytes written for CSV and NDJSON, part files for Parquet
+        self.position = position
+        if fmt == "parquet":
+            os.makedirs(path, exist_ok=True)
+            # Parts past the checkpoint were written by a run that crashed before saving it
+            for name in os.listdir(path):
+                if name.startswith("part-") and int(name[5:10]) >= position:
+                    os.remove(os.path.join(path, name))
+            self.file = None
+        else:
+            self.file = open(path, "r+b" if position and os.path.exists(path) else "wb")
+            self.file.truncate(position)
+            self.file.seek(position)
+
+    def write(self, data: bytes) -> None:
+        if self.fmt == "parquet":
+            part = os.path.join(self.path, f"part-{self.position:05d}.parquet")
+            with open(part + ".tmp", "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(part + ".tmp", part)
+            self.position += 1
+            return
+        self.file.write(data)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.position = self.file.tell()
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+
+
+class Checkpoint:
+    """Progress of one scoring run, saved atomically after every chunk"""
+
+    def __init__(self, path: str, state: Dict[str, Any]):
+        self.path = path
+        self.state = state
+
+    @classmethod
+    def for_output(cls, output: str) -> str:
+        return output.rstrip(os.sep) + ".checkpoint.json"
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Checkpoint"]:
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return cls(path, json.load(f))
+
+    def save(self) -> None:
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def _input_identity(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {"input": os.path.abspath(path), "input_bytes": stat.st_size, "input_mtime": stat.st_mtime}
+
+
+# ---------------------------------------------------------------- driver
+
+def run(disease: str, input_path: str, output_path: str, input_format: str, output_format: str,
+        chunk_size: int, workers: int, resume: bool) -> Dict[str, Any]:
+    checkpoint_path = Checkpoint.for_output(output_path)
+    identity = _input_identity(input_path)
+    checkpoint = Checkpoint.load(checkpoint_path) if resume else None
+    if checkpoint is not None:
+        state = checkpoint.state
+        expected = dict(identity, disease=disease, chunk_size=chunk_size, output_format=output_format)
+        changed = [key for key, value in expected.items() if state.get(key) != value]
+        if changed:
+            raise SystemExit(f"❌ Cannot resume: {', '.join(changed)} changed since the checkpoint")
+        if state["complete"]:
+            logger.info(f"{output_path} is already complete ({state['rows_done']} rows)")
+            return state
+        logger.info(f"Resuming after chunk {state['chunks_done']} ({state['rows_done']} rows)")
+    else:
+        state = dict(identity, disease=disease, chunk_size=chunk_size, output_format=output_format,
+                     chunks_done=0, rows_done=0, rows_failed=0, output_position=0, complete=False)
+        checkpoint = Checkpoint(checkpoint_path, state)
+
+    writer = OutputWriter(output_path, output_format, state["output_position"])
+    chunks = read_chunks(input_path, input_format, chunk_size, state["rows_done"])
+    max_jobs = max(1, (os.cpu_count() or 1) // workers)
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(disease, max_jobs)) if workers > 1 else None
+    if pool is None:
+        _init_worker(disease, None)
+
+    start, rows_at_start = time.perf_counter(), state["rows_done"]
+    pending: "deque[Future]" = deque()
+
+    def commit(result: Tuple[bytes, int, int]) -> None:
+        data, rows, failed = result
+        writer.write(data)
+        state["chunks_done"] += 1
+        state["rows_done"] += rows
+        state["rows_failed"] += failed
+        state["output_position"] = writer.position
+        checkpoint.save()
+        rows = state["rows_done"] - rows_at_start
+        logger.info(f"chunk {state['chunks_done']}: {state['rows_done']} rows scored "
+                    f"({rows / (time.perf_counter() - start):,.0f} rows/s)")
+
+    try:
+        for index, frame in enumerate(chunks):
+            # The CSV header goes with the first chunk of a fresh output only
+            header = index == 0 and writer.position == 0
+            if pool is None:
+                commit(process_chunk(disease, frame, output_format, header))
+                continue
+            pending.append(pool.submit(process_chunk, disease, frame, output_format, header))
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                commit(pending.popleft().result())
+        while pending:
+            commit(pending.popleft().result())
+    finally:
+        for future in pending:
+            future.cancel()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        writer.close()
+
+    state["complete"] = True
+    checkpoint.save()
+    elapsed = time.perf_counter() - start
+    rows = state["rows_done"] - rows_at_start
+    logger.info(f"✅ {state['rows_done']} rows written to {output_path} ({state['rows_failed']} failed validation); "
+                f"{rows} scored in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV, Parquet or NDJSON patient file in streaming chunks")
+    parser.add_argument("disease", choices=list(SCHEMAS))
+    parser.add_argument("input")
+    parser.add_argument("--output", required=True, help="Output file (a directory of part files for Parquet)")
+    parser.add_argument("--input-format", choices=sorted(set(FORMATS.values())))
+    parser.add_argument("--output-format", choices=sorted(set(FORMATS.values())))
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Scoring processes (1 scores in this process)")
+    parser.add_argument("--resume", action="store_true", help="Continue from the output's checkpoint")
+    parser.add_argument("--log-level", default=os.environ.get("LOG_LEVEL", "info").upper())
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    logging.basicConfig(level=args.log_level, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    if args.chunk_size < 1 or args.workers < 1:
+        sys.exit("❌ --chunk-size and --workers must be positive")
+    run(args.disease, args.input, args.output, detect_format(args.input, args.input_format),
+        detect_format(args.output, args.output_format), args.chunk_size, args.workers, args.resume)
+
+
+if __name__ == "__main__":
+    main()
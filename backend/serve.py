@@ -0,0 +1,221 @@
+"""
+Production launcher for the FastAPI backend
+
+Loads both models once in the master process, freezes the garbage collector
+so the loaded objects are never touched by collections (which would dirty and
+copy their pages in every worker), binds the listening socket and forks N
+uvicorn workers that share it. Dead workers are restarted; SIGINT/SIGTERM
+stop them all.
+
+Per-worker memory is logged after startup and every ``--report-interval``
+seconds: ``shared`` is memory still shared with the master (the models),
+``private`` is what each worker added on its own. Each worker also serves
+its own numbers at /stats/worker.
+
+Usage (from the backend directory):
+    python serve.py --workers 4 --pin-cpus
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+# Launcher settings, overridable from the environment
+DEFAULT_WORKERS = int(os.environ.get("SERVE_WORKERS", "1"))
+DEFAULT_HOST = os.environ.get("HOST", "0.0.0.0")
+DEFAULT_PORT = int(os.environ.get("PORT", "8000"))
+DEFAULT_PIN_CPUS = os.environ.get("SERVE_PIN_CPUS", "false").lower() == "true"
+DEFAULT_REPORT_INTERVAL = float(os.environ.get("SERVE_REPORT_INTERVAL", "60"))
+
+logger = logging.getLogger("serve")
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def worker_cpu(index: int) -> Optional[int]:
+    """CPU a worker is pinned to: workers are spread round-robin over the allowed CPUs"""
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    cpus = sorted(os.sched_getaffinity(0))
+    return cpus[index % len(cpus)]
+
+
+def run_worker(index: int, sock: socket.socket, pin_cpus: bool, log_level: str) -> None:
+    """Body of a forked worker; never returns"""
+    import uvicorn
+    import main
+
+    os.environ["SERVE_WORKER_INDEX"] = str(index)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    if pin_cpus:
+        cpu = worker_cpu(index)
+        if cpu is not None:
+            os.sched_setaffinity(0, {cpu})
+
+    exit_code = 0
+    try:
+        config = uvicorn.Config(main.app, log_level=log_level, lifespan="on")
+        uvicorn.Server(config).run(sockets=[sock])
+    except Exception:
+        logger.exception(f"Worker {index} crashed")
+        exit_code = 1
+    finally:
+        logging.shutdown()
+        os._exit(exit_code)
+
+
+class Launcher:
+    """Pre-forking master process"""
+
+    def __init__(self, workers: int, host: str, port: int, pin_cpus: bool = False,
+                 report_interval: float = DEFAULT_REPORT_INTERVAL, log_level: str = "info"):
+        self.workers = max(1, workers)
+        self.host = host
+        self.port = port
+        self.pin_cpus = pin_cpus
+        self.report_interval = report_interval
+        self.log_level = log_level
+        self.sock = None
+        self.children: Dict[int, int] = {}  # pid -> worker index
+        self.stopping = False
+
+    def preload(self) -> None:
+        """Import the app and load the models once, before any fork"""
+        import main
+
+        start = time.perf_counter()
+        main.load_models()
+        # Move everything loaded so far into the permanent generation: later
+        # collections in the workers skip it, so its pages stay shared
+        gc.collect()
+        gc.freeze()
+        logger.info(f"Models preloaded in {time.perf_counter() - start:.2f}s "
+                    f"({gc.get_freeze_count()} objects frozen)")
+
+    def spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            run_worker(index, self.sock, self.pin_cpus, self.log_level)
+        self.children[pid] = index
+        logger.info(f"Worker {index} started (pid {pid})")
+
+    def report_memory(self) -> None:
+        from inference.process_stats import cpu_affinity, format_bytes, memory_usage
+
+        master = memory_usage()
+        logger.info(f"master pid {os.getpid()}: rss {format_bytes(master['rss_bytes'])}")
+        for pid, index in sorted(self.children.items(), key=lambda item: item[1]):
+            usage = memory_usage(pid)
+            shared = None
+            if usage["shared_clean_bytes"] is not None:
+                shared = usage["shared_clean_bytes"] + usage["shared_dirty_bytes"]
+            private = None
+            if usage["private_clean_bytes"] is not None:
+                private = usage["private_clean_bytes"] + usage["private_dirty_bytes"]
+            logger.info(
+                f"worker {index} pid {pid} cpus {cpu_affinity(pid)}: rss {format_bytes(usage['rss_bytes'])}, "
+                f"pss {format_bytes(usage['pss_bytes'])}, shared {format_bytes(shared)}, "
+                f"private {format_bytes(private)}"
+            )
+
+    def _handle_stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def reap(self) -> None:
+        """Collect exited workers and restart them unless shutting down"""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            index = self.children.pop(pid, None)
+            if index is None:
+                continue
+            if not self.stopping:
+                if os.WIFSIGNALED(status) and os.WTERMSIG(status) == signal.SIGTERM:
+                    # Stopped itself, e.g. the memory watchdog recycling it
+                    logger.info(f"Worker {index} (pid {pid}) was recycled, restarting")
+                else:
+                    logger.warning(f"Worker {index} (pid {pid}) exited with status {status}, restarting")
+                self.spawn(index)
+
+    def stop(self, timeout: float = 30.0) -> None:
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + timeout
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.children):
+            logger.warning(f"Worker pid {pid} did not stop in {timeout:.0f}s, killing it")
+            os.kill(pid, signal.SIGKILL)
+        self.reap()
+
+    def run(self) -> None:
+        self.preload()
+        self.sock = bind_socket(self.host, self.port)
+        logger.info(f"🌟 Serving on http://{self.host}:{self.port} with {self.workers} workers")
+
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        for index in range(self.workers):
+            self.spawn(index)
+
+        # Give workers time to start before the first memory report
+        next_report = time.monotonic() + min(5.0, self.report_interval)
+        try:
+            while not self.stopping:
+                self.reap()
+                if self.report_interval > 0 and time.monotonic() >= next_report:
+                    self.report_memory()
+                    next_report = time.monotonic() + self.report_interval
+                time.sleep(0.5)
+        finally:
+            logger.info("Stopping workers...")
+            self.stop()
+            self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the backend with pre-forked workers sharing preloaded models")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--pin-cpus", action="store_true", default=DEFAULT_PIN_CPUS,
+                        help="Pin each worker to one CPU (round-robin over the allowed CPUs)")
+    parser.add_argument("--report-interval", type=float, default=DEFAULT_REPORT_INTERVAL,
+                        help="Seconds between per-worker memory reports (0 disables them)")
+    parser.add_argument("--log-level", default=os.environ.get("LOG_LEVEL", "info").lower())
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("❌ serve.py needs os.fork; use 'uvicorn main:app' on this platform")
+
+    os.makedirs("logs", exist_ok=True)
+    Launcher(args.workers, args.host, args.port, args.pin_cpus, args.report_interval, args.log_level).run()
+
+
+if __name__ == "__main__":
+    main()
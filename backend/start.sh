@@ -44,6 +44,11 @@ if [ ! -f "../ML_prediction/flask-diabetes/model.pkl" ]; then
     echo "⚠️  Diabetes model not found. Please train the model first."
 fi
 
-# Start the FastAPI server
-echo "🌟 Starting FastAPI server on http://localhost:8000"
-uvicorn main:app --host 0.0.0.0 --port 8000 --reload
+# Start the FastAPI server (set SERVE_WORKERS to use the pre-forking production launcher)
+if [ -n "$SERVE_WORKERS" ]; then
+    echo "🌟 Starting FastAPI server on http://localhost:8000 with $SERVE_WORKERS workers"
+    python serve.py --workers "$SERVE_WORKERS" --port 8000
+else
+    echo "🌟 Starting FastAPI server on http://localhost:8000"
+    uvicorn main:app --host 0.0.0.0 --port 8000 --reload
+fi
@@ -104,6 +104,35 @@ def test_diabetes_prediction():
         print(f"❌ Diabetes Risk Prediction: FAILED (Error: {str(e)})")
         return False
 
+def test_batch_prediction():
+    """Test batch prediction endpoints with one valid and one invalid record"""
+    try:
+        heart_records = [
+            {"age": 45, "sex": 1, "cp": 0, "trestbps": 130, "chol": 200, "fbs": 0, "restecg": 0,
+             "thalach": 150, "exang": 0, "oldpeak": 1.0, "slope": 1, "ca": 0, "thal": 2},
+            {"age": 5, "sex": 1, "cp": 0, "trestbps": 130, "chol": 200, "fbs": 0, "restecg": 0,
+             "thalach": 150, "exang": 0, "oldpeak": 1.0, "slope": 1, "ca": 0, "thal": 2}
+        ]
+        
+        response = requests.post(f"{API_BASE_URL}/predict/heart/batch", json={"records": heart_records})
+        
+        if response.status_code == 200:
+            result = response.json()
+            if result.get('succeeded') == 1 and result.get('failed') == 1:
+                print("✅ Batch Prediction: PASSED")
+                print(f"   - Scored: {result['succeeded']} / {result['total']}")
+                print(f"   - Rejected: {result['errors'][0]['message']}")
+                return True
+            print(f"❌ Batch Prediction: FAILED (Unexpected counts: {result})")
+            return False
+        else:
+            print(f"❌ Batch Prediction: FAILED (Status: {response.status_code})")
+            print(f"   Response: {response.text}")
+            return False
+    except Exception as e:
+        print(f"❌ Batch Prediction: FAILED (Error: {str(e)})")
+        return False
+
 def main():
     """Run all tests"""
     print("🧪 Testing AI-Driven Disease Risk Prediction System")
@@ -125,14 +154,18 @@ def main():
     diabetes_ok = test_diabetes_prediction()
     print()
     
+    batch_ok = test_batch_prediction()
+    print()
+    
     # Summary
     print("=" * 60)
     print("🏁 Test Summary:")
     print(f"   - API Health: {'✅ PASSED' if health_ok else '❌ FAILED'}")
     print(f"   - Heart Prediction: {'✅ PASSED' if heart_ok else '❌ FAILED'}")
     print(f"   - Diabetes Prediction: {'✅ PASSED' if diabetes_ok else '❌ FAILED'}")
+    print(f"   - Batch Prediction: {'✅ PASSED' if batch_ok else '❌ FAILED'}")
     
-    if all([health_ok, heart_ok, diabetes_ok]):
+    if all([health_ok, heart_ok, diabetes_ok, batch_ok]):
         print("\n🎉 All tests passed! The system is working correctly.")
         print("\n📖 Next steps:")
         print("   1. Open frontend: file:///path/to/frontend/predict.html")
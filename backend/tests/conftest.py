@@ -0,0 +1,40 @@
+"""
+Shared fixtures for the backend unit tests
+
+Run from the repository root or the backend directory:
+    python -m pytest backend/tests
+"""
+
+import logging
+import os
+import sys
+
+import pytest
+
+# The backend modules import each other as top-level packages (models, inference, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from models.diabetes_model import DiabetesPredictor  # noqa: E402
+from models.heart_model import HeartDiseasePredictor  # noqa: E402
+
+
+def pytest_configure(config):
+    # The bundled pickles were written by an older scikit-learn
+    config.addinivalue_line("filterwarnings", "ignore::sklearn.exceptions.InconsistentVersionWarning")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def quiet_logs():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture(scope="session")
+def heart_predictor() -> HeartDiseasePredictor:
+    return HeartDiseasePredictor()
+
+
+@pytest.fixture(scope="session")
+def diabetes_predictor() -> DiabetesPredictor:
+    return DiabetesPredictor()
@@ -0,0 +1,49 @@
+"""Micro-batching: lone requests are not held, concurrent ones share a batch"""
+
+import asyncio
+import time
+
+from inference.batching import MicroBatcher
+
+
+class EchoExecutor:
+    """Stands in for the inference executor: one result per record, batch sizes recorded"""
+
+    def __init__(self):
+        self.batches = []
+
+    async def run(self, model_name, method, records):
+        self.batches.append(len(records))
+        await asyncio.sleep(0)
+        return [{"record": record} for record in records]
+
+
+def test_serial_requests_are_not_delayed():
+    executor = EchoExecutor()
+    # A window long enough that waiting for it would fail the test
+    batcher = MicroBatcher(executor, "heart", initial_wait_ms=1000, max_wait_ms=1000)
+
+    async def serial():
+        latencies = []
+        for i in range(60):
+            start = time.perf_counter()
+            assert await batcher.submit({"i": i}) == {"record": {"i": i}}
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    latencies = asyncio.run(serial())
+    assert max(latencies) < 0.1
+    assert executor.batches == [1] * 60
+
+
+def test_concurrent_requests_share_a_batch():
+    executor = EchoExecutor()
+    batcher = MicroBatcher(executor, "heart", max_batch_size=8, initial_wait_ms=1000, max_wait_ms=1000)
+
+    async def concurrent():
+        return await asyncio.gather(*(batcher.submit({"i": i}) for i in range(9)))
+
+    results = asyncio.run(concurrent())
+    assert results == [{"record": {"i": i}} for i in range(9)]
+    # The first is scored at once; the rest arrive while it is in flight and fill one batch
+    assert executor.batches == [1, 8]
@@ -0,0 +1,49 @@
+"""NumPy request encoders against the pandas reference path"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.batch_throughput import make_diabetes_records, make_heart_records
+from benchmarks.encoding import with_text_fields
+from benchmarks.reference import diabetes_frame, heart_frame
+
+
+def test_heart_encoder_matches_pandas(heart_predictor):
+    records = make_heart_records(200)
+    for record in records:
+        reference = heart_frame(heart_predictor, record).to_numpy()
+        encoded = np.asarray(heart_predictor.encoder.scale_matrix(heart_predictor.encoder.encode(record)))
+        assert np.array_equal(reference, encoded.reshape(reference.shape)), record
+
+    reference = heart_predictor.model.predict_proba(
+        pd.concat([heart_frame(heart_predictor, record) for record in records], ignore_index=True)
+    )
+    encoded = heart_predictor.predict_proba_encoded(heart_predictor.encode_batch(records))
+    assert np.array_equal(reference, encoded)
+
+
+def test_diabetes_encoder_matches_pandas(diabetes_predictor):
+    records = with_text_fields(make_diabetes_records(200))
+    for record in records:
+        reference = diabetes_frame(diabetes_predictor, record).to_numpy(dtype=np.float64)[0]
+        assert np.array_equal(reference, diabetes_predictor.encoder.encode(record)), record
+
+    reference = diabetes_predictor.model.predict_proba(
+        pd.concat([diabetes_frame(diabetes_predictor, record) for record in records], ignore_index=True)
+    )
+    encoded = diabetes_predictor.predict_proba_encoded(diabetes_predictor.encode_batch(records))
+    assert np.array_equal(reference, encoded)
+
+
+def test_diabetes_prediction_does_not_warn(diabetes_predictor):
+    record = make_diabetes_records(1)[0]
+    diabetes_predictor.cache.clear()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        diabetes_predictor.predict(record)
+        diabetes_predictor.predict_batch([record, dict(record, glucose=180)])
+    # Importing the model module leaves the process-wide warning filters alone
+    assert not any(action == "ignore" and message is not None and "feature names" in message.pattern
+                   for action, message, *_ in warnings.filters)
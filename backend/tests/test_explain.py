@@ -0,0 +1,47 @@
+"""Saabas attributions against sklearn's decision paths"""
+
+import numpy as np
+import pytest
+
+from benchmarks.explain import reference_contributions, sklearn_forest
+from benchmarks.rule_engine import dataset_records
+
+RECORDS = 300
+
+
+@pytest.fixture(params=["heart", "diabetes"])
+def case(request):
+    predictor = request.getfixturevalue(f"{request.param}_predictor")
+    return predictor, dataset_records(request.param)[:RECORDS]
+
+
+def contribution_matrix(predictor, results):
+    return np.array([
+        [{item["feature"]: item["contribution"] for item in result["contributions"]}[group]
+         for group in predictor.explainer.groups]
+        for result in results
+    ])
+
+
+def test_contributions_match_decision_path_walk(case):
+    predictor, records = case
+    actual = contribution_matrix(predictor, predictor.explain_batch(records))
+    expected = reference_contributions(predictor, sklearn_forest(predictor), records)
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9)
+
+
+def test_contributions_add_up_to_the_prediction(case):
+    predictor, records = case
+    predictor.cache.clear()
+    results = predictor.explain_batch(records)
+    for result, prediction in zip(results, predictor.predict_batch(records)):
+        assert result["prediction"] == prediction["prediction"]
+        assert result["probability"] == prediction["probability"]
+        total = result["base_value"] + sum(item["contribution"] for item in result["contributions"])
+        assert total == pytest.approx(result["probability"], abs=1e-9)
+
+
+def test_single_explanation_matches_batch(case):
+    predictor, records = case
+    batch = predictor.explain_batch(records[:5])
+    assert [predictor.explain(record) for record in records[:5]] == batch
@@ -0,0 +1,34 @@
+"""Compiled RandomForest engine against sklearn"""
+
+import numpy as np
+import pytest
+
+from benchmarks.forest_engine import load_models
+from ml_runtime.forest import CompiledForest, compile_model
+
+
+@pytest.fixture(scope="module")
+def models():
+    return load_models()
+
+
+def test_compiled_forest_matches_sklearn(models):
+    for name, model, X in models:
+        compiled = compile_model(model)
+        np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-9,
+                                   err_msg=name)
+        assert np.array_equal(compiled.predict(X), model.predict(X)), name
+
+
+def test_compiled_forest_leaves_match_sklearn(models):
+    for name, model, X in models:
+        forest = model.steps[-1][1] if hasattr(model, "steps") else model
+        rows = model[:-1].transform(X) if hasattr(model, "steps") else X.to_numpy()
+        compiled = CompiledForest.from_estimator(forest)
+        # Compiled node ids are offset per tree; the leaf values must agree
+        leaves = compiled.apply(np.asarray(rows, dtype=np.float32))
+        expected = np.stack([tree.tree_.value[tree.apply(np.asarray(rows, dtype=np.float32)), 0]
+                             for tree in forest.estimators_], axis=1)
+        values = compiled.value[leaves]
+        np.testing.assert_allclose(values, expected / expected.sum(axis=2, keepdims=True), atol=1e-12,
+                                   err_msg=name)
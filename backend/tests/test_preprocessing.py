@@ -0,0 +1,51 @@
+"""Fused preprocessing kernel against the heart pipeline's ColumnTransformer"""
+
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_runtime.dataset import load_dataset
+from ml_runtime.preprocess import FusedPreprocessor
+
+ML_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'ML_prediction')
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return joblib.load(os.path.join(ML_DIR, 'flask-heart', 'model.pkl'))
+
+
+@pytest.fixture(scope="module")
+def rows(pipeline) -> pd.DataFrame:
+    return load_dataset('heart')[list(pipeline.named_steps['preprocessor'].feature_names_in_)]
+
+
+def test_fused_kernel_is_bit_identical(pipeline, rows):
+    expected = pipeline.named_steps['preprocessor'].transform(rows)
+    fused = FusedPreprocessor.from_fitted(pipeline)
+    assert np.array_equal(fused.transform(rows), expected)
+    # NumPy rows in training column order, as the backend heart predictor passes them
+    assert np.array_equal(fused.transform(rows.to_numpy(dtype=np.float64)), expected)
+
+
+def test_fused_kernel_round_trips_through_its_spec(pipeline, rows):
+    fused = FusedPreprocessor.from_fitted(pipeline)
+    restored = FusedPreprocessor.from_dict(fused.to_dict())
+    assert np.array_equal(restored.transform(rows), fused.transform(rows))
+    assert list(restored.get_feature_names_out()) == list(fused.get_feature_names_out())
+
+
+def test_fused_kernel_handles_unseen_categories_like_sklearn(pipeline, rows):
+    preprocessor = pipeline.named_steps['preprocessor']
+    unseen = rows.head(5).copy()
+    unseen['cp'] = 99
+    try:
+        expected = preprocessor.transform(unseen)
+    except ValueError:
+        with pytest.raises(ValueError):
+            FusedPreprocessor.from_fitted(pipeline).transform(unseen)
+        return
+    assert np.array_equal(FusedPreprocessor.from_fitted(pipeline).transform(unseen), expected)
@@ -0,0 +1,50 @@
+"""Rule tables: the vectorized path against the direct if chains"""
+
+import pytest
+
+from benchmarks.rule_engine import MODULES, dataset_records, rule_input
+from models.rules import SCALAR_MAX_ROWS, record_matrix
+
+
+@pytest.fixture(params=["heart", "diabetes"])
+def disease(request):
+    return request.param
+
+
+def vectorized(table, records, predictions, values, fields):
+    return [table.render(code) for code in table.fire(records, predictions, values, fields)]
+
+
+@pytest.mark.parametrize("prediction", [0, 1])
+def test_vectorized_path_matches_direct_path(disease, prediction, heart_predictor):
+    module = MODULES[disease]
+    recommend, identify = module.RECOMMENDATION_RULES.direct, module.RISK_FACTOR_RULES.direct
+    records = dataset_records(disease)
+    values, fields = rule_input(disease, heart_predictor, records)
+    if values is None:
+        values = record_matrix(records, fields)
+    predictions = [prediction] * len(records)
+
+    assert vectorized(module.RECOMMENDATION_RULES, records, predictions, values, fields) == \
+        [recommend(record, prediction) for record in records]
+    assert vectorized(module.RISK_FACTOR_RULES, records, None, values, fields) == \
+        [identify(record) for record in records]
+
+
+@pytest.mark.parametrize("size", [1, SCALAR_MAX_ROWS, SCALAR_MAX_ROWS + 1])
+def test_apply_gives_the_same_lists_at_every_batch_size(disease, size):
+    module = MODULES[disease]
+    records = dataset_records(disease)[:size]
+    predictions = [i % 2 for i in range(size)]
+    assert module.RECOMMENDATION_RULES.apply(records, predictions) == \
+        vectorized(module.RECOMMENDATION_RULES, records, predictions, None, None)
+    assert module.RISK_FACTOR_RULES.apply(records) == vectorized(module.RISK_FACTOR_RULES, records, None, None, None)
+
+
+def test_missing_fields_count_as_zero(disease):
+    module = MODULES[disease]
+    for records in ([{}], [{}] * (SCALAR_MAX_ROWS + 1)):
+        assert module.RECOMMENDATION_RULES.apply(records, [1] * len(records)) == \
+            vectorized(module.RECOMMENDATION_RULES, records, [1] * len(records), None, None)
+        assert module.RISK_FACTOR_RULES.apply(records) == vectorized(module.RISK_FACTOR_RULES, records, None, None, None)
+        assert module.RISK_FACTOR_RULES.apply(records)[0] == module.RISK_FACTOR_RULES.direct({})
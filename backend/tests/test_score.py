@@ -0,0 +1,105 @@
+"""Offline bulk scoring: validation, input passthrough and resume"""
+
+import json
+
+import pandas as pd
+import pytest
+
+import score
+from benchmarks.batch_throughput import make_heart_records
+
+CHUNK_SIZE = 40
+
+
+@pytest.fixture(scope="module")
+def heart_csv(tmp_path_factory):
+    records = make_heart_records(200)
+    # The same value written as 3 and as 3.0 in different chunks
+    records[5]["cp"], records[150]["cp"] = "3", "3.0"
+    records[7]["cp"] = "1.5"
+    records[9]["chol"] = ""
+    path = tmp_path_factory.mktemp("score") / "patients.csv"
+    pd.DataFrame(records).to_csv(path, index=False)
+    return path
+
+
+def read_text(path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def test_int_fields_must_be_whole_numbers(heart_csv, tmp_path):
+    output = tmp_path / "scored.csv"
+    score.run("heart", str(heart_csv), str(output), "csv", "csv", CHUNK_SIZE, 1, False)
+    scored = read_text(output)
+
+    assert scored.loc[7, "error"] == "cp: not an integer"
+    assert scored.loc[7, "prediction"] == ""
+    assert scored.loc[9, "error"] == "chol: missing or not a number"
+    assert scored.loc[5, "error"] == scored.loc[150, "error"] == ""
+    assert scored["error"].ne("").sum() == 2
+
+
+def test_scores_match_the_api(tmp_path, heart_predictor):
+    records = make_heart_records(50)
+    source, output = tmp_path / "patients.csv", tmp_path / "scored.csv"
+    pd.DataFrame(records).to_csv(source, index=False)
+    score.run("heart", str(source), str(output), "csv", "csv", CHUNK_SIZE, 1, False)
+
+    scored = pd.read_csv(output)
+    expected = heart_predictor.predict_batch(records)
+    assert scored["risk_level"].tolist() == [result["risk_level"] for result in expected]
+    assert scored["prediction"].tolist() == [result["prediction"] for result in expected]
+    assert scored["probability"].tolist() == pytest.approx([result["probability"] for result in expected], abs=1e-12)
+
+
+def test_input_columns_are_written_back_as_read(heart_csv, tmp_path):
+    output = tmp_path / "scored.csv"
+    score.run("heart", str(heart_csv), str(output), "csv", "csv", CHUNK_SIZE, 1, False)
+    original, scored = read_text(heart_csv), read_text(output)
+
+    pd.testing.assert_frame_equal(scored[original.columns], original)
+    assert scored.loc[5, "cp"] == "3" and scored.loc[150, "cp"] == "3.0"
+
+
+def test_ndjson_values_are_written_back_as_read(tmp_path):
+    records = make_heart_records(20)
+    records[0]["cp"] = 3
+    records[15] = dict(records[0], cp=3.0)
+    source = tmp_path / "patients.ndjson"
+    source.write_text("".join(json.dumps(record) + "\n" for record in records))
+    output = tmp_path / "scored.ndjson"
+    score.run("heart", str(source), str(output), "ndjson", "ndjson", 8, 1, False)
+
+    scored = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [{key: row[key] for key in record} for row, record in zip(scored, records)] == records
+    assert scored[0]["cp"] == 3 and isinstance(scored[15]["cp"], float)
+    assert scored[0]["probability"] == scored[15]["probability"]
+
+
+def test_resume_gives_the_uninterrupted_output(heart_csv, tmp_path, monkeypatch):
+    expected = tmp_path / "expected.csv"
+    score.run("heart", str(heart_csv), str(expected), "csv", "csv", CHUNK_SIZE, 1, False)
+
+    output = tmp_path / "scored.csv"
+    process_chunk, calls = score.process_chunk, []
+
+    def crash_on_third_chunk(*args):
+        calls.append(args)
+        if len(calls) == 3:
+            raise RuntimeError("worker died")
+        return process_chunk(*args)
+
+    monkeypatch.setattr(score, "process_chunk", crash_on_third_chunk)
+    with pytest.raises(RuntimeError):
+        score.run("heart", str(heart_csv), str(output), "csv", "csv", CHUNK_SIZE, 1, False)
+    monkeypatch.undo()
+    # Bytes written after the last checkpoint are dropped on resume
+    with open(output, "ab") as f:
+        f.write(b"partial,row")
+
+    state = score.run("heart", str(heart_csv), str(output), "csv", "csv", CHUNK_SIZE, 1, True)
+    assert state["complete"] and state["rows_done"] == 200
+    assert output.read_bytes() == expected.read_bytes()
+
+    with pytest.raises(SystemExit):
+        score.run("heart", str(heart_csv), str(output), "csv", "csv", CHUNK_SIZE + 1, 1, True)
@@ -0,0 +1,28 @@
+"""Concurrent model loading at startup"""
+
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# A fresh interpreter, so both loader threads hit the first import of sklearn
+LOAD_BOTH = """
+import sys, warnings
+warnings.simplefilter("ignore")
+import main
+assert "sklearn" not in sys.modules, "main imported sklearn up front"
+main.load_models()
+assert main.heart_predictor is not None and main.diabetes_predictor is not None
+print("loaded", main.heart_predictor.version, main.diabetes_predictor.version)
+"""
+
+
+def test_models_load_concurrently_with_the_sklearn_engine(tmp_path):
+    env = dict(os.environ, FOREST_ENGINE="sklearn", PYTHONDONTWRITEBYTECODE="1",
+               LOG_FILE=str(tmp_path / "app.log"))
+    for _ in range(3):
+        result = subprocess.run([sys.executable, "-c", LOAD_BOTH], cwd=BACKEND_DIR, env=env,
+                                capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr[-2000:]
+        assert result.stdout.startswith("loaded")